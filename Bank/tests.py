@@ -1,3 +1,25 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from testutils.query_budget import QueryBudgetMixin
+
+from .models import Bank
+
+
+class BankQueryBudgetTests(QueryBudgetMixin, TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        for index in range(3):
+            Bank.objects.create(bank_name=f"Bank {index}", acc_no=str(index), creator=cls.admin.profile)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.admin)
+
+    def test_view_banks(self):
+        self.assertWithinQueryBudget("view_banks")
@@ -3,18 +3,19 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from Paymagics_Admin.models import *
+from Paymagics_Admin.authentication import request_profile
 from .models import Bank
 from .serializers import BankSerializer
 from django.db.models import Q
-from rest_framework.pagination import PageNumberPagination
+from Paymagics_API.pagination import get_paginator
+from Paymagics_API.db_router import replica_view
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def view_banks(request):
     banks = Bank.objects.filter(is_active=True).order_by('-id')
 
-    paginator = PageNumberPagination()
-    paginator.page_size = 15
+    paginator = get_paginator(request)
     paginated_banks = paginator.paginate_queryset(banks, request)
 
     serializer = BankSerializer(paginated_banks, many=True)
@@ -26,8 +27,7 @@ def view_banks(request):
 def add_bank(request):
     serializer = BankSerializer(data=request.data)
     if serializer.is_valid():
-        usr = UserProfile.objects.get(user=request.user)
-        serializer.save(creator= usr) 
+        serializer.save(creator=request_profile(request))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -92,6 +92,7 @@ def filter_banks_by_type(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_view
 def search_banks(request):
     query = request.query_params.get('q', '').strip()
 
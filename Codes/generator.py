@@ -0,0 +1,167 @@
+import hashlib
+import hmac
+import os
+import string
+import threading
+
+from django.conf import settings
+
+
+CODE_ALPHABET = string.ascii_uppercase + string.digits
+
+# Code length per namespace. A namespace's codes never repeat; different
+# namespaces are independent and may produce the same string.
+CODE_LENGTHS = {
+    # UserProfile.referral_code, Payee.referralcode, Category.referral_code; one longer
+    # than the 6-character random codes issued before, which those columns still hold
+    "referral": 7,
+    # CategoryReferralCode.code; one longer than the 8-character random codes issued before
+    "category_referral": 9,
+    # ben_codes of payees created through a referral link
+    "ben_code": 9,
+}
+
+# Sequence numbers per CodeBlock row. Changing it would make new blocks
+# overlap old ones, so it is fixed rather than a setting.
+BLOCK_SIZE = 1000
+
+FEISTEL_ROUNDS = 4
+
+
+class CodeSpaceExhausted(Exception):
+    pass
+
+
+class CodePermutation:
+    """
+    A keyed bijection on [0, 36 ** length): a Feistel network over the
+    smallest even number of bits that covers the range, cycle-walked until
+    the result falls inside it. Consecutive sequence numbers come out as
+    unrelated-looking codes, and distinct numbers always give distinct codes.
+
+    The key comes from CODE_SECRET, which must never change once codes have
+    been issued: a new key starts a new permutation that can repeat old codes.
+    """
+
+    def __init__(self, namespace, length, secret):
+        self.length = length
+        self.size = len(CODE_ALPHABET) ** length
+        bits = (self.size - 1).bit_length()
+        self.half = (bits + 1) // 2
+        self.mask = (1 << self.half) - 1
+        key = hmac.new(secret.encode(), namespace.encode(), hashlib.sha256).digest()
+        self._mac = hmac.new(key, digestmod=hashlib.sha256)
+
+    def _round(self, number, value):
+        mac = self._mac.copy()
+        mac.update(bytes((number,)) + value.to_bytes(8, "big"))
+        return int.from_bytes(mac.digest()[:8], "big") & self.mask
+
+    def _feistel(self, value):
+        left, right = value >> self.half, value & self.mask
+        for number in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ self._round(number, right)
+        return (left << self.half) | right
+
+    def permute(self, value):
+        value = self._feistel(value)
+        while value >= self.size:
+            value = self._feistel(value)
+        return value
+
+    def encode(self, value):
+        chars = []
+        for _ in range(self.length):
+            value, digit = divmod(value, len(CODE_ALPHABET))
+            chars.append(CODE_ALPHABET[digit])
+        return "".join(reversed(chars))
+
+    def code(self, sequence_number):
+        if sequence_number >= self.size:
+            raise CodeSpaceExhausted(f"All {self.length}-character codes have been issued")
+        return self.encode(self.permute(sequence_number))
+
+
+class CodeAllocator:
+    """
+    Hands out codes from sequence numbers this process has reserved.
+
+    Reserving a block is one CodeBlock insert, covering BLOCK_SIZE numbers;
+    a request for more than is left reserves as many blocks as it needs, so
+    bulk callers pay one insert per thousand codes and single codes usually
+    none. The auto-increment keeps blocks disjoint across processes without
+    locks, and MySQL does not hand out an id again when the inserting
+    transaction rolls back. (SQLite can, so there a rolled-back block may be
+    reused; the unique constraints on the code columns still hold.)
+
+    Unused numbers are dropped when the process exits or forks.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ranges = {}
+        self._permutations = {}
+        self._pid = os.getpid()
+
+    def _permutation(self, namespace):
+        permutation = self._permutations.get(namespace)
+        if permutation is None:
+            if namespace not in CODE_LENGTHS:
+                raise ValueError(f"Unknown code namespace '{namespace}'")
+            secret = getattr(settings, "CODE_SECRET", None) or settings.SECRET_KEY
+            permutation = CodePermutation(namespace, CODE_LENGTHS[namespace], secret)
+            self._permutations[namespace] = permutation
+        return permutation
+
+    def _reserve(self, namespace, blocks):
+        from .models import CodeBlock
+
+        ranges = []
+        for _ in range(blocks):
+            block = CodeBlock.objects.create(namespace=namespace)
+            start = (block.pk - 1) * BLOCK_SIZE
+            ranges.append(range(start, start + BLOCK_SIZE))
+        return ranges
+
+    def _numbers(self, namespace, count):
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked child must not reuse the parent's numbers
+                self._ranges, self._pid = {}, os.getpid()
+
+            ranges = self._ranges.setdefault(namespace, [])
+            available = sum(len(r) for r in ranges)
+            if available < count:
+                ranges.extend(self._reserve(namespace, -(-(count - available) // BLOCK_SIZE)))
+
+            numbers = []
+            while len(numbers) < count:
+                needed = count - len(numbers)
+                current = ranges[0]
+                numbers.extend(current[:needed])
+                if len(current) > needed:
+                    ranges[0] = current[needed:]
+                else:
+                    ranges.pop(0)
+            return numbers
+
+    def take(self, namespace, count):
+        permutation = self._permutation(namespace)
+        return [permutation.code(number) for number in self._numbers(namespace, count)]
+
+    def reset(self):
+        with self._lock:
+            self._ranges = {}
+            self._permutations = {}
+
+
+codes = CodeAllocator()
+
+
+def take_codes(namespace, count):
+    """`count` new codes from `namespace`, never issued before"""
+    return codes.take(namespace, count) if count > 0 else []
+
+
+def next_code(namespace):
+    return codes.take(namespace, 1)[0]
@@ -0,0 +1,14 @@
+from django.db import models
+
+
+class CodeBlock(models.Model):
+    """
+    A reserved run of sequence numbers for Codes.generator: block `id` owns
+    numbers [(id - 1) * BLOCK_SIZE, id * BLOCK_SIZE). Only the auto-increment
+    matters; `namespace` records which kind of code asked for it.
+    """
+    namespace = models.CharField(max_length=50)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.namespace} block #{self.pk}"
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'Jobs'
+
+    def ready(self):
+        from django.utils.module_loading import autodiscover_modules
+
+        # Job handlers live in each app's tasks.py
+        autodiscover_modules("tasks")
@@ -0,0 +1,68 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from Jobs.queue import claim_next_job, requeue_stale_jobs, run_job, worker_name
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the database queue until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty instead of polling for new jobs.",
+        )
+        parser.add_argument(
+            "--max-jobs",
+            type=int,
+            default=0,
+            help="Exit after running this many jobs (0 = no limit), so a supervisor can recycle the process.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=getattr(settings, "JOBS_POLL_INTERVAL", 2),
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        name = worker_name()
+        self.stdout.write(f"Worker {name} started")
+
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+        done = 0
+        while not self.stopping:
+            close_old_connections()
+
+            job = claim_next_job(name)
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+                requeue_stale_jobs()
+                continue
+
+            job = run_job(job)
+            done += 1
+            self.stdout.write(str(job))
+
+            if options["max_jobs"] and done >= options["max_jobs"]:
+                break
+
+        self.stdout.write(f"Worker {name} stopped after {done} job(s)")
+
+    def stop(self, signum, frame):
+        # Finish the current job, then exit
+        self.stopping = True
@@ -0,0 +1,67 @@
+from django.contrib.auth.models import User
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    STATUS_CHOICES = (
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    )
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="jobs")
+
+    # Uploaded input for jobs that process a file, and the file a job produced
+    source = models.FileField(upload_to="jobs/sources/", blank=True)
+    artifact = models.FileField(upload_to="jobs/artifacts/", blank=True)
+    artifact_name = models.CharField(max_length=255, blank=True, default="")
+
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    progress = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's claim query: oldest runnable queued job first
+            models.Index(fields=["status", "run_after"], name="job_claim_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    def set_progress(self, done, total=None):
+        """
+        Record progress from inside a running handler without touching other
+        fields. Doubles as a heartbeat for the worker that holds the job.
+        """
+        self.progress = done
+        fields = {"progress": done}
+        if self.status == "running":
+            self.locked_at = fields["locked_at"] = timezone.now()
+        if total is not None:
+            self.progress_total = total
+            fields["progress_total"] = total
+        Job.objects.filter(pk=self.pk).update(**fields)
+
+    def save_artifact(self, filename, file_obj):
+        """Store a finished file for download; `file_obj` is any readable binary file"""
+        from django.core.files import File
+
+        self.artifact.save(filename, File(file_obj, name=filename), save=False)
+        self.artifact_name = filename
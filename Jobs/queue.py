@@ -0,0 +1,192 @@
+import logging
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# kind -> handler(job); filled by @job_handler in each app's tasks.py
+JOB_HANDLERS = {}
+
+
+class JobError(Exception):
+    """Raised by a handler for failures that retrying cannot fix (bad input and the like)"""
+
+
+def job_handler(kind):
+    """
+    Register a function as the handler for `kind`.
+
+    The handler receives the running Job. It may call job.set_progress() and
+    job.save_artifact(), and whatever JSON-serialisable value it returns is
+    stored as job.result.
+    """
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def _lock_timeout():
+    return timedelta(seconds=getattr(settings, "JOBS_LOCK_TIMEOUT", 15 * 60))
+
+
+def _heartbeat_interval():
+    return getattr(settings, "JOBS_HEARTBEAT_INTERVAL", 60)
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=getattr(settings, "JOBS_RETRY_DELAY", 30) * attempts)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(kind, payload=None, user=None, source=None):
+    """
+    Queue a job and return it. `source` is an optional uploaded file the
+    handler reads from job.source.
+
+    With JOBS_RUN_INLINE the job runs in this process as soon as the
+    surrounding transaction commits, so no worker is needed locally.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"No handler registered for job kind '{kind}'")
+
+    job = Job(kind=kind, payload=payload or {}, created_by=user)
+    if source is not None:
+        job.source = source
+    job.save()
+
+    if getattr(settings, "JOBS_RUN_INLINE", False):
+        transaction.on_commit(lambda: run_job_by_id(job.pk))
+    return job
+
+
+def claim_next_job(worker=None):
+    """
+    Atomically take the oldest runnable queued job, or return None.
+    SKIP LOCKED lets several workers poll the same table without blocking.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status="queued", run_after__lte=now)
+            .order_by("run_after", "id")
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = "running"
+        job.locked_by = worker or worker_name()
+        job.locked_at = now
+        job.started_at = job.started_at or now
+        job.attempts += 1
+        job.save(update_fields=["status", "locked_by", "locked_at", "started_at", "attempts"])
+    return job
+
+
+@contextmanager
+def heartbeat(job):
+    """
+    Refresh the running job's locked_at every JOBS_HEARTBEAT_INTERVAL seconds
+    from a side thread, so requeue_stale_jobs only takes jobs whose worker
+    has stopped, however long the handler runs.
+    """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(_heartbeat_interval()):
+                Job.objects.filter(pk=job.pk, status="running", locked_by=job.locked_by).update(
+                    locked_at=timezone.now()
+                )
+        except Exception:
+            logger.exception("Heartbeat for job %s failed", job.pk)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"job-{job.pk}-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job):
+    """Run a claimed job's handler and record the outcome"""
+    handler = JOB_HANDLERS.get(job.kind)
+
+    try:
+        if handler is None:
+            raise JobError(f"No handler registered for job kind '{job.kind}'")
+        with heartbeat(job):
+            result = handler(job)
+    except Exception as e:
+        retry = not isinstance(e, JobError) and job.attempts < job.max_attempts
+        if isinstance(e, JobError):
+            logger.warning("Job %s (%s) failed: %s", job.pk, job.kind, e)
+        else:
+            logger.exception("Job %s (%s) raised", job.pk, job.kind)
+
+        job.error = str(e)[:2000]
+        job.locked_by = ""
+        job.locked_at = None
+        if retry:
+            job.status = "queued"
+            job.run_after = timezone.now() + _retry_delay(job.attempts)
+        else:
+            job.status = "failed"
+            job.finished_at = timezone.now()
+        job.save()
+        return job
+
+    job.result = result
+    job.status = "completed"
+    job.error = ""
+    job.progress = max(job.progress, job.progress_total or 0)
+    job.locked_by = ""
+    job.locked_at = None
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+def run_job_by_id(job_id):
+    """Claim one specific queued job and run it (JOBS_RUN_INLINE)"""
+    now = timezone.now()
+    claimed = Job.objects.filter(pk=job_id, status="queued").update(
+        status="running", locked_by=worker_name(), locked_at=now, started_at=now, attempts=F("attempts") + 1,
+    )
+    if not claimed:
+        return None
+    return run_job(Job.objects.get(pk=job_id))
+
+
+def requeue_stale_jobs():
+    """
+    Put back jobs whose worker died mid-run, going by a heartbeat older than
+    JOBS_LOCK_TIMEOUT; returns how many were requeued
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status="running", locked_at__lt=now - _lock_timeout())
+
+    stale.filter(attempts__gte=F("max_attempts")).update(
+        status="failed", error="Worker stopped before the job finished", locked_by="", locked_at=None, finished_at=now,
+    )
+    return stale.update(status="queued", locked_by="", locked_at=None)
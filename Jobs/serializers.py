@@ -0,0 +1,23 @@
+from django.urls import reverse
+from rest_framework import serializers
+
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    job_id = serializers.IntegerField(source="id", read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            "job_id", "kind", "status", "progress", "progress_total", "result", "error",
+            "attempts", "created_at", "started_at", "finished_at", "download_url",
+        ]
+
+    def get_download_url(self, obj):
+        if obj.status != "completed" or not obj.artifact:
+            return None
+        url = reverse("job_download", args=[obj.id])
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,57 @@
+import threading
+from datetime import timedelta
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import JOB_HANDLERS, claim_next_job, requeue_stale_jobs, run_job
+
+
+class StaleJobTests(TestCase):
+
+    def claimed_job(self, locked_at):
+        Job.objects.create(kind="test")
+        job = claim_next_job("worker-1")
+        Job.objects.filter(pk=job.pk).update(locked_at=locked_at)
+        job.refresh_from_db()
+        return job
+
+    def test_requeues_only_jobs_with_a_stale_heartbeat(self):
+        stale = self.claimed_job(timezone.now() - timedelta(hours=1))
+        fresh = self.claimed_job(timezone.now())
+
+        self.assertEqual(requeue_stale_jobs(), 1)
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual((stale.status, fresh.status), ("queued", "running"))
+
+    def test_progress_refreshes_the_heartbeat(self):
+        job = self.claimed_job(timezone.now() - timedelta(hours=1))
+        job.set_progress(1, 10)
+        self.assertEqual(requeue_stale_jobs(), 0)
+
+
+@override_settings(JOBS_HEARTBEAT_INTERVAL=0.01)
+class HeartbeatTests(TransactionTestCase):
+
+    def setUp(self):
+        JOB_HANDLERS["test"] = self.handler
+        self.addCleanup(JOB_HANDLERS.pop, "test")
+        self.beaten = threading.Event()
+
+    def handler(self, job):
+        # Runs past the lock timeout; the heartbeat must keep moving locked_at
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        for _ in range(200):
+            if Job.objects.get(pk=job.pk).locked_at > timezone.now() - timedelta(minutes=1):
+                self.beaten.set()
+                break
+            self.beaten.wait(0.01)
+        self.assertEqual(requeue_stale_jobs(), 0)
+
+    def test_running_job_keeps_its_lock(self):
+        Job.objects.create(kind="test")
+        job = run_job(claim_next_job("worker-1"))
+        self.assertTrue(self.beaten.is_set())
+        self.assertEqual(job.status, "completed", job.error)
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import *
+
+urlpatterns = [
+    path('<int:job_id>/', job_status, name='job_status'),
+    path('<int:job_id>/download/', job_download, name='job_download'),
+]
@@ -0,0 +1,39 @@
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .models import Job
+from .serializers import JobSerializer
+
+
+def job_accepted_response(request, job):
+    """202 response for a view that handed its work to the queue"""
+    data = JobSerializer(job, context={"request": request}).data
+    data["status_url"] = request.build_absolute_uri(reverse("job_status", args=[job.id]))
+    return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+def _get_job(request, job_id):
+    jobs = Job.objects.all() if request.user.is_staff else Job.objects.filter(created_by=request.user)
+    return get_object_or_404(jobs, id=job_id)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def job_status(request, job_id):
+    job = _get_job(request, job_id)
+    return Response(JobSerializer(job, context={"request": request}).data)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def job_download(request, job_id):
+    job = _get_job(request, job_id)
+    if job.status != "completed" or not job.artifact:
+        return Response({"error": "This job has no file to download yet."}, status=status.HTTP_404_NOT_FOUND)
+
+    return FileResponse(job.artifact.open("rb"), as_attachment=True, filename=job.artifact_name)
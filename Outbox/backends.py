@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+
+
+def delivery_connection(**kwargs):
+    """A connection to the backend that really delivers mail (OUTBOX_DELIVERY_BACKEND)"""
+    backend = getattr(settings, "OUTBOX_DELIVERY_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+    return get_connection(backend=backend, **kwargs)
+
+
+class OutboxBackend(BaseEmailBackend):
+    """
+    EMAIL_BACKEND that writes messages to the OutboxEmail table instead of
+    talking to the mail server. The rows join the caller's transaction, so a
+    rolled-back request sends nothing; `manage.py send_outbox` delivers them.
+
+    Messages with attachments are not stored and go straight to the delivery
+    backend.
+    """
+
+    def send_messages(self, email_messages):
+        from .models import OutboxEmail
+
+        queued = []
+        direct = []
+        for message in email_messages:
+            if not message.recipients():
+                continue
+            if message.attachments:
+                direct.append(message)
+            else:
+                queued.append(OutboxEmail.from_message(message))
+
+        sent = 0
+        if direct:
+            sent += delivery_connection(fail_silently=self.fail_silently).send_messages(direct) or 0
+
+        if queued:
+            OutboxEmail.objects.bulk_create(queued)
+            sent += len(queued)
+
+            if getattr(settings, "OUTBOX_SEND_INLINE", False):
+                from .sender import send_due_emails
+
+                transaction.on_commit(send_due_emails)
+
+        return sent
@@ -0,0 +1,68 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from Outbox.backends import delivery_connection
+from Outbox.sender import requeue_stale_emails, send_due_emails
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails in batches until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once nothing is due instead of polling for new emails.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "OUTBOX_BATCH_SIZE", 50),
+            help="Emails claimed and sent over one connection per round.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=getattr(settings, "OUTBOX_POLL_INTERVAL", 2),
+            help="Seconds to wait between polls when nothing is due.",
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        requeued = requeue_stale_emails()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale email(s)")
+
+        # One connection for the whole run, kept open while there is mail to send
+        connection = delivery_connection()
+        total_sent = total_failed = 0
+
+        while not self.stopping:
+            close_old_connections()
+
+            sent, failed = send_due_emails(options["batch_size"], connection)
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+                continue
+
+            connection.close()
+            if options["once"]:
+                break
+            time.sleep(options["sleep"])
+            requeue_stale_emails()
+
+        connection.close()
+        self.stdout.write(f"Outbox sender stopped: {total_sent} sent, {total_failed} failed")
+
+    def stop(self, signum, frame):
+        # Finish the current batch, then exit
+        self.stopping = True
@@ -0,0 +1,119 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .backends import delivery_connection
+from .models import OutboxEmail
+
+
+logger = logging.getLogger(__name__)
+
+
+def _batch_size():
+    return getattr(settings, "OUTBOX_BATCH_SIZE", 50)
+
+
+def _retry_delay(attempts):
+    # 1, 2, 4, 8 ... times the base delay
+    return timedelta(seconds=getattr(settings, "OUTBOX_RETRY_DELAY", 60) * 2 ** max(attempts - 1, 0))
+
+
+def _lock_timeout():
+    return timedelta(seconds=getattr(settings, "OUTBOX_LOCK_TIMEOUT", 600))
+
+
+def claim_due_emails(limit=None):
+    """
+    Atomically mark up to `limit` due emails as sending and return them.
+    SKIP LOCKED lets several senders share the table without double sends.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status="queued", send_after__lte=now)
+            .order_by("send_after", "id")
+            .values_list("id", flat=True)[:limit or _batch_size()]
+        )
+        if not ids:
+            return []
+        OutboxEmail.objects.filter(id__in=ids).update(status="sending", locked_at=now, attempts=F("attempts") + 1)
+    return list(OutboxEmail.objects.filter(id__in=ids).order_by("send_after", "id"))
+
+
+def _record_failure(email, error):
+    email.last_error = str(error)[:2000]
+    email.locked_at = None
+    if email.attempts < email.max_attempts:
+        email.status = "queued"
+        email.send_after = timezone.now() + _retry_delay(email.attempts)
+    else:
+        email.status = "failed"
+    email.save(update_fields=["status", "send_after", "locked_at", "last_error"])
+
+
+def send_emails(emails, connection=None):
+    """
+    Deliver claimed emails over one connection. A connection passed in is
+    opened if needed and left open for the next batch; one made here is
+    closed afterwards. A failed email is requeued with exponential backoff
+    until it runs out of attempts, and the connection is reopened since it
+    may be broken. Returns (sent, failed) counts.
+    """
+    owned = connection is None
+    if owned:
+        connection = delivery_connection()
+    sent = failed = 0
+    pending = list(emails)
+
+    try:
+        while pending:
+            try:
+                connection.open()
+            except Exception as e:
+                # Server unreachable: nothing in this batch can go out
+                logger.warning("Outbox could not connect: %s", e)
+                for email in pending:
+                    _record_failure(email, e)
+                failed += len(pending)
+                break
+
+            email = pending.pop(0)
+            try:
+                if not connection.send_messages([email.to_message(connection)]):
+                    raise RuntimeError("The mail backend did not accept the message")
+            except Exception as e:
+                logger.warning("Outbox email %s failed (attempt %s): %s", email.pk, email.attempts, e)
+                _record_failure(email, e)
+                failed += 1
+                connection.close()
+                continue
+
+            sent += 1
+            OutboxEmail.objects.filter(pk=email.pk).update(
+                status="sent", sent_at=timezone.now(), locked_at=None, last_error="",
+            )
+    finally:
+        if owned:
+            connection.close()
+
+    return sent, failed
+
+
+def send_due_emails(limit=None, connection=None):
+    """Claim and send one batch; returns (sent, failed)"""
+    emails = claim_due_emails(limit)
+    if not emails:
+        return 0, 0
+    return send_emails(emails, connection)
+
+
+def requeue_stale_emails():
+    """Put back emails whose sender died mid-batch; returns how many were requeued"""
+    return OutboxEmail.objects.filter(
+        status="sending", locked_at__lt=timezone.now() - _lock_timeout(),
+    ).update(status="queued", locked_at=None)
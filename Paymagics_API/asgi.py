@@ -9,8 +9,16 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Paymagics_API.settings')
+# Read by settings: no persistent per-thread connections under ASGI
+os.environ.setdefault('DJANGO_ASGI', '1')
 
 application = get_asgi_application()
+
+if settings.DB_WARM_UP:
+    from Paymagics_API.db_connections import warm_up_connections_in_thread
+
+    warm_up_connections_in_thread()
@@ -0,0 +1,32 @@
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def cache_is_shared(alias="default"):
+    """
+    Whether every process sees the same cache. LocMemCache lives inside one
+    process, so versions bumped there never reach the other workers.
+    """
+    return not isinstance(caches[alias], LocMemCache)
+
+
+def get_version(key):
+    """
+    Current value of a cache version counter. A lost counter restarts from the
+    clock rather than 1, so it never revisits a version that was cached before.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """Move a counter on, orphaning every entry cached under its old value"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
@@ -0,0 +1,230 @@
+import logging
+import os
+import threading
+import time
+from functools import cached_property
+
+from django.db import OperationalError, connections
+
+
+logger = logging.getLogger(__name__)
+
+# A pooled connection idle for longer than this is pinged before reuse (with CONN_HEALTH_CHECKS)
+POOL_CHECK_IDLE = 30
+
+
+class ConnectionPool:
+    """
+    Process-wide pool of raw DB-API connections for one database alias.
+
+    Checkouts take the most recently returned connection, or open a new one
+    while fewer than `max_size` exist; otherwise they wait up to `timeout`
+    seconds. Connections older than `max_lifetime` are closed instead of
+    reused. A forked child starts with an empty pool rather than sharing the
+    parent's sockets.
+    """
+
+    def __init__(self, max_size=10, min_size=0, timeout=30, max_lifetime=3600, check=True):
+        self.max_size = max(max_size, 1)
+        self.min_size = min(min_size, self.max_size)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check = check
+        self._cond = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        # (connection, returned_at) pairs, most recently returned last
+        self._idle = []
+        self._opened_at = {}
+        self._size = 0
+        self._pid = os.getpid()
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _discard(self, raw):
+        with self._cond:
+            if self._opened_at.pop(id(raw), None) is not None:
+                self._size -= 1
+            self._cond.notify()
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def acquire(self, connect, is_alive):
+        """Check out a connection; `connect()` opens a new one, `is_alive(raw)` health-checks an idle one"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                self._check_pid()
+                if self._idle:
+                    raw, returned_at = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                    raw = None
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise OperationalError(
+                            f"No database connection available: all {self.max_size} pooled connections are in use"
+                        )
+                    self._cond.wait(remaining)
+                    continue
+
+            if raw is None:
+                try:
+                    raw = connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._opened_at[id(raw)] = time.monotonic()
+                return raw
+
+            now = time.monotonic()
+            expired = now - self._opened_at.get(id(raw), now) > self.max_lifetime
+            stale = self.check and now - returned_at > POOL_CHECK_IDLE and not is_alive(raw)
+            if expired or stale:
+                self._discard(raw)
+                continue
+            return raw
+
+    def release(self, raw, discard=False):
+        """Return a checked-out connection, rolling back anything left open on it"""
+        with self._cond:
+            inherited = self._pid != os.getpid() or id(raw) not in self._opened_at
+        if inherited:
+            # Opened before a fork (or by another pool); leave the socket alone
+            return
+        if not discard:
+            try:
+                raw.rollback()
+            except Exception:
+                discard = True
+        if discard:
+            self._discard(raw)
+            return
+        with self._cond:
+            self._idle.append((raw, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {"size": self._size, "idle": len(self._idle), "max_size": self.max_size}
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict):
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            options = settings_dict["OPTIONS"].get("pool")
+            options = options if isinstance(options, dict) else {}
+            pool = ConnectionPool(check=settings_dict.get("CONN_HEALTH_CHECKS", True), **options)
+            _pools[alias] = pool
+        return pool
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Makes a Django backend's DatabaseWrapper check connections out of a
+    ConnectionPool when OPTIONS["pool"] is set (True or a dict of pool
+    arguments). Closing the wrapper returns the connection instead of
+    disconnecting, so CONN_MAX_AGE = 0 costs a checkout per request rather
+    than a new TCP/TLS/auth handshake.
+    """
+    # Engine with the same driver and no pool, for comparisons (bench_db_connections)
+    unpooled_engine = None
+
+    @cached_property
+    def pool(self):
+        if not self.settings_dict["OPTIONS"].get("pool"):
+            return None
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop("pool", None)
+        return params
+
+    def is_raw_connection_alive(self, raw):
+        try:
+            with raw.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except Exception:
+            return False
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        pool = self.pool
+        if pool is None:
+            return connect(conn_params)
+        return pool.acquire(lambda: connect(conn_params), self.is_raw_connection_alive)
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            # Closed inside atomic(): Django keeps using the connection until the rollback
+            pool.release(self.connection, discard=self.in_atomic_block)
+
+    def warm_pool(self):
+        """Open the pool's min_size connections ahead of the first requests (this wrapper's own counts as one)"""
+        pool = self.pool
+        if pool is None:
+            return
+        params = self.get_connection_params()
+        raws = [self.get_new_connection(params) for _ in range(pool.min_size - 1)]
+        for raw in raws:
+            pool.release(raw)
+
+
+# ----------------------------- startup
+
+def warm_up_connections():
+    """
+    Connect every configured database once at startup, so the first requests
+    don't pay for the handshake, server version checks and pool fill. A
+    database that is down only logs a warning; requests retry as usual.
+
+    The connection is closed again afterwards: with a pool it goes back for
+    request threads to use, and without one it would otherwise sit idle on
+    the importing thread until the server times it out.
+    """
+    for alias in connections:
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+            # PostgreSQL opens its min_size itself; the MySQL pool is filled here
+            if isinstance(connection, PooledDatabaseWrapperMixin):
+                connection.warm_pool()
+            connection.close()
+        except Exception as e:
+            logger.warning("Could not warm up database '%s': %s", alias, e)
+
+
+def warm_up_connections_in_thread():
+    """warm_up_connections() for ASGI servers, which import the app inside their running event loop"""
+    thread = threading.Thread(target=warm_up_connections, name="db-warm-up")
+    thread.start()
+    thread.join()
+
+
+def _forget_inherited_connections():
+    # A persistent connection opened before a fork (e.g. gunicorn --preload) is
+    # the parent's socket; the child must open its own instead of sharing it.
+    for connection in connections.all(initialized_only=True):
+        connection.connection = None
+
+
+os.register_at_fork(after_in_child=_forget_inherited_connections)
@@ -0,0 +1,162 @@
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .cache_versions import cache_is_shared
+
+
+# State of the current request or job: the alias reads go to, and whether anything was written
+_state = contextvars.ContextVar("db_routing_state", default=None)
+
+
+class RoutingState:
+    __slots__ = ("read_alias", "wrote")
+
+    def __init__(self, read_alias=None):
+        self.read_alias = read_alias
+        self.wrote = False
+
+
+def _configured_replica():
+    alias = getattr(settings, "REPLICA_DATABASE_ALIAS", "replica")
+    return alias if alias in settings.DATABASES else None
+
+
+def replica_alias():
+    """
+    The configured replica alias, or None when only `default` exists. Also
+    None without a shared cache: pins would then stay in the worker that
+    took the write, and the user's next request could read stale rows from
+    another worker.
+    """
+    alias = _configured_replica()
+    return alias if alias and cache_is_shared() else None
+
+
+def check_replica_cache(app_configs, **kwargs):
+    """System check: a configured replica is unused until the cache is shared"""
+    if _configured_replica() and not cache_is_shared():
+        return [checks.Warning(
+            "The read replica is configured but unused: read-your-writes pins need a shared cache.",
+            hint="Point CACHE_BACKEND at Redis or Memcached.",
+            id="Paymagics_API.W001",
+        )]
+    return []
+
+
+# ----------------------------- read-your-writes pins
+
+def _pin_key(user_id):
+    return f"replica_pin:{user_id}"
+
+
+def pin_to_primary(user):
+    """Send `user`'s replica reads to default for REPLICA_PIN_SECONDS, until the replica has caught up"""
+    timeout = getattr(settings, "REPLICA_PIN_SECONDS", 5)
+    if timeout > 0 and user is not None and user.is_authenticated:
+        cache.set(_pin_key(user.pk), True, timeout)
+
+
+def is_pinned(user):
+    return user is not None and user.is_authenticated and bool(cache.get(_pin_key(user.pk)))
+
+
+# ----------------------------- scopes
+
+@contextmanager
+def tracking_writes():
+    """Open a routing scope (reads on default) and yield it; `.wrote` tells if it wrote"""
+    state = RoutingState()
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def replica_reads(user=None):
+    """
+    Route the block's reads to the replica, unless `user` wrote recently.
+    Reads inside a transaction, or after the block has itself written,
+    stay on default.
+    """
+    alias = replica_alias()
+    state = _state.get()
+    if state is None:
+        with tracking_writes() as state:
+            if alias and not is_pinned(user):
+                state.read_alias = alias
+            yield state
+        return
+
+    previous = state.read_alias
+    if alias and not is_pinned(user):
+        state.read_alias = alias
+    try:
+        yield state
+    finally:
+        state.read_alias = previous
+
+
+def replica_view(view):
+    """
+    Serve a read-only function view from the replica. Goes directly above
+    the view function, under @api_view, so the user is already authenticated.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with replica_reads(getattr(request, "user", None)):
+            return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaPinMiddleware:
+    """
+    Tracks writes per request and pins the user to default afterwards, so
+    the next reads they make see their own changes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with tracking_writes() as state:
+            response = self.get_response(request)
+        if state.wrote:
+            pin_to_primary(getattr(request, "user", None))
+        return response
+
+
+# ----------------------------- router
+
+class ReplicaRouter:
+    """
+    Writes always go to default. Reads go to the replica only inside a
+    replica_reads() scope (replica_view endpoints and export jobs) that has
+    not written yet and is not inside a transaction.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.read_alias is None or state.wrote:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return state.read_alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as default
+        return True
@@ -0,0 +1,19 @@
+"""
+MySQL backend with an in-process connection pool (Paymagics_API.db_connections).
+Selected by settings when DB_CONN_POOL is on; Django only pools PostgreSQL natively.
+Experimental: not yet exercised against a real MySQL server.
+"""
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+
+from Paymagics_API.db_connections import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, MySQLDatabaseWrapper):
+    unpooled_engine = "django.db.backends.mysql"
+
+    def is_raw_connection_alive(self, raw):
+        try:
+            raw.ping()
+            return True
+        except Exception:
+            return False
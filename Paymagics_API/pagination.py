@@ -0,0 +1,61 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+PAGE_SIZE = 15
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination ordered by -id.
+
+    Pages are fetched with `WHERE id < last_seen ORDER BY -id LIMIT n`, so deep
+    pages cost the same as the first one. The total count is skipped unless
+    the client asks for it with ?include_count=true.
+
+    The -id ordering replaces whatever the queryset was ordered by, so
+    endpoints returning ranked results (payee search with a query) must
+    refuse cursor mode rather than silently drop the ranking.
+    """
+    page_size = PAGE_SIZE
+    ordering = "-id"
+    count_query_param = "include_count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param, "").lower() == "true":
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data["count"] = self.count
+        return response
+
+
+def cursor_requested(request):
+    """Whether the client asked for keyset pagination"""
+    params = request.query_params
+    return params.get("pagination") == "cursor" or KeysetPagination.cursor_query_param in params
+
+
+def get_paginator(request, page_size=PAGE_SIZE):
+    """
+    Pick the pagination mode for a request.
+
+    ?pagination=cursor (or any request already carrying a ?cursor=) gets
+    keyset pagination; everything else keeps the page-number behaviour that
+    existing clients rely on.
+    """
+    if cursor_requested(request):
+        paginator = KeysetPagination()
+    else:
+        paginator = PageNumberPagination()
+    paginator.page_size = page_size
+    return paginator
+
+
+def get_total_count(paginator):
+    """Total row count already known to the paginator, without another COUNT(*)"""
+    if isinstance(paginator, KeysetPagination):
+        return paginator.count
+    return paginator.page.paginator.count
@@ -0,0 +1,45 @@
+from django.db.models import QuerySet, prefetch_related_objects
+
+
+class EagerLoadingMixin:
+    """
+    Serializer mixin that loads the relations a serializer reads up front.
+
+    Declare the relations on the serializer:
+
+        select_related_fields = ("payee",)
+        prefetch_related_fields = ("categories",)
+
+    With many=True the serializer applies them itself: a QuerySet gets
+    select_related()/prefetch_related() added before it is evaluated, and an
+    already evaluated page (a list, as paginators return) is prefetched in
+    place. Either way a page costs a fixed number of queries instead of 1 + N.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        return queryset
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        if args:
+            args = (cls._eager_load(args[0]),) + args[1:]
+        elif "instance" in kwargs:
+            kwargs["instance"] = cls._eager_load(kwargs["instance"])
+        return super().many_init(*args, **kwargs)
+
+    @classmethod
+    def _eager_load(cls, instance):
+        if isinstance(instance, QuerySet):
+            return cls.setup_eager_loading(instance)
+
+        lookups = cls.select_related_fields + cls.prefetch_related_fields
+        if isinstance(instance, list) and instance and lookups:
+            prefetch_related_objects(instance, *lookups)
+        return instance
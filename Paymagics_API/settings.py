@@ -38,12 +38,15 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt.token_blacklist',
     'django_filters',
     'Bank',
+    'Jobs',
+    'Outbox',
+    'Codes',
 ]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-        "rest_framework.authentication.SessionAuthentication",
+        "Paymagics_Admin.authentication.ProfileJWTAuthentication",
+        "Paymagics_Admin.authentication.ProfileSessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -58,6 +61,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'Paymagics_Admin.authentication.ProfileMiddleware',
+    'Paymagics_API.db_router.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -119,6 +124,11 @@ DATABASES = {
 }
 """
 
+# Seconds a worker keeps its DB connection open across requests (0 = connect per request),
+# and whether a reused connection is checked before the request that picks it up.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
 DATABASES = {
     'default': {
         'ENGINE': config('DB_ENGINE'),
@@ -127,12 +137,65 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST'),
         'PORT': config('DB_PORT'),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
         }
     }
 }
 
+# Optional read replica for the dashboard, search, batch and export endpoints
+# (Paymagics_API.db_router). Set DB_REPLICA_HOST, or DB_REPLICA_NAME for a
+# second SQLite file; unset fields are taken from the default database.
+# Read-your-writes pins live in the cache, so the replica is only used with a
+# shared CACHE_BACKEND (see SHARED_CACHE below).
+REPLICA_DATABASE_ALIAS = 'replica'
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+DB_REPLICA_NAME = config('DB_REPLICA_NAME', default='')
+if DB_REPLICA_HOST or DB_REPLICA_NAME:
+    DATABASES[REPLICA_DATABASE_ALIAS] = {
+        **DATABASES['default'],
+        'NAME': DB_REPLICA_NAME or DATABASES['default']['NAME'],
+        'USER': config('DB_REPLICA_USER', default=DATABASES['default']['USER']),
+        'PASSWORD': config('DB_REPLICA_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        'HOST': DB_REPLICA_HOST or DATABASES['default']['HOST'],
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        # Tests read a server replica through the default test database. A SQLite replica
+        # gets a test database of its own, so the router tests can tell the two apart.
+        'TEST': {} if 'sqlite' in DATABASES['default']['ENGINE'] else {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['Paymagics_API.db_router.ReplicaRouter']
+
+# Connection pooling (Paymagics_API.db_connections): shared per process instead of one
+# connection per thread. MySQL uses the Paymagics_API.mysql_pool backend, PostgreSQL its
+# native pool. Under ASGI (Paymagics_API.asgi sets DJANGO_ASGI) every request runs on a
+# fresh thread, so persistent connections would leak; without a pool they are turned off.
+# DB_CONN_POOL is experimental and stays off by default: the MySQL pool is unit-tested
+# against fake connections only and has not yet been run against a real MySQL server.
+DJANGO_ASGI = config('DJANGO_ASGI', default=False, cast=bool)
+DB_CONN_POOL = config('DB_CONN_POOL', default=False, cast=bool)
+DB_CONN_POOL_MIN_SIZE = config('DB_CONN_POOL_MIN_SIZE', default=2, cast=int)
+DB_CONN_POOL_MAX_SIZE = config('DB_CONN_POOL_MAX_SIZE', default=10, cast=int)
+# Open connections (and fill pools) when the WSGI/ASGI app loads rather than on the first requests
+DB_WARM_UP = config('DB_WARM_UP', default=True, cast=bool)
+
+for _database in DATABASES.values():
+    _poolable = _database['ENGINE'].endswith(('mysql', 'postgresql'))
+    if DB_CONN_POOL and _poolable:
+        if _database['ENGINE'].endswith('mysql'):
+            _database['ENGINE'] = 'Paymagics_API.mysql_pool'
+        _database['OPTIONS'] = {
+            **_database['OPTIONS'],
+            'pool': {'min_size': DB_CONN_POOL_MIN_SIZE, 'max_size': DB_CONN_POOL_MAX_SIZE},
+        }
+        _database['CONN_MAX_AGE'] = 0
+    elif DJANGO_ASGI:
+        _database['CONN_MAX_AGE'] = 0
+# Seconds a user's replica reads go to default after they write, to cover replication lag
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=float)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -152,6 +215,17 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Django's defaults, with PBKDF2-SHA256 swapped for a subclass whose iteration count comes
+# from PASSWORD_PBKDF2_ITERATIONS. Hashes made with another count are re-hashed on login.
+PASSWORD_HASHERS = [
+    'Paymagics_Admin.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', default=1000000, cast=int)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
@@ -170,6 +244,23 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded files (payee imports) and generated artifacts
+MEDIA_URL = 'media/'
+MEDIA_ROOT = config('MEDIA_ROOT', default=str(BASE_DIR / 'media'))
+
+# "exports" holds cached batch workbooks; point it at any storage backend
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'exports': {
+        'BACKEND': config('EXPORT_STORAGE_BACKEND', default='django.core.files.storage.FileSystemStorage'),
+        'OPTIONS': {'location': config('EXPORT_CACHE_ROOT', default=str(Path(MEDIA_ROOT) / 'export_cache'))},
+    },
+}
+
+# Least recently downloaded exports are evicted once the cache grows past this
+EXPORT_CACHE_MAX_BYTES = config('EXPORT_CACHE_MAX_BYTES', default=1024 ** 3, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -187,15 +278,82 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
-    'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'AUTH_TOKEN_CLASSES': ('Paymagics_Admin.tokens.RoleAccessToken',),
+    'TOKEN_REFRESH_SERIALIZER': 'Paymagics_Admin.serializers.RoleTokenRefreshSerializer',
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
 
-EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+# Mail is written to the Outbox table in the request's transaction and delivered by
+# python manage.py send_outbox through OUTBOX_DELIVERY_BACKEND (locmem/console for tests).
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='Outbox.backends.OutboxBackend')
+OUTBOX_DELIVERY_BACKEND = config('OUTBOX_DELIVERY_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+# Like JOBS_RUN_INLINE: deliver right after the request commits, without a sender process
+OUTBOX_SEND_INLINE = config('OUTBOX_SEND_INLINE', default=False, cast=bool)
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=50, cast=int)
+OUTBOX_POLL_INTERVAL = config('OUTBOX_POLL_INTERVAL', default=2, cast=float)
+# Base retry delay in seconds, doubled after every failed attempt
+OUTBOX_RETRY_DELAY = config('OUTBOX_RETRY_DELAY', default=60, cast=int)
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
 EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
 EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default=EMAIL_HOST_USER)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='paymagics'),
+    }
+}
+
+# The locmem default is per process: a worker never sees invalidations made by another.
+# Deployments with more than one process need a shared CACHE_BACKEND (Redis/Memcached);
+# without one, the caches below default to short lifetimes.
+SHARED_CACHE = not CACHES['default']['BACKEND'].endswith('.LocMemCache')
+
+# Seconds a dashboard snapshot may be served from cache; writes invalidate it sooner
+DASHBOARD_CACHE_TIMEOUT = config('DASHBOARD_CACHE_TIMEOUT', default=30, cast=int)
+
+
+# Background jobs (python manage.py run_jobs)
+# JOBS_RUN_INLINE runs each job in the web process right after its request commits;
+# handy locally, but production should leave it off and run workers.
+JOBS_RUN_INLINE = config('JOBS_RUN_INLINE', default=False, cast=bool)
+JOBS_POLL_INTERVAL = config('JOBS_POLL_INTERVAL', default=2, cast=float)
+# A running job's worker refreshes its lock every JOBS_HEARTBEAT_INTERVAL seconds; a job
+# whose lock is older than JOBS_LOCK_TIMEOUT is assumed orphaned and requeued.
+JOBS_HEARTBEAT_INTERVAL = config('JOBS_HEARTBEAT_INTERVAL', default=60, cast=float)
+JOBS_LOCK_TIMEOUT = config('JOBS_LOCK_TIMEOUT', default=900, cast=int)
+
+# Seconds a PaymentTemplate stays cached; saves and deletes invalidate it sooner, but only
+# for every worker when SHARED_CACHE. Otherwise this is how stale other workers may get.
+TEMPLATE_CACHE_TIMEOUT = config('TEMPLATE_CACHE_TIMEOUT', default=3600 if SHARED_CACHE else 30, cast=int)
+
+# Seconds an authenticated user + profile is reused per access token; 0 loads them on every request.
+# Writes to either invalidate it sooner on every worker only when SHARED_CACHE.
+AUTH_PROFILE_CACHE_TIMEOUT = config('AUTH_PROFILE_CACHE_TIMEOUT', default=60 if SHARED_CACHE else 5, cast=int)
+
+# Access tokens without a session claim (minted by the stock refresh view before
+# RoleTokenRefreshSerializer) can't be revoked by logout. They are accepted until this
+# moment, one ACCESS_TOKEN_LIFETIME after the serializer shipped, and refused after it.
+TOKEN_SESSION_CLAIM_REQUIRED_FROM = config('TOKEN_SESSION_CLAIM_REQUIRED_FROM', default='2026-10-26T00:00:00+00:00')
+
+# Seconds between checks for logouts made by other processes; access tokens of a
+# logged-out session stop working on every worker within this window. Without
+# SHARED_CACHE every check reloads the blacklist from the database.
+TOKEN_BLACKLIST_CHECK_INTERVAL = config('TOKEN_BLACKLIST_CHECK_INTERVAL', default=5, cast=float)
+
+# OutstandingToken rows written per bulk insert at login (1 = one insert per login), and the
+# longest a row may wait for its batch. Unflushed rows are lost if a process is killed.
+TOKEN_OUTSTANDING_BATCH_SIZE = config('TOKEN_OUTSTANDING_BATCH_SIZE', default=1, cast=int)
+TOKEN_OUTSTANDING_FLUSH_INTERVAL = config('TOKEN_OUTSTANDING_FLUSH_INTERVAL', default=2, cast=float)
+
+# Key for the permutation that turns sequence numbers into referral and ben codes (Codes.generator).
+# Never change it once codes are issued: a new key can repeat codes already handed out.
+CODE_SECRET = config('CODE_SECRET', default=SECRET_KEY)
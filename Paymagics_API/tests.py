@@ -0,0 +1,251 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from Paymagics_Payor.models import Category, Payee
+from Paymagics_PayorStaff.models import PaymentTemplate
+from Paymagics_PayorStaff.template_cache import get_cached_template, get_cached_template_data
+
+from . import db_connections
+from .cache_versions import cache_is_shared
+from .db_connections import ConnectionPool, PooledDatabaseWrapperMixin
+from .db_router import check_replica_cache, replica_reads
+
+REPLICA = settings.REPLICA_DATABASE_ALIAS
+
+
+@skipUnless(
+    REPLICA in settings.DATABASES
+    and not settings.DATABASES[REPLICA].get("TEST", {}).get("MIRROR")
+    and cache_is_shared(),
+    "Needs a separate replica database and a shared cache, e.g. DB_ENGINE=django.db.backends.sqlite3 "
+    "DB_REPLICA_NAME=replica.sqlite3 CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache "
+    "CACHE_LOCATION=/tmp/paymagics-cache",
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Runs against two SQLite databases. Each side holds a category the other
+    lacks, so a response shows which database served it.
+    """
+    # Only the aliases that exist, since the runner sets up databases for skipped classes too
+    databases = {DEFAULT_DB_ALIAS, REPLICA} & set(settings.DATABASES)
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        Category.objects.create(category="Primary")
+        Category.objects.using(REPLICA).create(category="Replica")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def search_categories(self):
+        response = self.client.get(reverse("search_categories"))
+        self.assertEqual(response.status_code, 200)
+        return sorted(category["category"] for category in response.data)
+
+    def create_category(self, name):
+        response = self.client.post(reverse("create_edit_list"), {"category": name}, format="json")
+        self.assertLess(response.status_code, 400, response.data)
+
+    def test_read_endpoint_uses_replica(self):
+        self.assertEqual(self.search_categories(), ["Replica"])
+
+    def test_reads_follow_own_writes(self):
+        self.create_category("New")
+        self.assertEqual(self.search_categories(), ["New", "Primary"])
+
+    def test_pin_lapses(self):
+        self.create_category("New")
+        cache.clear()
+        self.assertEqual(self.search_categories(), ["Replica"])
+
+    def test_other_users_stay_on_replica(self):
+        self.create_category("New")
+        self.client.force_authenticate(User.objects.create_user("other"))
+        self.assertEqual(self.search_categories(), ["Replica"])
+
+    def test_reads_after_a_write_in_scope_use_default(self):
+        with replica_reads():
+            self.assertEqual(Category.objects.all().db, REPLICA)
+            Category.objects.create(category="Written")
+            self.assertEqual(Category.objects.all().db, DEFAULT_DB_ALIAS)
+
+    def test_reads_inside_a_transaction_use_default(self):
+        with replica_reads(), transaction.atomic():
+            self.assertEqual(Category.objects.all().db, DEFAULT_DB_ALIAS)
+
+    def test_reads_outside_a_scope_use_default(self):
+        self.assertEqual(Category.objects.all().db, DEFAULT_DB_ALIAS)
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_replica_unused_without_a_shared_cache(self):
+        self.assertEqual(self.search_categories(), ["Primary"])
+        self.assertEqual([warning.id for warning in check_replica_cache(None)], ["Paymagics_API.W001"])
+
+    def test_template_cache_fills_from_default(self):
+        template = PaymentTemplate.objects.create(name="Current", created_by=self.admin)
+        User.objects.using(REPLICA).bulk_create([User(id=self.admin.id, username="admin")])
+        stale = PaymentTemplate.objects.using(REPLICA).create(
+            id=template.id, name="Lagging", created_by_id=self.admin.id
+        )
+        with replica_reads():
+            self.assertEqual(get_cached_template(template.id).name, "Current")
+            self.assertEqual(get_cached_template_data(stale)["name"], "Current")
+
+    def test_dashboard_snapshot_fills_from_default(self):
+        Payee.objects.create(ben_code="B1", ben_name="Primary only")
+        response = self.client.get(reverse("admin_dashboard"))
+        self.assertEqual(response.data["counts"]["payees"], 1)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.opened = []
+        self.alive = True
+
+    def connect(self):
+        raw = FakeConnection()
+        self.opened.append(raw)
+        return raw
+
+    def is_alive(self, raw):
+        return self.alive
+
+    def acquire(self, pool):
+        return pool.acquire(self.connect, self.is_alive)
+
+    def test_reuses_released_connection(self):
+        pool = ConnectionPool(max_size=2)
+        raw = self.acquire(pool)
+        pool.release(raw)
+        self.assertIs(self.acquire(pool), raw)
+        self.assertEqual(raw.rollbacks, 1)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_acquire_times_out_when_all_in_use(self):
+        pool = ConnectionPool(max_size=1, timeout=0.05)
+        self.acquire(pool)
+        with self.assertRaises(OperationalError):
+            self.acquire(pool)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_acquire_waits_for_a_release(self):
+        pool = ConnectionPool(max_size=1, timeout=5)
+        raw = self.acquire(pool)
+        threading.Timer(0.05, pool.release, (raw,)).start()
+        self.assertIs(self.acquire(pool), raw)
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = ConnectionPool(max_size=1, timeout=0.05)
+        with self.assertRaises(OperationalError):
+            pool.acquire(mock.Mock(side_effect=OperationalError("down")), self.is_alive)
+        self.assertIsInstance(self.acquire(pool), FakeConnection)
+
+    def test_recycles_connections_past_max_lifetime(self):
+        pool = ConnectionPool(max_size=1, max_lifetime=0.01)
+        raw = self.acquire(pool)
+        pool.release(raw)
+        time.sleep(0.02)
+        replacement = self.acquire(pool)
+        self.assertIsNot(replacement, raw)
+        self.assertTrue(raw.closed)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    @mock.patch.object(db_connections, "POOL_CHECK_IDLE", 0)
+    def test_replaces_dead_idle_connections(self):
+        pool = ConnectionPool(max_size=1)
+        raw = self.acquire(pool)
+        pool.release(raw)
+        self.alive = False
+        self.assertIsNot(self.acquire(pool), raw)
+        self.assertTrue(raw.closed)
+
+    def test_release_with_discard_closes(self):
+        pool = ConnectionPool(max_size=1)
+        raw = self.acquire(pool)
+        pool.release(raw, discard=True)
+        self.assertTrue(raw.closed)
+        self.assertEqual(pool.stats(), {"size": 0, "idle": 0, "max_size": 1})
+
+    def test_forked_child_starts_empty(self):
+        pool = ConnectionPool(max_size=1, timeout=0.05)
+        parents = self.acquire(pool)
+        with mock.patch.object(db_connections.os, "getpid", return_value=os.getpid() + 1):
+            own = self.acquire(pool)
+            self.assertIsNot(own, parents)
+            # The parent's socket is neither rolled back nor closed, nor taken into the pool
+            pool.release(parents)
+            self.assertEqual((parents.rollbacks, parents.closed), (0, False))
+            self.assertEqual(pool.stats()["idle"], 0)
+
+
+class PooledSQLiteWrapper(PooledDatabaseWrapperMixin, SQLiteDatabaseWrapper):
+    pass
+
+
+class PooledWrapperTests(SimpleTestCase):
+    alias = "pool_tests"
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_dict = {
+            **connections[DEFAULT_DB_ALIAS].settings_dict,
+            "NAME": os.path.join(directory.name, "pool.sqlite3"),
+            "OPTIONS": {"pool": {"max_size": 2}},
+        }
+        self.wrapper = PooledSQLiteWrapper(settings_dict, self.alias)
+        # Registered for this thread only, so transaction.atomic(using=...) finds it
+        connections[self.alias] = self.wrapper
+        self.addCleanup(connections.__delitem__, self.alias)
+        self.addCleanup(db_connections._pools.pop, self.alias, None)
+
+    def test_close_returns_connection_to_pool(self):
+        self.wrapper.ensure_connection()
+        raw = self.wrapper.connection
+        self.wrapper.close()
+        self.assertEqual(self.wrapper.pool.stats()["idle"], 1)
+        self.wrapper.ensure_connection()
+        self.assertIs(self.wrapper.connection, raw)
+        self.wrapper.close()
+
+    def test_close_inside_atomic_discards_connection(self):
+        with transaction.atomic(using=self.alias):
+            self.wrapper.close()
+            self.assertEqual(self.wrapper.pool.stats()["size"], 0)
+        self.assertIsNone(self.wrapper.connection)
+        self.wrapper.ensure_connection()
+        self.assertEqual(self.wrapper.pool.stats()["size"], 1)
+        self.wrapper.close()
+
+
+class WarmUpTests(SimpleTestCase):
+    def test_closes_unpooled_connection(self):
+        connection = mock.Mock(settings_dict={"OPTIONS": {}})
+        with mock.patch.object(db_connections, "connections", {DEFAULT_DB_ALIAS: connection}):
+            db_connections.warm_up_connections()
+        connection.ensure_connection.assert_called_once_with()
+        connection.close.assert_called_once_with()
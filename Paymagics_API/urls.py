@@ -8,5 +8,6 @@ urlpatterns = [
     path('api/payorstaff/', include('Paymagics_PayorStaff.urls')),
     
     path('api/bank/', include('Bank.urls')),
+    path('api/jobs/', include('Jobs.urls')),
     
 ]
@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Paymagics_API.settings')
 
 application = get_wsgi_application()
+
+if settings.DB_WARM_UP:
+    from Paymagics_API.db_connections import warm_up_connections
+
+    warm_up_connections()
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class PaymagicsAdminConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Paymagics_Admin'
+
+    def ready(self):
+        from django.core import checks
+        from Paymagics_API.db_router import check_replica_cache
+        from .dashboard import connect_signals
+
+        connect_signals()
+        checks.register(check_replica_cache, checks.Tags.caches)
@@ -0,0 +1,138 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import SessionAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from Paymagics_API.cache_versions import bump_version, get_version
+
+
+def _cache_timeout():
+    return getattr(settings, "AUTH_PROFILE_CACHE_TIMEOUT", 60)
+
+
+def _version_key(user_id):
+    return f"auth_user:{user_id}:version"
+
+
+def load_user(user_id, jti=None):
+    """
+    User with its profile joined in, in one query. With a cache timeout set,
+    the pair is kept per user and token; any write to either bumps the user's
+    version and so drops every cached copy. The bump only reaches other
+    workers through a shared cache; with locmem the timeout bounds staleness.
+    Raises User.DoesNotExist.
+    """
+    User = get_user_model()
+    query = User.objects.select_related("profile")
+    timeout = _cache_timeout()
+
+    if not timeout:
+        return query.get(**{api_settings.USER_ID_FIELD: user_id})
+
+    key = f"auth_user:{user_id}:{get_version(_version_key(user_id))}:{jti}"
+    user = cache.get(key)
+    if user is None:
+        user = query.get(**{api_settings.USER_ID_FIELD: user_id})
+        cache.set(key, user, timeout)
+    return user
+
+
+def get_user_profile(user):
+    """The user's UserProfile, or None (anonymous users, accounts without one)"""
+    if user is None or not user.is_authenticated:
+        return None
+    try:
+        return user.profile
+    except get_user_model().profile.RelatedObjectDoesNotExist:
+        return None
+
+
+def request_profile(request):
+    """
+    request.profile, or a lookup for users authenticated some other way
+    (force_authenticate in tests, custom authentication classes)
+    """
+    profile = getattr(request, "profile", None)
+    if profile is None:
+        profile = get_user_profile(getattr(request, "user", None))
+    return profile
+
+
+def attach_profile(request, user):
+    # On the DRF request and the Django request underneath it, so both see it
+    profile = get_user_profile(user)
+    request.profile = profile
+    django_request = getattr(request, "_request", None)
+    if django_request is not None:
+        django_request.profile = profile
+
+
+def invalidate_auth_user(user_id):
+    if user_id is None:
+        return
+    # After commit, so a concurrent request can't cache the old row under the new version
+    transaction.on_commit(lambda: bump_version(_version_key(user_id)))
+
+
+class ProfileJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that loads the user and profile together (see
+    load_user) and sets request.profile for the view.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            attach_profile(request, result[0])
+        return result
+
+    def get_user(self, validated_token):
+        # Same checks as JWTAuthentication.get_user; only the lookup differs
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        try:
+            user = load_user(user_id, validated_token.get(api_settings.JTI_CLAIM))
+        except get_user_model().DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+class ProfileSessionAuthentication(SessionAuthentication):
+    """SessionAuthentication that also sets request.profile"""
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            attach_profile(request, result[0])
+        return result
+
+
+class ProfileMiddleware:
+    """
+    Gives every request a request.profile (None until an API authentication
+    class resolves it), so views can read it without checking hasattr().
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.profile = None
+        return self.get_response(request)
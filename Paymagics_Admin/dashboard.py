@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Func, Max, Min, Q, Subquery
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import timezone
+
+from .models import UserProfile, UserRole
+
+
+DASHBOARD_CACHE_KEY = "dashboard:admin_snapshot"
+LIST_COUNTS_CACHE_KEY = "dashboard:list_counts"
+
+# Models whose writes make the cached dashboard numbers stale
+DASHBOARD_SENDERS = (
+    User,
+    UserProfile,
+    "Paymagics_Payor.Payee",
+    "Paymagics_Payor.Category",
+)
+
+
+def _cache_timeout():
+    return getattr(settings, "DASHBOARD_CACHE_TIMEOUT", 30)
+
+
+def _count(queryset):
+    """COUNT(*) of `queryset` as a scalar subquery"""
+    return Subquery(queryset.order_by().values(count=Func("pk", function="COUNT")).values("count"))
+
+
+def _latest(queryset, field):
+    """`field` of the newest row of `queryset` as a scalar subquery"""
+    return Subquery(queryset.order_by("-created_at").values(field)[:1])
+
+
+def build_admin_snapshot():
+    """
+    Collect every admin dashboard number in one query. Always reads the
+    primary: the result is cached, and a lagging replica would stay visible
+    for the whole timeout.
+    """
+    from Paymagics_Payor.models import Payee
+
+    profile_counts = UserProfile.objects.using(DEFAULT_DB_ALIAS).aggregate(
+        payors=Count("id", filter=Q(role=UserRole.PAYOR, user__is_active=True)),
+        payor_staff=Count("id", filter=Q(role=UserRole.PAYOR_STAFF, user__is_active=True)),
+        active=Count("id", filter=Q(user__is_active=True)),
+        inactive=Count("id", filter=Q(user__is_active=False)),
+        confirmed=Count("id", filter=Q(is_confirmed=True)),
+        not_confirmed=Count("id", filter=Q(is_confirmed=False)),
+        otp_verified=Count("id", filter=Q(is_otp_verified=True)),
+        otp_not_verified=Count("id", filter=Q(is_otp_verified=False)),
+        system_start=Min("created_at"),
+        # The rest don't depend on the profile rows; Max() only lets aggregate() select them
+        payees=Max(_count(Payee.objects.filter(is_active=True))),
+        active_sessions=Max(_count(Session.objects.filter(expire_date__gte=timezone.now()))),
+        new_employee=Max(_latest(UserProfile.objects.all(), "username")),
+    )
+
+    # Aggregates over no profiles come back NULL
+    payees = profile_counts.pop("payees") or 0
+    active_sessions = profile_counts.pop("active_sessions") or 0
+
+    return {
+        "profile_counts": profile_counts,
+        "payees": payees,
+        "active_sessions": active_sessions,
+        # PaymentTemplate has no description, which this has always reported
+        "last_payroll": None,
+        "new_employee": profile_counts.pop("new_employee"),
+    }
+
+
+def get_admin_snapshot():
+    snapshot = cache.get(DASHBOARD_CACHE_KEY)
+    if snapshot is None:
+        snapshot = build_admin_snapshot()
+        cache.set(DASHBOARD_CACHE_KEY, snapshot, _cache_timeout())
+    return snapshot
+
+
+def build_list_counts():
+    """Category and payee totals for the payor dashboard in two queries, from the primary like the snapshot"""
+    from Paymagics_Payor.models import Category, Payee
+
+    category_counts = Category.objects.using(DEFAULT_DB_ALIAS).aggregate(
+        total_lists=Count("id", distinct=True),
+        # Active categories: categories with at least one active payee
+        active_lists=Count("id", filter=Q(payees__is_active=True), distinct=True),
+    )
+
+    return {
+        "total_lists": category_counts["total_lists"],
+        "active_lists": category_counts["active_lists"],
+        "total_payees": Payee.objects.using(DEFAULT_DB_ALIAS).filter(is_active=True).count(),
+    }
+
+
+def get_list_counts():
+    counts = cache.get(LIST_COUNTS_CACHE_KEY)
+    if counts is None:
+        counts = build_list_counts()
+        cache.set(LIST_COUNTS_CACHE_KEY, counts, _cache_timeout())
+    return counts
+
+
+def invalidate_dashboard(**kwargs):
+    cache.delete_many([DASHBOARD_CACHE_KEY, LIST_COUNTS_CACHE_KEY])
+
+
+def connect_signals():
+    for sender in DASHBOARD_SENDERS:
+        post_save.connect(invalidate_dashboard, sender=sender, dispatch_uid=f"dashboard_save_{sender}")
+        post_delete.connect(invalidate_dashboard, sender=sender, dispatch_uid=f"dashboard_delete_{sender}")
+    m2m_changed.connect(
+        invalidate_dashboard,
+        sender="Paymagics_Payor.Payee_categories",
+        dispatch_uid="dashboard_payee_categories",
+    )
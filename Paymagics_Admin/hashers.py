@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with its work factor taken from PASSWORD_PBKDF2_ITERATIONS.
+
+    It keeps the "pbkdf2_sha256" algorithm name, so existing hashes still
+    verify. Any hash made with a different iteration count reports
+    must_update, and check_password re-hashes it on the user's next login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, "PASSWORD_PBKDF2_ITERATIONS", PBKDF2PasswordHasher.iterations)
@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_login_failed
+
+
+def authenticate_login(request, username, password):
+    """
+    What authenticate() does with ModelBackend, with the profile fetched in
+    the same query as the user. Returns the user or None.
+
+    A password hashed with outdated parameters is re-hashed on success (see
+    ConfigurablePBKDF2PasswordHasher).
+    """
+    User = get_user_model()
+    user = None
+
+    if username is not None and password is not None:
+        user = (
+            User._default_manager.select_related("profile")
+            .filter(**{User.USERNAME_FIELD: username})
+            .first()
+        )
+
+    if user is None:
+        if password is not None:
+            # Hash anyway so an unknown username takes as long as a wrong password
+            User().set_password(password)
+    elif user.check_password(password) and user.is_active:
+        return user
+
+    user_login_failed.send(sender=__name__, credentials={"username": username}, request=request)
+    return None
@@ -0,0 +1,100 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.utils import load_backend
+
+from Paymagics_API.db_connections import PooledDatabaseWrapperMixin
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure what connection handling costs per request: a new connection "
+        "per request (no CONN_MAX_AGE), a persistent connection, and the pool "
+        "when one is configured. Each simulated request runs the same "
+        "open/close hooks Django runs around a real one, plus SELECT 1."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Simulated requests per mode.")
+        parser.add_argument("--database", default="default", help="Database alias to measure.")
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        if alias not in connections:
+            raise CommandError(f"Unknown database alias '{alias}'")
+
+        configured = connections[alias].settings_dict
+        unpooled = {
+            **configured,
+            "ENGINE": self.unpooled_engine(alias),
+            "OPTIONS": {k: v for k, v in configured["OPTIONS"].items() if k != "pool"},
+        }
+
+        modes = [
+            ("New connection per request", {**unpooled, "CONN_MAX_AGE": 0}),
+            ("Persistent connection", {**unpooled, "CONN_MAX_AGE": max(configured["CONN_MAX_AGE"] or 0, 60)}),
+        ]
+        if configured["OPTIONS"].get("pool"):
+            modes.append(("Pooled", configured))
+
+        self.stdout.write(f"Database '{alias}' ({configured['ENGINE']}), {options['requests']} requests per mode")
+        for label, settings_dict in modes:
+            self.report(label, *self.run(alias, settings_dict, options["requests"]))
+
+    def unpooled_engine(self, alias):
+        wrapper = connections[alias]
+        if isinstance(wrapper, PooledDatabaseWrapperMixin) and wrapper.unpooled_engine:
+            return wrapper.unpooled_engine
+        return wrapper.settings_dict["ENGINE"]
+
+    def run(self, alias, settings_dict, requests):
+        backend = load_backend(settings_dict["ENGINE"])
+        wrapper = backend.DatabaseWrapper(settings_dict, alias)
+        opened = []
+
+        # connect() also runs for pool checkouts, so pooled runs count the pool's growth instead
+        pool = getattr(wrapper, "pool", None) if isinstance(wrapper, PooledDatabaseWrapperMixin) else None
+
+        def count(sender, connection, **kwargs):
+            if connection is wrapper:
+                opened.append(1)
+
+        def request():
+            # What close_old_connections() does on request_started / request_finished
+            wrapper.close_if_unusable_or_obsolete()
+            with wrapper.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            wrapper.close_if_unusable_or_obsolete()
+
+        connection_created.connect(count)
+        try:
+            request()
+            opened.clear()
+            pool_size = pool.stats()["size"] if pool else 0
+
+            latencies = []
+            for _ in range(requests):
+                begin = time.perf_counter()
+                request()
+                latencies.append(time.perf_counter() - begin)
+        finally:
+            connection_created.disconnect(count)
+            wrapper.close()
+
+        if pool:
+            return latencies, pool.stats()["size"] - pool_size
+        return latencies, len(opened)
+
+    def report(self, label, latencies, opened):
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+
+        mean = sum(latencies) / len(latencies) * 1000
+        self.stdout.write(f"\n{label}")
+        self.stdout.write(f"  Latency mean/p50/p95: {mean:.2f} / {percentile(0.50):.2f} / {percentile(0.95):.2f} ms")
+        self.stdout.write(f"  Connections set up:   {opened}")
@@ -0,0 +1,88 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory
+
+from Paymagics_Admin.models import UserRole
+from Paymagics_Admin.tokens import outstanding_tokens
+from Paymagics_Admin.views import login
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure logins per second through the login view in this single process "
+        "(i.e. per core). Test users are created and rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=10, help="How long to keep logging in.")
+        parser.add_argument("--users", type=int, default=20, help="Distinct payor accounts to log in as, round robin.")
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=None,
+            help="PASSWORD_PBKDF2_ITERATIONS for the run (default: the configured value).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="TOKEN_OUTSTANDING_BATCH_SIZE for the run (default: the configured value).",
+        )
+
+    def handle(self, *args, **options):
+        overrides = {}
+        if options["iterations"] is not None:
+            overrides["PASSWORD_PBKDF2_ITERATIONS"] = options["iterations"]
+        if options["batch_size"] is not None:
+            overrides["TOKEN_OUTSTANDING_BATCH_SIZE"] = options["batch_size"]
+
+        with override_settings(**overrides), transaction.atomic():
+            self.run(options["seconds"], options["users"])
+            outstanding_tokens.flush()
+            transaction.set_rollback(True)
+
+    def run(self, seconds, user_count):
+        factory = APIRequestFactory()
+        password = "bench-login-password"
+
+        credentials = []
+        for index in range(user_count):
+            user = User.objects.create_user(f"bench_login_{index}", f"bench_login_{index}@example.com", password)
+            user.profile.role = UserRole.PAYOR
+            user.profile.save(update_fields=["role"])
+            credentials.append({"username": user.username, "password": password})
+
+        def attempt(index):
+            request = factory.post("/api/admin/login/", credentials[index % user_count], format="json")
+            response = login(request)
+            if response.status_code != 200:
+                raise RuntimeError(f"Login failed with {response.status_code}: {response.data}")
+
+        # Warm up, and count the queries one login costs
+        attempt(0)
+        with CaptureQueriesContext(connection) as ctx:
+            attempt(1)
+        queries = len(ctx.captured_queries)
+
+        latencies = []
+        started = time.perf_counter()
+        deadline = started + seconds
+        while time.perf_counter() < deadline:
+            begin = time.perf_counter()
+            attempt(len(latencies))
+            latencies.append(time.perf_counter() - begin)
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+
+        self.stdout.write(f"Logins:           {len(latencies)} in {elapsed:.2f}s")
+        self.stdout.write(f"Logins/sec/core:  {len(latencies) / elapsed:.1f}")
+        self.stdout.write(f"Latency p50/p95/p99: {percentile(0.50):.1f} / {percentile(0.95):.1f} / {percentile(0.99):.1f} ms")
+        self.stdout.write(f"Queries per login: {queries}")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Paymagics_Admin', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='referral_code',
+            field=models.CharField(blank=True, max_length=7, null=True),
+        ),
+    ]
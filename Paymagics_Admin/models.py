@@ -1,6 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
  
  
@@ -24,7 +24,7 @@ class UserProfile(models.Model):
  
     is_confirmed = models.BooleanField(default=False)
     is_otp_verified = models.BooleanField(default=False)
-    referral_code = models.CharField(max_length=6, blank=True, null=True)
+    referral_code = models.CharField(max_length=7, blank=True, null=True)
     created_by = models.ForeignKey(
         "self",
         on_delete=models.CASCADE,
@@ -59,6 +59,11 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
     Automatically create or update a UserProfile for every User,
     including admin/superuser accounts.
     """
+    from .authentication import invalidate_auth_user
+
+    # Password, is_active and name changes must reach cached logins too
+    invalidate_auth_user(instance.pk)
+
     if created:
         role = UserRole.ADMIN if instance.is_superuser or instance.is_staff else UserRole.PAYEE
  
@@ -91,4 +96,13 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
                 role=role,
                 is_confirmed=True,
                 is_otp_verified=True
-            )
\ No newline at end of file
+            )
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_delete, sender=User)
+def invalidate_cached_login(sender, instance, **kwargs):
+    from .authentication import invalidate_auth_user
+
+    invalidate_auth_user(getattr(instance, "user_id", instance.pk))
@@ -0,0 +1,51 @@
+from rest_framework.permissions import BasePermission
+
+from .authentication import request_profile
+from .models import UserRole
+from .tokens import resolve_role
+
+
+def request_role(request):
+    """
+    The caller's role from the access token's signed claims. Session logins
+    and tokens issued before roles were embedded fall back to the user and
+    profile loaded during authentication.
+    """
+    token = request.auth
+    if token is not None and hasattr(token, "get") and "role" in token:
+        return token.get("role")
+    return resolve_role(request.user, request_profile(request))[0]
+
+
+def request_payor_id(request):
+    """The payor the caller acts for (their own profile, or their creator for staff)"""
+    token = request.auth
+    if token is not None and hasattr(token, "get") and "payor_id" in token:
+        return token.get("payor_id")
+    return resolve_role(request.user, request_profile(request))[1]
+
+
+class HasRole(BasePermission):
+    """Allows authenticated callers whose role is in `roles`"""
+    roles = ()
+
+    def has_permission(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return False
+        return request_role(request) in self.roles
+
+
+class IsAdminRole(HasRole):
+    roles = (UserRole.ADMIN,)
+
+
+class IsPayorRole(HasRole):
+    roles = (UserRole.PAYOR,)
+
+
+class IsPayorStaffRole(HasRole):
+    roles = (UserRole.PAYOR_STAFF,)
+
+
+class IsPayorOrStaffRole(HasRole):
+    roles = (UserRole.PAYOR, UserRole.PAYOR_STAFF)
@@ -1,6 +1,11 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from .models import UserProfile,UserRole
+from .authentication import get_user_profile
+from .tokens import RoleRefreshToken, revoke_refresh_token
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
@@ -97,4 +102,37 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
         user = self.validated_data["user"]
         user.set_password(password)
         user.save()
-        return user
\ No newline at end of file
+        return user
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    TokenRefreshSerializer for RoleRefreshToken (SIMPLE_JWT's TOKEN_REFRESH_SERIALIZER).
+    Role claims are read again from the database, so role changes apply on
+    the next refresh, and the new access token carries the session claim
+    that logout revokes.
+    """
+    token_class = RoleRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = User.objects.select_related("profile").filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        refresh.set_role_claims(user, get_user_profile(user))
+        data = {}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                revoke_refresh_token(refresh)
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.queue_outstanding()
+            data["refresh"] = str(refresh)
+
+        # After rotation, so the access token belongs to the new session
+        data["access"] = str(refresh.access_token)
+        return data
@@ -1,3 +1,127 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from Paymagics_Admin.models import UserRole
+from Paymagics_Admin.tokens import SESSION_CLAIM, RoleRefreshToken, revoked_sessions
+from Paymagics_Payor.models import Category, Payee
+from testutils.query_budget import QueryBudgetMixin
+
+
+class AdminQueryBudgetTests(QueryBudgetMixin, TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        payor = None
+        for index in range(3):
+            payor = User.objects.create_user(f"payor{index}").profile
+            payor.role, payor.is_confirmed = UserRole.PAYOR, True
+            payor.save()
+            staff = User.objects.create_user(f"staff{index}").profile
+            staff.role, staff.created_by = UserRole.PAYOR_STAFF, payor
+            staff.save()
+            payee = Payee.objects.create(ben_code=f"B{index}", ben_name=f"Vendor {index}", payor=payor)
+            payee.categories.add(Category.objects.create(category=f"List {index}"))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.admin)
+
+    def test_search_payees(self):
+        self.assertWithinQueryBudget("search_payees", data={"q": "vendor"})
+
+    def test_list_payors(self):
+        self.assertWithinQueryBudget("list_payors")
+
+    def test_list_payor_staff(self):
+        self.assertWithinQueryBudget("list-payor-staff")
+
+    def test_admin_dashboard_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("admin_dashboard"))
+        self.assertEqual(response.data["counts"]["payors"], 3)
+        self.assertEqual(response.data["counts"]["payor_staff"], 3)
+        self.assertEqual(response.data["counts"]["payees"], 3)
+        self.assertEqual(response.data["recent_activity"]["new_employee_added"], "staff2")
+        with self.assertNumQueries(0):
+            self.client.get(reverse("admin_dashboard"))
+
+
+# The per-process cache case: other workers' logouts must still be picked up
+@override_settings(
+    TOKEN_BLACKLIST_CHECK_INTERVAL=0,
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+class RevokedSessionsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        revoked_sessions.clear()
+        self.addCleanup(revoked_sessions.clear)
+        self.refresh = RoleRefreshToken.for_user(User.objects.create_user("payor"))
+        self.jti = self.refresh["jti"]
+
+    def test_own_logout_applies_at_once(self):
+        self.assertNotIn(self.jti, revoked_sessions)
+        self.refresh.blacklist()
+        revoked_sessions.add(self.jti)
+        self.assertIn(self.jti, revoked_sessions)
+
+    def test_logout_in_another_process_is_picked_up(self):
+        self.assertNotIn(self.jti, revoked_sessions)
+        # Blacklisted without this process's add() or version bump, as another worker would
+        self.refresh.blacklist()
+        self.assertIn(self.jti, revoked_sessions)
+
+
+class TokenRefreshTests(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        cache.clear()
+        revoked_sessions.clear()
+        self.addCleanup(revoked_sessions.clear)
+        self.user = User.objects.create_user("payor")
+        profile = self.user.profile
+        profile.role = UserRole.PAYOR
+        profile.save()
+        self.refresh = RoleRefreshToken.for_user(self.user, profile)
+
+    def refreshed_access(self):
+        response = self.client.post(reverse("token_refresh"), {"refresh": str(self.refresh)}, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data["access"]
+
+    def get(self, url_name, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        return self.client.get(reverse(url_name))
+
+    def test_refreshed_access_token_is_revoked_by_logout(self):
+        access = self.refreshed_access()
+        self.assertEqual(self.get("view_profile", access).status_code, 200)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        response = self.client.post(reverse("logout"), {"refresh": str(self.refresh)}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.get("view_profile", access).status_code, 401)
+        response = self.client.post(reverse("token_refresh"), {"refresh": str(self.refresh)}, format="json")
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_picks_up_role_changes(self):
+        self.assertEqual(self.get("list_payors", self.refreshed_access()).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.get("list_payors", self.refreshed_access()).status_code, 200)
+
+    def test_access_token_without_session_claim(self):
+        access = self.refresh.access_token
+        del access[SESSION_CLAIM]
+        with override_settings(TOKEN_SESSION_CLAIM_REQUIRED_FROM="2999-01-01T00:00:00+00:00"):
+            self.assertEqual(self.get("view_profile", str(access)).status_code, 200)
+        with override_settings(TOKEN_SESSION_CLAIM_REQUIRED_FROM="2000-01-01T00:00:00+00:00"):
+            self.assertEqual(self.get("view_profile", str(access)).status_code, 401)
@@ -0,0 +1,233 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, BlacklistMixin, RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from Paymagics_API.cache_versions import bump_version, cache_is_shared, get_version
+
+from .models import UserRole
+
+
+logger = logging.getLogger(__name__)
+
+# Access token claim holding the jti of the refresh token it was issued from
+SESSION_CLAIM = "sid"
+
+BLACKLIST_VERSION_KEY = "token_blacklist:version"
+
+
+def resolve_role(user, profile):
+    """(role, payor_id) for a user, as login reports them"""
+    if user.is_superuser or user.is_staff:
+        return UserRole.ADMIN.value, None
+    if profile is None:
+        return None, None
+
+    payor_id = None
+    if profile.role == UserRole.PAYOR:
+        payor_id = profile.id
+    elif profile.role == UserRole.PAYOR_STAFF and profile.created_by_id:
+        payor_id = profile.created_by_id
+    return profile.role, payor_id
+
+
+# ----------------------------- revocation
+
+class RevokedSessions:
+    """
+    Process-local copy of the blacklisted refresh token jtis that haven't
+    expired yet, so checking an access token costs no query.
+
+    The shared cache holds a version that logouts bump; each process looks at
+    it at most every TOKEN_BLACKLIST_CHECK_INTERVAL seconds and reloads the set
+    from token_blacklist when it moved. A per-process cache (locmem) never
+    sees other workers' bumps, so there the set is reloaded on every check.
+    Revocations made in this process apply at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jtis = frozenset()
+        self._version = None
+        self._checked_at = 0.0
+
+    def _check_interval(self):
+        return getattr(settings, "TOKEN_BLACKLIST_CHECK_INTERVAL", 5)
+
+    def _load(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        return frozenset(
+            BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+            .values_list("token__jti", flat=True)
+        )
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < self._check_interval():
+            return
+
+        version = get_version(BLACKLIST_VERSION_KEY)
+        if version != self._version or not cache_is_shared():
+            jtis = self._load()
+            with self._lock:
+                self._jtis = jtis
+                self._version = version
+        self._checked_at = now
+
+    def __contains__(self, jti):
+        self._refresh()
+        return jti in self._jtis
+
+    def add(self, jti):
+        with self._lock:
+            self._jtis = self._jtis | {jti}
+
+    def clear(self):
+        with self._lock:
+            self._jtis = frozenset()
+            self._version = None
+            self._checked_at = 0.0
+
+
+revoked_sessions = RevokedSessions()
+
+
+def revoke_refresh_token(refresh):
+    """Blacklist a refresh token and every access token issued from it"""
+    refresh.blacklist()
+    jti = refresh[api_settings.JTI_CLAIM]
+    revoked_sessions.add(jti)
+    transaction.on_commit(lambda: bump_version(BLACKLIST_VERSION_KEY))
+
+
+# ----------------------------- outstanding tokens
+
+class OutstandingTokenBuffer:
+    """
+    Collects OutstandingToken rows for refresh tokens issued by this process
+    and inserts them with one bulk_create. A flush happens once
+    TOKEN_OUTSTANDING_BATCH_SIZE rows are waiting, once the oldest has waited
+    TOKEN_OUTSTANDING_FLUSH_INTERVAL seconds (checked on the next login), and
+    at interpreter exit. A batch size of 1 writes every row straight away.
+
+    Rows are bookkeeping only: blacklist() get_or_creates the row it needs,
+    so a logout that beats the flush still works, and the later insert
+    skips the jti because of ignore_conflicts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = []
+        self._oldest = None
+
+    def _batch_size(self):
+        return max(getattr(settings, "TOKEN_OUTSTANDING_BATCH_SIZE", 1), 1)
+
+    def _flush_interval(self):
+        return getattr(settings, "TOKEN_OUTSTANDING_FLUSH_INTERVAL", 2)
+
+    def add(self, row):
+        with self._lock:
+            self._rows.append(row)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            due = (
+                len(self._rows) >= self._batch_size()
+                or time.monotonic() - self._oldest >= self._flush_interval()
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+        with self._lock:
+            rows, self._rows, self._oldest = self._rows, [], None
+        if rows:
+            OutstandingToken.objects.bulk_create(rows, ignore_conflicts=True)
+        return len(rows)
+
+
+outstanding_tokens = OutstandingTokenBuffer()
+
+
+@atexit.register
+def _flush_outstanding_tokens():
+    try:
+        outstanding_tokens.flush()
+    except Exception:
+        logger.exception("Could not write buffered outstanding tokens")
+
+
+# ----------------------------- token classes
+
+def _session_claim_required():
+    """Whether the window for access tokens issued without a session claim has closed"""
+    required_from = parse_datetime(getattr(settings, "TOKEN_SESSION_CLAIM_REQUIRED_FROM", "") or "")
+    return required_from is None or timezone.now() >= required_from
+
+
+class RoleAccessToken(AccessToken):
+    """Access token that fails verification once its refresh token is blacklisted"""
+
+    def verify(self):
+        super().verify()
+
+        sid = self.payload.get(SESSION_CLAIM)
+        if sid is None:
+            # Issued by the stock refresh view; logout can't revoke it
+            if _session_claim_required():
+                raise TokenError(_("Token has no session"))
+        elif sid in revoked_sessions:
+            raise TokenError(_("Token is blacklisted"))
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user's role, payor_id and profile_id as signed
+    claims; its access tokens copy them, so permission checks can read the
+    token instead of the database.
+    """
+    access_token_class = RoleAccessToken
+
+    @classmethod
+    def for_user(cls, user, profile=None):
+        # Skip BlacklistMixin.for_user: its OutstandingToken row goes through the buffer instead
+        token = super(BlacklistMixin, cls).for_user(user)
+        token.set_role_claims(user, profile)
+        token.queue_outstanding()
+        return token
+
+    def set_role_claims(self, user, profile):
+        role, payor_id = resolve_role(user, profile)
+        self["role"] = role
+        self["payor_id"] = payor_id
+        self["profile_id"] = profile.pk if profile is not None else None
+
+    def queue_outstanding(self):
+        from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+        outstanding_tokens.add(OutstandingToken(
+            user_id=self.payload.get(api_settings.USER_ID_CLAIM),
+            jti=self[api_settings.JTI_CLAIM],
+            token=str(self),
+            created_at=self.current_time,
+            expires_at=datetime_from_epoch(self["exp"]),
+        ))
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        access[SESSION_CLAIM] = self[api_settings.JTI_CLAIM]
+        return access
@@ -1,19 +1,22 @@
-import random, string
+import random
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework import status
-from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
-from django.contrib.auth import authenticate
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken, TokenError
 from rest_framework.response import Response
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404
 from .models import UserProfile, UserRole
+from .authentication import get_user_profile, request_profile
+from .dashboard import get_admin_snapshot
+from .login import authenticate_login
+from .permissions import IsAdminRole
+from .tokens import RoleRefreshToken, resolve_role, revoke_refresh_token
 from Paymagics_Payor.models import Payee, Category
+from Paymagics_Payor.search import search_payees as search_payee_queryset, search_terms
 from Paymagics_Payor.serializers import PayeeSerializer, CategorySerializer
 from .serializers import CreatePayorSerializer, UserProfileSerializer, CreatePayorStaffSerializer, PasswordResetConfirmSerializer, PasswordResetRequestSerializer
 from django.contrib.auth.hashers import make_password
-from Paymagics_PayorStaff.models import  PaymentTemplate
-from django.contrib.sessions.models import Session
 from django.utils import timezone
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 from django.core.mail import send_mail
@@ -21,7 +24,9 @@ from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.conf import settings
 from django.db.models import Q
-from rest_framework.pagination import PageNumberPagination
+from Paymagics_API.pagination import cursor_requested, get_paginator, get_total_count
+from Paymagics_API.db_router import replica_view
+from Codes.generator import next_code
 
 # ---------------------- LOGIN SECTION ----------------------
 @api_view(["POST"])
@@ -30,20 +35,16 @@ def login(request):
     username = request.data.get("username")
     password = request.data.get("password")
 
-    user = authenticate(username=username, password=password)
+    # User and profile in one query; outdated password hashes are upgraded here
+    user = authenticate_login(request, username, password)
     if not user:
         return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
 
-    role = None
-    payor_id = None
-
     if user.is_superuser or user.is_staff:
-        role = "admin"
         user_profile = None
     else:
-        try:
-            user_profile = UserProfile.objects.get(user=user)
-        except UserProfile.DoesNotExist:
+        user_profile = get_user_profile(user)
+        if user_profile is None:
             return Response({"error": "User profile not found"}, status=status.HTTP_404_NOT_FOUND)
 
         if not user_profile.is_confirmed:
@@ -52,15 +53,9 @@ def login(request):
         if not user_profile.is_otp_verified:
             return Response({"error": "OTP not verified"}, status=status.HTTP_403_FORBIDDEN)
 
-        role = user_profile.role
-
-        if role == UserRole.PAYOR:
-            payor_id = user_profile.id
-
-        if role == UserRole.PAYOR_STAFF and user_profile.created_by:
-            payor_id = user_profile.created_by.id
-
-    refresh = RefreshToken.for_user(user)
+    # Role, payor_id and profile_id travel in the tokens as signed claims
+    role, payor_id = resolve_role(user, user_profile)
+    refresh = RoleRefreshToken.for_user(user, user_profile)
 
     profile_data = UserProfileSerializer(user_profile).data if user_profile else None
 
@@ -83,7 +78,7 @@ def logout(request):
     try:
         refresh_token = request.data.get("refresh")
         token = RefreshToken(refresh_token)
-        token.blacklist() 
+        revoke_refresh_token(token)
         return Response({"message": "Successfully logged out"}, status=status.HTTP_200_OK)
     except TokenError:
         return Response({"error": "Invalid or expired token"}, status=status.HTTP_400_BAD_REQUEST)
@@ -117,7 +112,7 @@ def signup(request):
     if User.objects.filter(email=email).exists():
         return Response({"error": "Email already exists"}, status=status.HTTP_400_BAD_REQUEST)
 
-    referral_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+    referral_code = next_code("referral")
 
     user = User.objects.create(
         username=username,
@@ -197,7 +192,7 @@ def password_reset_confirm(request):
 
 # ---------------------------- LIST UNAPPROVED PAYORS ------------------------
 @api_view(["GET"])
-@permission_classes([IsAdminUser])
+@permission_classes([IsAdminRole])
 def list_unapproved_payors(request):
     unapproved = UserProfile.objects.filter(role=UserRole.PAYOR, is_confirmed=False)
 
@@ -226,7 +221,7 @@ def list_unapproved_payors(request):
 
 # ---------------------------- APPROVE PAYOR ------------------------
 @api_view(["POST"])
-@permission_classes([IsAdminUser])
+@permission_classes([IsAdminRole])
 def approve_payor(request, pk):
     payor = get_object_or_404(UserProfile, id=pk, role=UserRole.PAYOR)
     payor.is_confirmed = True
@@ -244,7 +239,7 @@ def approve_payor(request, pk):
 
 # ---------------------- PAYOR SECTION ----------------------
 @api_view(["POST"])
-@permission_classes([IsAdminUser])
+@permission_classes([IsAdminRole])
 def create_payor(request):
     serializer = CreatePayorSerializer(data=request.data)
     if serializer.is_valid():
@@ -264,7 +259,7 @@ def create_payor(request):
             last_name=serializer.validated_data["last_name"],
         )
 
-        referral_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+        referral_code = next_code("referral")
 
         # Safe version
         profile, _ = UserProfile.objects.get_or_create(user=user)
@@ -287,7 +282,7 @@ def create_payor(request):
 
 
 @api_view(["GET"])
-@permission_classes([IsAdminUser])
+@permission_classes([IsAdminRole])
 def list_payors(request):
     queryset = UserProfile.objects.filter(
         role=UserRole.PAYOR,
@@ -295,23 +290,20 @@ def list_payors(request):
         is_confirmed=True
     ).order_by('-id')
 
-    total_count = queryset.count()  # 👈 Get total number of payors
-
-    paginator = PageNumberPagination()
-    paginator.page_size = 15 
+    paginator = get_paginator(request)
     paginated_queryset = paginator.paginate_queryset(queryset, request)
 
     serializer = UserProfileSerializer(paginated_queryset, many=True)
 
     response = paginator.get_paginated_response(serializer.data)
-    response.data["total_count"] = total_count  # 👈 Add total count to response
+    response.data["total_count"] = get_total_count(paginator)  # 👈 Add total count to response
     return response
 
 
 
 
 @api_view(["PUT", "PATCH"])
-@permission_classes([IsAdminUser])
+@permission_classes([IsAdminRole])
 def update_payor(request, pk):
     profile = get_object_or_404(UserProfile, pk=pk, role=UserRole.PAYOR)
     user = profile.user
@@ -338,7 +330,7 @@ def update_payor(request, pk):
 
 
 @api_view(["DELETE"])
-@permission_classes([IsAdminUser])
+@permission_classes([IsAdminRole])
 def delete_payor(request, pk):
     profile = get_object_or_404(UserProfile, pk=pk, role=UserRole.PAYOR)
     # instead of deleting, set inactive
@@ -349,7 +341,7 @@ def delete_payor(request, pk):
 
 # ---------------------- PAYOR STAFF SECTION ----------------------
 @api_view(["POST"])
-@permission_classes([IsAdminUser])
+@permission_classes([IsAdminRole])
 def create_payor_staff(request):
     serializer = CreatePayorStaffSerializer(data=request.data)
     if serializer.is_valid():
@@ -395,16 +387,13 @@ def list_payor_staff(request):
         user__is_active=True
     ).order_by('-id')
 
-    total_count = queryset.count()  # Get total number of staff
-
-    paginator = PageNumberPagination()
-    paginator.page_size = 15
+    paginator = get_paginator(request)
     paginated_queryset = paginator.paginate_queryset(queryset, request)
 
     serializer = UserProfileSerializer(paginated_queryset, many=True)
 
     response = paginator.get_paginated_response(serializer.data)
-    response.data["total_count"] = total_count  # Add total count to response
+    response.data["total_count"] = get_total_count(paginator)  # Add total count to response
     return response
 
 
@@ -434,39 +423,21 @@ def delete_payor_staff(request, pk):
 # ---------------------- ADMIN DASHBOARD ----------------------
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@replica_view
 def admin_dashboard(request):
-    total_payors = UserProfile.objects.filter(role=UserRole.PAYOR, user__is_active=True).count()
-    total_payor_staff = UserProfile.objects.filter(role=UserRole.PAYOR_STAFF, user__is_active=True).count()
-    total_payees = Payee.objects.filter(is_active=True).count()
+    snapshot = get_admin_snapshot()
+    profile_counts = snapshot["profile_counts"]
 
-    active_users = UserProfile.objects.filter(user__is_active=True).count()
-    inactive_users = UserProfile.objects.filter(user__is_active=False).count()
+    total_payors = profile_counts["payors"]
+    total_payor_staff = profile_counts["payor_staff"]
+    total_payees = snapshot["payees"]
 
-    confirmed_users = UserProfile.objects.filter(is_confirmed=True).count()
-    not_confirmed_users = UserProfile.objects.filter(is_confirmed=False).count()
-
-    otp_verified_users = UserProfile.objects.filter(is_otp_verified=True).count()
-    otp_not_verified_users = UserProfile.objects.filter(is_otp_verified=False).count()
-
-    active_sessions = Session.objects.filter(expire_date__gte=timezone.now()).count()
-
-    system_start = (
-        UserProfile.objects.earliest("created_at").created_at
-        if UserProfile.objects.exists()
-        else timezone.now()
-    )
+    system_start = profile_counts["system_start"] or timezone.now()
     uptime_days = (timezone.now() - system_start).days
 
-    try:
-        last_payroll = PaymentTemplate.objects.order_by("-created_at").first()
-    except Exception:
-        last_payroll = None
-
-    new_employee = UserProfile.objects.order_by("-created_at").first()
-
     recent_activity = {
-        "last_payroll": getattr(last_payroll, "description", None),
-        "new_employee_added": getattr(new_employee, "username", None),
+        "last_payroll": snapshot["last_payroll"],
+        "new_employee_added": snapshot["new_employee"],
     }
 
     data = {
@@ -477,19 +448,19 @@ def admin_dashboard(request):
             "total_users": total_payors + total_payor_staff + total_payees,
         },
         "status_breakdown": {
-            "active": active_users,
-            "inactive": inactive_users,
+            "active": profile_counts["active"],
+            "inactive": profile_counts["inactive"],
         },
         "confirmation_status": {
-            "confirmed": confirmed_users,
-            "not_confirmed": not_confirmed_users,
+            "confirmed": profile_counts["confirmed"],
+            "not_confirmed": profile_counts["not_confirmed"],
         },
         "otp_status": {
-            "otp_verified": otp_verified_users,
-            "otp_not_verified": otp_not_verified_users,
+            "otp_verified": profile_counts["otp_verified"],
+            "otp_not_verified": profile_counts["otp_not_verified"],
         },
         "system_overview": {
-            "active_sessions": active_sessions,
+            "active_sessions": snapshot["active_sessions"],
             "uptime_days": uptime_days,
         },
         "recent_activity": recent_activity,
@@ -501,6 +472,7 @@ def admin_dashboard(request):
 # ------------------------ search users
 @api_view(["GET"])
 @permission_classes([AllowAny])
+@replica_view
 def search_categories(request):
     query = request.GET.get("q", "")
     categories = Category.objects.filter(
@@ -512,24 +484,26 @@ def search_categories(request):
 
 @api_view(["GET"])
 @permission_classes([AllowAny])
+@replica_view
 def search_payees(request):
     query = request.GET.get("q", "")
-    payees = Payee.objects.filter(
-        Q(ben_code__icontains=query) |
-        Q(ben_name__icontains=query) |
-        Q(city__icontains=query) |
-        Q(state__icontains=query) |
-        Q(contact__icontains=query) |
-        Q(email__icontains=query) |
-        Q(bank_name__icontains=query) |
-        Q(branch__icontains=query)
-    ).distinct()
-    serializer = PayeeSerializer(payees, many=True)
-    return Response(serializer.data)
+    # Keyset pages are ordered by -id, which would throw away the relevance ranking
+    if search_terms(query) and cursor_requested(request):
+        return Response(
+            {"error": "Cursor pagination is not supported for ranked search results; use page numbers"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    payees = search_payee_queryset(Payee.objects.all(), query)
+
+    paginator = get_paginator(request)
+    result_page = paginator.paginate_queryset(payees, request)
+    serializer = PayeeSerializer(result_page, many=True)
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(["GET"])
 @permission_classes([AllowAny])
+@replica_view
 def search_payors(request):
     query = request.GET.get("q", "")
     users = UserProfile.objects.filter(
@@ -548,6 +522,7 @@ def search_payors(request):
 
 @api_view(["GET"])
 @permission_classes([AllowAny])
+@replica_view
 def search_payor_staff(request):
     query = request.GET.get("q", "")
     users = UserProfile.objects.filter(
@@ -568,9 +543,8 @@ def search_payor_staff(request):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_profile(request):
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-    except UserProfile.DoesNotExist:
+    profile = request_profile(request)
+    if profile is None:
         return Response({"error": "Profile not found"}, status=status.HTTP_404_NOT_FOUND)
  
     serializer = UserProfileSerializer(profile)
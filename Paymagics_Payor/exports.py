@@ -0,0 +1,30 @@
+from django.db.models import Q
+
+from Paymagics_PayorStaff.excel import EXPORT_CHUNK_SIZE, build_streaming_workbook
+from Paymagics_PayorStaff.plans import get_row_plan
+
+from .models import Category, Payee
+from .search import search_payees
+
+
+def export_payee_queryset(query=""):
+    """Active payees matching `query` by payee fields or category name"""
+    payees = Payee.objects.filter(is_active=True)
+
+    if query:
+        matched_ids = search_payees(Payee.objects.filter(is_active=True), query).values("id")
+        matching_categories = Category.objects.filter(category__icontains=query)
+        payees = payees.filter(
+            Q(id__in=matched_ids) |
+            Q(categories__in=matching_categories)
+        ).distinct().order_by("-id")
+
+    return payees
+
+
+def write_payee_export(template, payees):
+    """Build the template-shaped .xlsx for `payees`, streaming them in chunks"""
+    plan = get_row_plan(template)
+    rows = (plan.payee_export_values(payee) for payee in payees.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+    # Cap at 50 for readability
+    return build_streaming_workbook(rows, plan.headers, width_padding=2, max_width=50)
@@ -0,0 +1,263 @@
+import csv
+import io
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from Codes.generator import take_codes
+
+
+logger = logging.getLogger(__name__)
+
+# Rows validated, deduplicated and inserted per transaction
+IMPORT_CHUNK_SIZE = 500
+
+# Per-row errors kept on the job; the error count keeps counting past this
+IMPORT_MAX_STORED_ERRORS = 1000
+
+IMPORT_EXTENSIONS = (".xlsx", ".csv")
+
+PAYEE_IMPORT_FIELDS = (
+    "ben_code", "ben_name", "add1", "add2", "city", "state", "zipcode", "contact",
+    "email", "payee_type", "acc_no", "ifsc", "iban", "swift_code", "sort_code",
+    "bank_name", "branch", "bank_account_type",
+)
+
+
+def normalize_header(value):
+    return str(value).strip().replace(" ", "_").lower()
+
+
+def normalize_cell(value):
+    """Spreadsheet cell -> serializer input: whole floats lose their '.0', blanks become None"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def _rows_to_dicts(headers, rows):
+    for row_number, row in rows:
+        record = {}
+        for index, header in headers:
+            value = normalize_cell(row[index]) if index < len(row) else None
+            if value is not None:
+                record[header] = value
+        if record:
+            yield row_number, record
+
+
+def iter_import_rows(file_obj, file_name):
+    """
+    Stream (row number, {header: value}) from an uploaded XLSX or CSV file.
+    Empty rows are skipped; row numbers match what the user sees in the sheet.
+    """
+    if file_name.lower().endswith(".csv"):
+        text = io.TextIOWrapper(file_obj, encoding="utf-8-sig", newline="")
+        reader = csv.reader(text)
+        first_row = next(reader, [])
+        headers = [(index, normalize_header(value)) for index, value in enumerate(first_row) if value.strip()]
+        yield from _rows_to_dicts(headers, enumerate(reader, start=2))
+        return
+
+    wb = load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        sheet = wb.active
+        first_row = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        headers = [(index, normalize_header(value)) for index, value in enumerate(first_row) if value]
+        yield from _rows_to_dicts(headers, enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2))
+    finally:
+        wb.close()
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _build_payee(validated_data, payor, referral_code):
+    from .models import Payee
+
+    data = dict(validated_data)
+    data.pop("category", None)
+
+    # Same banking cleanup as create_payee
+    if data["payee_type"].upper() == "DOMESTIC":
+        data.update({"iban": None, "swift_code": None, "sort_code": None})
+    elif data["payee_type"].upper() == "INTERNATIONAL":
+        data.update({"ifsc": None, "acc_no": None})
+
+    payee = Payee(
+        referralcode=referral_code,
+        payor=payor,
+        **{field: data.get(field) for field in PAYEE_IMPORT_FIELDS},
+    )
+    # bulk_create skips Payee.save(), so fill the search column here
+    payee.search_text = payee.build_search_text()
+    return payee
+
+
+def import_payee_chunk(job, chunk, seen_codes, seen_emails):
+    """
+    Validate, deduplicate and insert one chunk of rows.
+
+    Duplicates are checked with one query per key against active payees
+    (ben_code per payor, email globally) and against rows already seen in
+    this file. Returns (created_count, errors).
+    """
+    from .models import Category, Payee, adjust_category_counts
+    from .serializers import CreatePayeeSerializer
+
+    errors = []
+    valid = []
+
+    for row_number, record in chunk:
+        serializer = CreatePayeeSerializer(data=record)
+        if serializer.is_valid():
+            valid.append((row_number, serializer.validated_data))
+        else:
+            errors.append({"row": row_number, "errors": serializer.errors})
+
+    codes = {data["ben_code"] for _, data in valid}
+    emails = {data["email"] for _, data in valid}
+    category_ids = {data["category"] for _, data in valid if data.get("category")}
+
+    existing_codes = set(
+        Payee.objects.filter(payor=job.payor, is_active=True, ben_code__in=codes).values_list("ben_code", flat=True)
+    )
+    existing_emails = set(
+        Payee.objects.filter(is_active=True, email__in=emails).values_list("email", flat=True)
+    )
+    categories = Category.objects.in_bulk(category_ids)
+
+    to_create = []
+    for row_number, data in valid:
+        ben_code, email = data["ben_code"], data["email"]
+        category_id = data.get("category") or job.category_id
+
+        if ben_code in existing_codes or ben_code in seen_codes:
+            errors.append({"row": row_number, "errors": {"ben_code": [f"Payee with ben_code '{ben_code}' already exists for this payor."]}})
+            continue
+        if email in existing_emails or email in seen_emails:
+            errors.append({"row": row_number, "errors": {"email": ["A Payee with this email already exists."]}})
+            continue
+        if data.get("category") and data["category"] not in categories:
+            errors.append({"row": row_number, "errors": {"category": ["Category not found."]}})
+            continue
+
+        seen_codes.add(ben_code)
+        seen_emails.add(email)
+        to_create.append((data, category_id))
+
+    errors.sort(key=lambda error: error["row"])
+    if not to_create:
+        return 0, errors
+
+    referral_codes = take_codes("referral", len(to_create))
+    to_create = [
+        (_build_payee(data, job.payor, referral_code), category_id)
+        for (data, category_id), referral_code in zip(to_create, referral_codes)
+    ]
+
+    links = Payee.categories.through
+
+    with transaction.atomic():
+        payees = Payee.objects.bulk_create([payee for payee, _ in to_create], batch_size=IMPORT_CHUNK_SIZE)
+
+        # MySQL does not return primary keys from bulk_create
+        if payees and payees[0].pk is None:
+            ids = dict(
+                Payee.objects.filter(payor=job.payor, is_active=True, ben_code__in=[p.ben_code for p in payees])
+                .values_list("ben_code", "id")
+            )
+            for payee in payees:
+                payee.pk = ids[payee.ben_code]
+
+        link_rows = [
+            links(payee_id=payee.pk, category_id=category_id)
+            for payee, (_, category_id) in zip(payees, to_create)
+            if category_id
+        ]
+        links.objects.bulk_create(link_rows, batch_size=IMPORT_CHUNK_SIZE)
+
+        # Through rows bypass m2m_changed, so bump the counts here
+        per_category = {}
+        for link in link_rows:
+            per_category[link.category_id] = per_category.get(link.category_id, 0) + 1
+        for category_id, added in per_category.items():
+            adjust_category_counts([category_id], added)
+
+    return len(payees), errors
+
+
+def run_payee_import(job_id):
+    """Process a PayeeImportJob from start to finish, recording progress as it goes"""
+    from Paymagics_Admin.dashboard import invalidate_dashboard
+    from .models import PayeeImportJob
+
+    job = PayeeImportJob.objects.select_related("payor").get(pk=job_id)
+    job.status = "running"
+    job.started_at = timezone.now()
+    job.finished_at = None
+    job.message = ""
+    job.save(update_fields=["status", "started_at", "finished_at", "message"])
+
+    # Rows already imported are active payees now, so the duplicate checks
+    # against the database cover them; the sets only track this run
+    seen_codes, seen_emails = set(), set()
+    stored_errors = list(job.errors)
+    resume_after = job.last_row
+
+    try:
+        with job.file.open("rb") as file_obj:
+            rows = (row for row in iter_import_rows(file_obj, job.file.name) if row[0] > resume_after)
+            for chunk in _chunks(rows, IMPORT_CHUNK_SIZE):
+                # Progress commits with the chunk's payees, so a retry picks up exactly where this stopped
+                with transaction.atomic():
+                    created, errors = import_payee_chunk(job, chunk, seen_codes, seen_emails)
+
+                    room = IMPORT_MAX_STORED_ERRORS - len(stored_errors)
+                    if room > 0:
+                        stored_errors.extend(errors[:room])
+
+                    PayeeImportJob.objects.filter(pk=job.pk).update(
+                        processed_rows=F("processed_rows") + len(chunk),
+                        created_count=F("created_count") + created,
+                        error_count=F("error_count") + len(errors),
+                        errors=stored_errors,
+                        last_row=chunk[-1][0],
+                    )
+    except Exception as e:
+        # The job queue retries the import, which resumes after the last committed chunk
+        logger.exception("Payee import %s failed", job.pk)
+        PayeeImportJob.objects.filter(pk=job.pk).update(
+            status="failed",
+            message=str(e)[:500],
+            finished_at=timezone.now(),
+        )
+        raise
+    else:
+        PayeeImportJob.objects.filter(pk=job.pk).update(
+            status="completed",
+            finished_at=timezone.now(),
+        )
+    finally:
+        invalidate_dashboard()
+
+
+def start_payee_import(job, user=None):
+    """Queue the import for a background worker"""
+    from Jobs.queue import enqueue
+
+    return enqueue("payee_import", {"import_id": job.pk}, user=user)
@@ -0,0 +1,185 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.mail import EmailMessage
+from django.core.validators import validate_email
+from django.db.models import Count
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from Codes.generator import take_codes
+
+from .imports import iter_import_rows
+
+
+logger = logging.getLogger(__name__)
+
+INVITE_LINK_BASE = "https://paymagics-frontend.vercel.app/invite"
+
+INVITE_SUBJECT = "Invitation to Join"
+
+# Recipients accepted per campaign
+INVITE_MAX_RECIPIENTS = 10000
+
+# Invites given codes, sent over the open connection and saved per round
+INVITE_BATCH_SIZE = 200
+
+# Stands in for the per-recipient link while the template is rendered once
+LINK_PLACEHOLDER = "__PAYMAGICS_REFERRAL_LINK__"
+
+
+def invite_link(code):
+    return f"{INVITE_LINK_BASE}?referral_code={code}"
+
+
+def render_invite_email(referral_link, custom_msg):
+    """referral_email.html for one recipient (send_invite_email)"""
+    return render_to_string("referral_email.html", {"referral_link": referral_link, "custom_msg": custom_msg})
+
+
+def read_invite_emails(file_obj, file_name):
+    """Addresses from the `email` column of an uploaded XLSX/CSV, in file order"""
+    return [record["email"] for _, record in iter_import_rows(file_obj, file_name) if record.get("email")]
+
+
+def prepare_recipients(emails):
+    """
+    Normalize a list of addresses into (email, status) pairs: "pending" for
+    the first occurrence of a valid address, "invalid" or "duplicate" otherwise.
+    """
+    seen = set()
+    recipients = []
+    for raw in emails:
+        email = str(raw or "").strip().lower()
+        try:
+            validate_email(email)
+        except ValidationError:
+            recipients.append((email[:254], "invalid"))
+            continue
+        if email in seen:
+            recipients.append((email, "duplicate"))
+            continue
+        seen.add(email)
+        recipients.append((email, "pending"))
+    return recipients
+
+
+def create_referral_codes(category, referrer, count):
+    """Create `count` one-time CategoryReferralCode rows with one bulk insert and return their codes"""
+    from .models import CategoryReferralCode
+
+    codes = take_codes("category_referral", count)
+    CategoryReferralCode.objects.bulk_create(
+        [CategoryReferralCode(category=category, referrer=referrer, code=code) for code in codes]
+    )
+    return codes
+
+
+def _send_batch(connection, invites, html, from_email):
+    """Send one batch over the open connection; a failed send reopens it for the rest"""
+    for invite in invites:
+        message = EmailMessage(
+            subject=INVITE_SUBJECT,
+            body=html.replace(LINK_PLACEHOLDER, invite_link(invite.code)),
+            from_email=from_email,
+            to=[invite.email],
+            connection=connection,
+        )
+        message.content_subtype = "html"
+
+        try:
+            if not connection.send_messages([message]):
+                raise RuntimeError("The mail backend did not accept the message")
+        except Exception as e:
+            logger.warning("Invite to %s failed: %s", invite.email, e)
+            invite.status = "failed"
+            invite.error = str(e)[:500]
+            # If the server is gone this raises, and the job is retried from the unsent invites
+            connection.close()
+            connection.open()
+            continue
+
+        invite.status = "sent"
+        invite.error = ""
+        invite.sent_at = timezone.now()
+
+
+def _update_counts(campaign):
+    counts = dict(campaign.invites.values_list("status").annotate(n=Count("id")))
+    campaign.sent_count = counts.get("sent", 0)
+    campaign.failed_count = counts.get("failed", 0)
+    campaign.save(update_fields=["sent_count", "failed_count"])
+
+
+def run_invite_campaign(campaign_id, job=None):
+    """
+    Give every pending invite a referral code and send it. The template is
+    rendered once per campaign; each message only swaps in its own link.
+
+    Invites are worked through in batches: codes for the batch come from one
+    bulk insert, the messages go over a single reused connection and the
+    results are saved with one bulk update. Rerunning picks up where a
+    previous run stopped.
+    """
+    from Outbox.backends import delivery_connection
+    from .models import CampaignInvite, InviteCampaign
+
+    campaign = InviteCampaign.objects.select_related("category", "payor").get(pk=campaign_id)
+    campaign.status = "running"
+    campaign.started_at = campaign.started_at or timezone.now()
+    campaign.save(update_fields=["status", "started_at"])
+
+    pending = campaign.invites.filter(status="pending").order_by("id")
+    total = pending.count()
+    if job is not None:
+        job.set_progress(0, total)
+
+    html = render_invite_email(LINK_PLACEHOLDER, campaign.custom_msg)
+    from_email = settings.EMAIL_HOST_USER
+    connection = delivery_connection()
+    done = 0
+
+    try:
+        connection.open()
+        while True:
+            invites = list(pending[:INVITE_BATCH_SIZE])
+            if not invites:
+                break
+
+            missing = [invite for invite in invites if not invite.code]
+            if missing:
+                codes = create_referral_codes(campaign.category, campaign.payor, len(missing))
+                for invite, code in zip(missing, codes):
+                    invite.code = code
+                # Keep the codes even if sending is interrupted
+                CampaignInvite.objects.bulk_update(missing, ["code"])
+
+            try:
+                _send_batch(connection, invites, html, from_email)
+            finally:
+                CampaignInvite.objects.bulk_update(invites, ["status", "error", "sent_at"])
+                _update_counts(campaign)
+
+            done += len(invites)
+            if job is not None:
+                job.set_progress(done)
+    except Exception as e:
+        # The job queue retries the campaign, which resumes from the pending invites
+        logger.exception("Invite campaign %s failed", campaign.pk)
+        InviteCampaign.objects.filter(pk=campaign.pk).update(
+            status="failed",
+            message=str(e)[:500],
+            finished_at=timezone.now(),
+        )
+        raise
+    else:
+        InviteCampaign.objects.filter(pk=campaign.pk).update(
+            status="completed",
+            message="",
+            finished_at=timezone.now(),
+        )
+    finally:
+        connection.close()
+
+    return {"campaign_id": campaign.pk, "sent": campaign.sent_count, "failed": campaign.failed_count}
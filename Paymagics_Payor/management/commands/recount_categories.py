@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from Paymagics_Payor.models import Category, Payee
+
+
+class Command(BaseCommand):
+    help = "Recompute Category.count (active payees per category) with a single GROUP BY."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report categories whose stored count has drifted without saving.",
+        )
+
+    def handle(self, *args, **options):
+        links = Payee.categories.through.objects
+        actual = dict(
+            links.filter(payee__is_active=True)
+            .values("category_id")
+            .annotate(total=Count("payee_id"))
+            .values_list("category_id", "total")
+        )
+
+        with transaction.atomic():
+            drifted = []
+            for category in Category.objects.select_for_update().only("id", "category", "count"):
+                expected = actual.get(category.id, 0)
+                if category.count != expected:
+                    self.stdout.write(f"{category.category}: {category.count} -> {expected}")
+                    category.count = expected
+                    drifted.append(category)
+
+            if drifted and not options["dry_run"]:
+                Category.objects.bulk_update(drifted, ["count"], batch_size=1000)
+
+        action = "Would fix" if options["dry_run"] else "Fixed"
+        self.stdout.write(self.style.SUCCESS(f"{action} {len(drifted)} category count(s)."))
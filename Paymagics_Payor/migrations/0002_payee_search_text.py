@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+from Paymagics_Payor.search import PAYEE_SEARCH_FIELDS, normalize_search_text
+
+
+def populate_search_text(apps, schema_editor):
+    Payee = apps.get_model("Paymagics_Payor", "Payee")
+    db_alias = schema_editor.connection.alias
+
+    batch = []
+    for payee in Payee.objects.using(db_alias).only("id", *PAYEE_SEARCH_FIELDS).iterator(chunk_size=2000):
+        payee.search_text = normalize_search_text(*(getattr(payee, field) for field in PAYEE_SEARCH_FIELDS))
+        batch.append(payee)
+        if len(batch) >= 2000:
+            Payee.objects.using(db_alias).bulk_update(batch, ["search_text"])
+            batch = []
+    if batch:
+        Payee.objects.using(db_alias).bulk_update(batch, ["search_text"])
+
+
+def add_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE Paymagics_Payor_payee "
+        "ADD FULLTEXT INDEX payee_search_text_ft (search_text) WITH PARSER ngram"
+    )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    schema_editor.execute("ALTER TABLE Paymagics_Payor_payee DROP INDEX payee_search_text_ft")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Paymagics_Payor', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payee',
+            name='search_text',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.RunPython(populate_search_text, migrations.RunPython.noop),
+        migrations.RunPython(add_fulltext_index, drop_fulltext_index),
+    ]
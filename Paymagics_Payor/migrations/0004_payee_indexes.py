@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:24
+
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_ben_codes(apps, schema_editor):
+    # Fail with the offending rows rather than a bare IntegrityError from the unique index
+    Payee = apps.get_model("Paymagics_Payor", "Payee")
+    db_alias = schema_editor.connection.alias
+    duplicates = list(
+        Payee.objects.using(db_alias).filter(is_active=True, ben_code__isnull=False)
+        .values("payor_id", "ben_code")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)[:20]
+    )
+    if duplicates:
+        listed = ", ".join(f"payor {d['payor_id']} / {d['ben_code']!r} x{d['n']}" for d in duplicates)
+        raise RuntimeError(
+            "Active payees share a ben_code under the same payor; deactivate or recode them "
+            f"before applying payee_active_ben_code_uniq: {listed}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Paymagics_Admin', '0001_initial'),
+        ('Paymagics_Payor', '0003_payeeimportjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payee',
+            index=models.Index(fields=['is_active', 'id'], name='payee_active_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payee',
+            index=models.Index(fields=['payor', 'ben_code', 'is_active'], name='payee_payor_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payee',
+            index=models.Index(fields=['email', 'is_active'], name='payee_email_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payee',
+            index=models.Index(fields=['ben_code'], name='payee_ben_code_idx'),
+        ),
+        migrations.RunPython(check_duplicate_ben_codes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='payee',
+            constraint=models.UniqueConstraint(models.Case(models.When(models.Q(('ben_code__isnull', False), ('is_active', True)), then=django.db.models.functions.text.Concat(django.db.models.functions.comparison.Cast('payor', models.CharField(max_length=20)), models.Value(':'), 'ben_code')), default=None, output_field=models.CharField(max_length=125)), name='payee_active_ben_code_uniq'),
+        ),
+    ]
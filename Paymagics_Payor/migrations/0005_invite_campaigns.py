@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Paymagics_Admin', '0001_initial'),
+        ('Paymagics_Payor', '0004_payee_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InviteCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('custom_msg', models.CharField(blank=True, default='', max_length=500)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('invalid_count', models.PositiveIntegerField(default=0)),
+                ('message', models.CharField(blank=True, default='', max_length=500)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invite_campaigns', to='Paymagics_Payor.category')),
+                ('payor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invite_campaigns', to='Paymagics_Admin.userprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CampaignInvite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.CharField(max_length=254)),
+                ('code', models.CharField(blank=True, default='', max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed'), ('invalid', 'Invalid email'), ('duplicate', 'Duplicate')], default='pending', max_length=20)),
+                ('error', models.CharField(blank=True, default='', max_length=500)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invites', to='Paymagics_Payor.invitecampaign')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['campaign', 'status'], name='campaign_invite_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Paymagics_Payor', '0005_invite_campaigns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payeeimportjob',
+            name='last_row',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Paymagics_Payor', '0006_payeeimportjob_last_row'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='referral_code',
+            field=models.CharField(blank=True, max_length=7, null=True),
+        ),
+        migrations.AlterField(
+            model_name='payee',
+            name='referralcode',
+            field=models.CharField(blank=True, max_length=7, null=True),
+        ),
+    ]
@@ -1,18 +1,32 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Cast, Concat, Greatest
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
 from Paymagics_Admin.models import UserProfile
+from Codes.generator import next_code
 import uuid
 from Paymagics_PayorStaff.models import *
+from .search import PAYEE_SEARCH_FIELDS, normalize_search_text
 
 class Category(models.Model):
     category = models.CharField(max_length=55, unique=True)
     description = models.CharField(max_length=500,blank=True,null=True)
     count = models.IntegerField(default=0)
-    referral_code = models.CharField(max_length=6, blank=True, null=True)
+    referral_code = models.CharField(max_length=7, blank=True, null=True)
 
     def __str__(self):
         return self.category
 
 
+# Active ben_codes are unique per payor. It is an expression index (NULL for
+# inactive rows) because MySQL ignores conditional unique constraints.
+PAYEE_BEN_CODE_CONSTRAINT = "payee_active_ben_code_uniq"
+
+# Generated ben_codes tried before giving up on an insert
+BEN_CODE_ATTEMPTS = 5
+
+
 class Payee(models.Model):
     PAYEE_TYPE_CHOICES = (
     ('DOMESTIC', 'Domestic'),
@@ -42,17 +56,185 @@ class Payee(models.Model):
     bank_name = models.CharField(max_length=100,blank=True,null=True)
     branch = models.CharField(max_length=100,blank=True,null=True)
     bank_account_type = models.CharField(max_length=100,blank=True,null=True)
-    referralcode = models.CharField(max_length=6,blank=True,null=True)
+    referralcode = models.CharField(max_length=7,blank=True,null=True)
     payor = models.ForeignKey(UserProfile,on_delete=models.CASCADE,blank=True,null=True)
     is_confirmed = models.BooleanField(default=False,blank=True,null=True)
     categories = models.ManyToManyField(Category, related_name='payees', blank=True)
     is_active = models.BooleanField(default=True)
 
+    # Normalized copy of PAYEE_SEARCH_FIELDS, backed by a FULLTEXT index on MySQL
+    search_text = models.CharField(max_length=1000, blank=True, default="", editable=False)
+
+    class Meta:
+        indexes = [
+            # Active payee listings, newest first
+            models.Index(fields=["is_active", "id"], name="payee_active_id_idx"),
+            # Duplicate ben_code check in create_payee / imports
+            models.Index(fields=["payor", "ben_code", "is_active"], name="payee_payor_code_idx"),
+            # Duplicate email check in create_payee_via_referral / imports
+            models.Index(fields=["email", "is_active"], name="payee_email_active_idx"),
+            models.Index(fields=["ben_code"], name="payee_ben_code_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                Case(
+                    When(
+                        Q(is_active=True, ben_code__isnull=False),
+                        then=Concat(Cast("payor", models.CharField(max_length=20)), Value(":"), "ben_code"),
+                    ),
+                    default=None,
+                    output_field=models.CharField(max_length=125),
+                ),
+                name=PAYEE_BEN_CODE_CONSTRAINT,
+            ),
+        ]
+
     def __str__(self):
         return f"{self.ben_name} - {'Active' if self.is_active else 'Deleted'}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored flag so a soft delete/restore can adjust category counts
+        instance._loaded_is_active = instance.__dict__.get("is_active")
+        return instance
+
+    def build_search_text(self):
+        return normalize_search_text(*(getattr(self, field) for field in PAYEE_SEARCH_FIELDS))
+
+    def save(self, *args, **kwargs):
+        self.search_text = self.build_search_text()
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) & set(PAYEE_SEARCH_FIELDS):
+            kwargs["update_fields"] = set(update_fields) | {"search_text"}
+
+        super().save(*args, **kwargs)
+
+        loaded_is_active = getattr(self, "_loaded_is_active", None)
+        is_active_saved = update_fields is None or "is_active" in update_fields
+        if is_active_saved and loaded_is_active is not None and loaded_is_active != self.is_active:
+            adjust_category_counts(
+                self.categories.values_list("id", flat=True),
+                1 if self.is_active else -1,
+            )
+        if is_active_saved:
+            self._loaded_is_active = self.is_active
+
+
+def is_ben_code_conflict(error):
+    """True when an IntegrityError came from PAYEE_BEN_CODE_CONSTRAINT"""
+    return PAYEE_BEN_CODE_CONSTRAINT in str(error)
+
+
+def create_payee_with_generated_code(**fields):
+    """
+    Create a Payee under a generated ben_code. Generated codes never repeat,
+    but one can still match a ben_code a payor typed in; the insert is the
+    check, and on a conflict a new code is drawn, up to BEN_CODE_ATTEMPTS times.
+    """
+    for attempt in range(BEN_CODE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return Payee.objects.create(ben_code=next_code("ben_code"), **fields)
+        except IntegrityError as e:
+            if attempt == BEN_CODE_ATTEMPTS - 1 or not is_ben_code_conflict(e):
+                raise
+
+
+# ---------------------------- Category.count maintenance
+# Category.count is the number of active payees in the category. It is kept
+# in step by the m2m_changed handler below and by Payee.save() when a payee
+# is soft deleted or restored, always with atomic F() updates.
+
+def adjust_category_counts(category_ids, delta):
+    """Atomically shift Category.count by `delta` for `category_ids`, never below zero"""
+    category_ids = list(category_ids)
+    if category_ids and delta:
+        Category.objects.filter(id__in=category_ids).update(count=Greatest(F("count") + delta, Value(0)))
+
+
+def assign_payees_to_category(category, payee_ids, batch_size=1000):
+    """
+    Link many payees to `category` with set-based queries.
+
+    Returns a list of {"payee_id", "status"} in request order, where status is
+    "assigned", "already_assigned", "not_found" (missing or inactive) or
+    "invalid". Bulk-inserted through rows bypass m2m_changed, so the count is
+    bumped here in the same transaction.
+    """
+    requested = []
+    for payee_id in payee_ids:
+        try:
+            requested.append((payee_id, int(payee_id)))
+        except (TypeError, ValueError):
+            requested.append((payee_id, None))
+    ids = {pk for _, pk in requested if pk is not None}
+
+    links = Payee.categories.through
+
+    with transaction.atomic():
+        # Serialise concurrent assignments to the same category
+        Category.objects.select_for_update().filter(id=category.id).exists()
+
+        active_ids = set(Payee.objects.filter(id__in=ids, is_active=True).values_list("id", flat=True))
+        linked_ids = set(
+            links.objects.filter(category_id=category.id, payee_id__in=active_ids).values_list("payee_id", flat=True)
+        )
+
+        results = []
+        new_ids = []
+        for raw_id, pk in requested:
+            if pk is None:
+                result = "invalid"
+            elif pk not in active_ids:
+                result = "not_found"
+            elif pk in linked_ids:
+                result = "already_assigned"
+            else:
+                result = "assigned"
+                linked_ids.add(pk)
+                new_ids.append(pk)
+            results.append({"payee_id": raw_id, "status": result})
+
+        links.objects.bulk_create(
+            [links(payee_id=pk, category_id=category.id) for pk in new_ids],
+            batch_size=batch_size,
+        )
+        adjust_category_counts([category.id], len(new_ids))
+
+    return results
+
+
+@receiver(m2m_changed, sender=Payee.categories.through)
+def maintain_category_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "pre_remove", "pre_clear"):
+        return
+
+    delta = 1 if action == "post_add" else -1
+    links = sender.objects
+
+    if not reverse:
+        # payee.categories.add/remove/clear: instance is a Payee, pk_set holds Category ids
+        if not instance.is_active:
+            return
+        if action == "post_add":
+            # Django only reports ids that were actually inserted
+            category_ids = pk_set
+        elif action == "pre_remove":
+            category_ids = links.filter(payee_id=instance.pk, category_id__in=pk_set).values_list("category_id", flat=True)
+        else:
+            category_ids = links.filter(payee_id=instance.pk).values_list("category_id", flat=True)
+        adjust_category_counts(category_ids, delta)
+
+    else:
+        # category.payees.add/remove/clear: instance is a Category, pk_set holds Payee ids
+        active_links = links.filter(category_id=instance.pk, payee__is_active=True)
+        if action != "pre_clear":
+            active_links = active_links.filter(payee_id__in=pk_set)
+        adjust_category_counts([instance.pk], delta * active_links.count())
+
 
-import string, random
 from django.db import models
 from django.utils import timezone
 
@@ -79,7 +261,7 @@ class CategoryReferralCode(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.code:
-            self.code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+            self.code = next_code("category_referral")
         super().save(*args, **kwargs)
 
     def mark_used(self, payee):
@@ -90,3 +272,82 @@ class CategoryReferralCode(models.Model):
 
     def __str__(self):
         return f"{self.category.category} | {self.code} ({'USED' if self.is_used else 'ACTIVE'})"
+
+
+class PayeeImportJob(models.Model):
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    )
+
+    payor = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name="payee_imports")
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
+    file = models.FileField(upload_to="payee_imports/")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    # Sheet row of the last committed chunk; a retried import resumes after it
+    last_row = models.PositiveIntegerField(default=0)
+    message = models.CharField(max_length=500, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Payee import #{self.pk} ({self.status})"
+
+
+class InviteCampaign(models.Model):
+    """A referral invite sent to many addresses at once (see invites.py)"""
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    )
+
+    payor = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name="invite_campaigns")
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="invite_campaigns")
+    custom_msg = models.CharField(max_length=500, blank=True, default="")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    total = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    invalid_count = models.PositiveIntegerField(default=0)
+    message = models.CharField(max_length=500, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Invite campaign #{self.pk} ({self.status})"
+
+
+class CampaignInvite(models.Model):
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+        ("invalid", "Invalid email"),
+        ("duplicate", "Duplicate"),
+    )
+
+    campaign = models.ForeignKey(InviteCampaign, on_delete=models.CASCADE, related_name="invites")
+    email = models.CharField(max_length=254)
+    # The CategoryReferralCode.code sent to this address
+    code = models.CharField(max_length=10, blank=True, default="")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    error = models.CharField(max_length=500, blank=True, default="")
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["campaign", "status"], name="campaign_invite_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.email} ({self.status})"
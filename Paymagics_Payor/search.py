@@ -0,0 +1,72 @@
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.expressions import RawSQL
+
+
+# Payee columns folded into Payee.search_text
+PAYEE_SEARCH_FIELDS = ("ben_code", "ben_name", "city", "state", "contact", "email", "bank_name", "branch")
+
+# Must match ngram_token_size on the MySQL server (default 2); shorter terms fall back to LIKE
+NGRAM_TOKEN_SIZE = 2
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_BOOLEAN_OPERATORS_RE = re.compile(r'[+\-<>()~*"@]')
+
+
+def normalize_search_text(*values):
+    """Lowercase, strip accents and collapse whitespace across `values`"""
+    text = " ".join(str(value) for value in values if value)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _WHITESPACE_RE.sub(" ", text.casefold()).strip()
+
+
+def search_terms(query):
+    """Split a raw query into normalized terms"""
+    return [term for term in normalize_search_text(query).split(" ") if term]
+
+
+def search_payees(queryset, query):
+    """
+    Filter a Payee queryset down to rows matching every term in `query`,
+    annotated with `search_rank` and ordered best match first.
+
+    On MySQL this uses the ngram FULLTEXT index on search_text; elsewhere
+    (SQLite in local runs and tests) it falls back to LIKE over the same
+    single normalized column.
+    """
+    terms = search_terms(query)
+    if not terms:
+        # An empty query matches everything, as the old icontains filters did
+        return queryset.annotate(search_rank=Value(0, output_field=IntegerField())).order_by("-id")
+
+    connection = connections[queryset.db]
+    fulltext_terms = [_BOOLEAN_OPERATORS_RE.sub(" ", term).strip() for term in terms]
+    if connection.vendor == "mysql" and all(len(term) >= NGRAM_TOKEN_SIZE for term in fulltext_terms):
+        column = "%s.%s" % (
+            connection.ops.quote_name(queryset.model._meta.db_table),
+            connection.ops.quote_name("search_text"),
+        )
+        boolean_query = " ".join('+"%s"' % term for term in fulltext_terms)
+        return (
+            queryset
+            .annotate(search_rank=RawSQL(f"MATCH({column}) AGAINST (%s IN BOOLEAN MODE)", [boolean_query]))
+            .filter(search_rank__gt=0)
+            .order_by("-search_rank", "-id")
+        )
+
+    for term in terms:
+        queryset = queryset.filter(search_text__contains=term)
+
+    phrase = " ".join(terms)
+    return queryset.annotate(
+        search_rank=Case(
+            When(ben_code__iexact=phrase, then=Value(3)),
+            When(ben_name__istartswith=phrase, then=Value(2)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    ).order_by("-search_rank", "-id")
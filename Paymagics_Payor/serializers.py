@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import *
+from Paymagics_API.serializers import EagerLoadingMixin
 
 
 class UpdatePayeeSerializer(serializers.ModelSerializer):
@@ -10,7 +11,7 @@ class UpdatePayeeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Payee
-        fields = '__all__'
+        exclude = ['search_text']
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -67,8 +68,41 @@ class CreatePayeeSerializer(serializers.Serializer):
 
 
 
-class PayeeSerializer(serializers.ModelSerializer):
+class PayeeSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     categories = CategorySerializer(many=True, read_only=True)
+    prefetch_related_fields = ("categories",)
+
     class Meta:
         model = Payee
-        fields = '__all__'
\ No newline at end of file
+        exclude = ['search_text']
+
+class PayeeImportJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.IntegerField(source="id", read_only=True)
+    file_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PayeeImportJob
+        fields = [
+            "job_id", "file_name", "category", "status", "processed_rows", "created_count",
+            "error_count", "errors", "message", "created_at", "started_at", "finished_at",
+        ]
+
+    def get_file_name(self, obj):
+        return obj.file.name.rsplit("/", 1)[-1] if obj.file else None
+
+
+class CampaignInviteSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CampaignInvite
+        fields = ["id", "email", "code", "status", "error", "sent_at"]
+
+
+class InviteCampaignSerializer(serializers.ModelSerializer):
+    campaign_id = serializers.IntegerField(source="id", read_only=True)
+
+    class Meta:
+        model = InviteCampaign
+        fields = [
+            "campaign_id", "category", "custom_msg", "status", "total", "sent_count", "failed_count",
+            "invalid_count", "message", "created_at", "started_at", "finished_at",
+        ]
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from Jobs.queue import JobError, job_handler
+from Paymagics_API.db_router import replica_reads
+from Paymagics_PayorStaff.models import PaymentTemplate
+from Paymagics_PayorStaff.template_cache import get_cached_template
+
+from .exports import export_payee_queryset, write_payee_export
+from .imports import run_payee_import
+from .invites import run_invite_campaign
+
+
+@job_handler("payee_export")
+def export_payees(job):
+    try:
+        template = get_cached_template(job.payload["template_id"])
+    except PaymentTemplate.DoesNotExist:
+        raise JobError("Template not found.")
+
+    payees = export_payee_queryset(job.payload.get("q", ""))
+    with replica_reads(job.created_by):
+        total = payees.count()
+    if not total:
+        raise JobError("No payees found.")
+
+    job.set_progress(0, total)
+    filename = f"payees_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    with replica_reads(job.created_by):
+        workbook = write_payee_export(template, payees)
+    with workbook as file_obj:
+        job.save_artifact(filename, file_obj)
+
+    return {"row_count": total}
+
+
+@job_handler("payee_import")
+def import_payees(job):
+    run_payee_import(job.payload["import_id"])
+    return {"import_id": job.payload["import_id"]}
+
+
+@job_handler("invite_campaign")
+def send_invite_campaign(job):
+    return run_invite_campaign(job.payload["campaign_id"], job)
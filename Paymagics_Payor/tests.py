@@ -0,0 +1,161 @@
+from unittest import mock, skipIf, skipUnless
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from Paymagics_PayorStaff.models import PaymentTemplate
+from testutils.query_budget import QueryBudgetMixin
+
+from . import imports
+from .models import Category, Payee, PayeeImportJob
+from .search import search_payees
+
+
+@skipIf(connection.vendor == "mysql", "MySQL uses the FULLTEXT path; this covers the LIKE fallback")
+class PayeeSearchFallbackTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.by_city = Payee.objects.create(ben_code="P1", ben_name="Other", city="Acme")
+        cls.by_name = Payee.objects.create(ben_code="P2", ben_name="Acme Corp")
+        cls.by_code = Payee.objects.create(ben_code="ACME", ben_name="Zed")
+        cls.accented = Payee.objects.create(ben_code="P3", ben_name="José Álvarez", city="Pune")
+
+    def search(self, query):
+        return list(search_payees(Payee.objects.all(), query))
+
+    def test_terms_are_anded_across_fields(self):
+        self.assertEqual(self.search("alvarez pune"), [self.accented])
+        self.assertEqual(self.search("alvarez mumbai"), [])
+
+    def test_query_is_normalized(self):
+        self.assertEqual(self.search("  JOSÉ   ALVAREZ "), [self.accented])
+
+    def test_exact_code_then_name_prefix_rank_first(self):
+        self.assertEqual(self.search("acme"), [self.by_code, self.by_name, self.by_city])
+
+    def test_empty_query_matches_everything_newest_first(self):
+        self.assertEqual(self.search(""), list(Payee.objects.order_by("-id")))
+
+    def test_cursor_pagination_rejected_for_ranked_search(self):
+        client = APIClient()
+        url = reverse("search_payees")
+        self.assertEqual(client.get(url, {"q": "acme", "pagination": "cursor"}).status_code, 400)
+        self.assertEqual(client.get(url, {"q": "acme"}).status_code, 200)
+        self.assertEqual(client.get(url, {"pagination": "cursor"}).status_code, 200)
+
+
+class PayorQueryBudgetTests(QueryBudgetMixin, TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        cls.category = Category.objects.create(category="Vendors")
+        cls.template = PaymentTemplate.objects.create(
+            name="Payments", dynamic_fields={"Name": "ben_name"}, created_by=cls.admin
+        )
+        for index in range(3):
+            payee = Payee.objects.create(ben_code=f"B{index}", ben_name=f"Vendor {index}")
+            payee.categories.add(cls.category, Category.objects.create(category=f"Extra {index}"))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.admin)
+
+    def test_payee_list(self):
+        self.assertWithinQueryBudget("payee_list")
+
+    def test_payees_in_list(self):
+        self.assertWithinQueryBudget("payees_in_list", args=[self.category.id])
+
+    def test_export_payees(self):
+        self.assertWithinQueryBudget("export_payees", args=[self.template.id], data={"q": "vendor"})
+
+
+@skipUnless(connection.vendor == "sqlite", "Query plans are checked against SQLite's EXPLAIN QUERY PLAN")
+class PayeeQueryPlanTests(TestCase):
+    """The Payee hot filters must keep hitting their indexes (migration 0004_payee_indexes)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.payor = User.objects.create_user("payor").profile
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def test_active_ids_use_index(self):
+        self.assertUsesIndex(Payee.objects.filter(is_active=True).values("id"), "payee_active_id_idx")
+
+    def test_duplicate_ben_code_check_uses_index(self):
+        queryset = Payee.objects.filter(ben_code="B1", payor=self.payor, is_active=True)
+        self.assertUsesIndex(queryset, "payee_payor_code_idx")
+
+    def test_duplicate_email_check_uses_index(self):
+        self.assertUsesIndex(Payee.objects.filter(email="a@example.com", is_active=True), "payee_email_active_idx")
+
+    def test_ben_code_lookup_uses_index(self):
+        self.assertUsesIndex(Payee.objects.filter(ben_code="B1"), "payee_ben_code_idx")
+
+
+class PayeeBenCodeConstraintTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.payor = User.objects.create_user("payor").profile
+        cls.other_payor = User.objects.create_user("other").profile
+
+    def test_active_ben_code_unique_per_payor(self):
+        Payee.objects.create(ben_code="B1", payor=self.payor)
+        with self.assertRaises(IntegrityError):
+            Payee.objects.create(ben_code="B1", payor=self.payor)
+
+    def test_inactive_and_other_payor_may_reuse_ben_code(self):
+        Payee.objects.create(ben_code="B1", payor=self.payor, is_active=False)
+        Payee.objects.create(ben_code="B1", payor=self.payor, is_active=False)
+        Payee.objects.create(ben_code="B1", payor=self.payor)
+        Payee.objects.create(ben_code="B1", payor=self.other_payor)
+        self.assertEqual(Payee.objects.filter(ben_code="B1").count(), 4)
+
+
+@mock.patch.object(imports, "IMPORT_CHUNK_SIZE", 2)
+class PayeeImportRetryTests(TestCase):
+    HEADER = "ben_code,ben_name,add1,add2,city,state,zipcode,contact,email,payee_type,acc_no,ifsc\n"
+
+    def setUp(self):
+        self.payor = User.objects.create_user("payor").profile
+        rows = "".join(
+            f"B{index},Payee {index},a,b,City,State,560001,999,p{index}@example.com,DOMESTIC,123{index},IFSC0001\n"
+            for index in range(5)
+        )
+        self.job = PayeeImportJob(payor=self.payor)
+        self.job.file.save("payees.csv", ContentFile((self.HEADER + rows).encode()), save=True)
+        self.addCleanup(self.job.file.delete, save=False)
+
+    def test_retry_resumes_after_the_last_committed_chunk(self):
+        real_chunk = imports.import_payee_chunk
+        calls = []
+
+        def fail_second_chunk(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError("database went away")
+            return real_chunk(*args)
+
+        with mock.patch.object(imports, "import_payee_chunk", side_effect=fail_second_chunk):
+            with self.assertRaises(RuntimeError), self.assertLogs(imports.logger, "ERROR"):
+                imports.run_payee_import(self.job.pk)
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.created_count, self.job.last_row), ("failed", 2, 3))
+
+        imports.run_payee_import(self.job.pk)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, "completed")
+        self.assertEqual((self.job.processed_rows, self.job.created_count, self.job.error_count), (5, 5, 0))
+        self.assertEqual(Payee.objects.filter(payor=self.payor).count(), 5)
@@ -8,6 +8,8 @@ urlpatterns = [
     path('delete_payee/<int:pk>/',delete_payee,name='delete_payee'),
     path('payee-list/', payee_list, name='payee_list'),
     path('payee/<int:pk>/', payee_detail, name='payee'),
+    path('payee-import/', import_payees, name='payee_import'),
+    path('payee-import/<int:job_id>/', payee_import_status, name='payee_import_status'),
 
     #list CRUD operations
     path('create_edit_list/', create_or_update_category, name='create_edit_list'),
@@ -21,6 +23,8 @@ urlpatterns = [
 
     #referrel
     path('referral/', send_invite_email, name='add_payee'),
+    path('invite-campaigns/', create_invite_campaign, name='invite_campaign'),
+    path('invite-campaigns/<int:campaign_id>/', invite_campaign_status, name='invite_campaign_status'),
     # 1️⃣ Generate a one-time referral code (authenticated)
     path('categories/<int:category_id>/referral-code/', create_category_referral_code, name='create_category_referral_code'),
 
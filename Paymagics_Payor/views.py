@@ -4,24 +4,30 @@ from rest_framework.response import Response
 from .serializers import *
 from .models import *
 from Paymagics_Admin.models import UserProfile, UserRole
-import random, string
+from Paymagics_Admin.authentication import request_profile
 from rest_framework import status
-from rest_framework.pagination import PageNumberPagination
-import openpyxl
-from openpyxl.utils import get_column_letter
-from django.http import HttpResponse
+from Paymagics_API.pagination import get_paginator, get_total_count
+from Paymagics_API.db_router import replica_view
+from .search import search_payees
+from .imports import IMPORT_EXTENSIONS, start_payee_import
+from .invites import INVITE_MAX_RECIPIENTS, invite_link, prepare_recipients, read_invite_emails
+from .exports import export_payee_queryset, write_payee_export
+from Paymagics_PayorStaff.excel import XLSX_CONTENT_TYPE, iter_file
+from Jobs.queue import enqueue
+from Codes.generator import next_code
+from Jobs.views import job_accepted_response
+from Paymagics_Admin.dashboard import get_list_counts, invalidate_dashboard
+from django.http import HttpResponse, StreamingHttpResponse
 from datetime import datetime
-from io import BytesIO
 from django.core.mail import send_mail
 import uuid
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from Paymagics_PayorStaff.models import PaymentTemplate
+from Paymagics_PayorStaff.template_cache import get_cached_template
 from django.utils import timezone
-from django.db.models import Count, Q
-from openpyxl import Workbook
-from openpyxl.styles import Font
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 from django.conf import settings
@@ -29,10 +35,6 @@ import json
 
 
 
-def generate_referral_code(length=6):
-    """Generate a random alphanumeric referral code."""
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
-
 @api_view(["POST", "PUT"])
 @permission_classes([IsAuthenticated])
 def create_or_update_category(request):
@@ -58,7 +60,7 @@ def create_or_update_category(request):
             category=category_input,
             description=description or "",
             count=0,
-            referral_code=generate_referral_code()
+            referral_code=next_code("referral")
         )
         message = "New category created with referral code."
 
@@ -99,35 +101,33 @@ def create_or_update_category(request):
             message += " Description updated."
 
     # --- Assign category to payees if provided ---
-    newly_assigned_count = 0
+    assignment_results = []
     if payee_ids:
         if not isinstance(payee_ids, list):
             return Response({"error": "Payees must be a list of IDs."}, status=400)
 
-        for payee_id in payee_ids:
-            try:
-                payee = Payee.objects.get(id=payee_id, is_active=True)
-            except Payee.DoesNotExist:
-                return Response({"error": f"Payee with ID {payee_id} not found or inactive."}, status=404)
-
-            if not payee.categories.filter(id=category.id).exists():
-                payee.categories.add(category)
-                newly_assigned_count += 1
+        assignment_results = assign_payees_to_category(category, payee_ids)
+        newly_assigned_count = sum(1 for result in assignment_results if result["status"] == "assigned")
+        failed_count = sum(1 for result in assignment_results if result["status"] in ("not_found", "invalid"))
 
         if newly_assigned_count > 0:
-            category.count += newly_assigned_count
-            category.save()
+            category.refresh_from_db(fields=["count"])
+            invalidate_dashboard()
             message += f" Category assigned to {newly_assigned_count} payee(s) and count updated."
         else:
             message += " Category already assigned to all provided payees."
 
+        if failed_count:
+            message += f" {failed_count} payee(s) not found or inactive."
+
     return Response({
         "id": category.id,
         "category": category.category,
         "description": category.description,
         "count": category.count,
         "referral_code": category.referral_code,
-        "message": message
+        "message": message,
+        "results": assignment_results
     }, status=200)
 
 
@@ -139,11 +139,10 @@ def create_payee(request):
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    # Get current user and profile
+    # Current user's profile, resolved during authentication
     user = request.user
-    try:
-        payor = UserProfile.objects.get(user=user)
-    except UserProfile.DoesNotExist:
+    payor = request_profile(request)
+    if payor is None:
         return Response({'error': 'User profile not found.'}, status=status.HTTP_404_NOT_FOUND)
 
     # Extract validated fields
@@ -169,7 +168,7 @@ def create_payee(request):
         else:
             category, created = Category.objects.get_or_create(category=category_input, defaults={'count': 0})
 
-    referral_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+    referral_code = next_code("referral")
     payee_type = serializer.validated_data.get("payee_type", "DOMESTIC")
 
     validated_data = serializer.validated_data.copy()
@@ -183,42 +182,90 @@ def create_payee(request):
         validated_data["ifsc"] = None
         validated_data["acc_no"] = None
 
-    payee = Payee.objects.create(
-        ben_code=validated_data["ben_code"],
-        ben_name=validated_data["ben_name"],
-        add1=validated_data["add1"],
-        add2=validated_data["add2"],
-        city=validated_data["city"],
-        state=validated_data["state"],
-        zipcode=validated_data["zipcode"],
-        contact=validated_data["contact"],
-        email=validated_data["email"],
-        payee_type=validated_data["payee_type"],
-        acc_no=validated_data.get("acc_no"),
-        ifsc=validated_data.get("ifsc"),
-        iban=validated_data.get("iban"),
-        swift_code=validated_data.get("swift_code"),
-        sort_code=validated_data.get("sort_code"),
-        bank_name=validated_data.get("bank_name"),
-        branch=validated_data.get("branch"),
-        bank_account_type=validated_data.get("bank_account_type"),
-        referralcode=referral_code,
-        payor=payor
-    )
+    try:
+        with transaction.atomic():
+            payee = Payee.objects.create(
+                ben_code=validated_data["ben_code"],
+                ben_name=validated_data["ben_name"],
+                add1=validated_data["add1"],
+                add2=validated_data["add2"],
+                city=validated_data["city"],
+                state=validated_data["state"],
+                zipcode=validated_data["zipcode"],
+                contact=validated_data["contact"],
+                email=validated_data["email"],
+                payee_type=validated_data["payee_type"],
+                acc_no=validated_data.get("acc_no"),
+                ifsc=validated_data.get("ifsc"),
+                iban=validated_data.get("iban"),
+                swift_code=validated_data.get("swift_code"),
+                sort_code=validated_data.get("sort_code"),
+                bank_name=validated_data.get("bank_name"),
+                branch=validated_data.get("branch"),
+                bank_account_type=validated_data.get("bank_account_type"),
+                referralcode=referral_code,
+                payor=payor
+            )
+    except IntegrityError as e:
+        # Lost a race with a concurrent create of the same ben_code
+        if not is_ben_code_conflict(e):
+            raise
+        return Response(
+            {"error": f"Payee with ben_code '{ben_code}' already exists for this payor."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
 
-    # Add category after payee is created
+    # Add category after payee is created (the m2m_changed handler updates its count)
     if category:
-        if not payee.categories.filter(id=category.id).exists():
-            payee.categories.add(category)
-
-        # Update category count
-        category.count = Payee.objects.filter(categories=category, is_active=True).count()
-        category.save()
+        payee.categories.add(category)
 
     return Response(PayeeSerializer(payee).data, status=status.HTTP_201_CREATED)
 
 
+# bulk payee import
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def import_payees(request):
+    """
+    Queue an XLSX/CSV of payees for import. Columns are the create_payee
+    fields; an optional `category` applies to rows without their own.
+    Progress and per-row errors are read from payee_import_status.
+    """
+    file = request.FILES.get("file")
+    if not file:
+        return Response({"error": "Excel or CSV file is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not file.name.lower().endswith(IMPORT_EXTENSIONS):
+        return Response({"error": "Only .xlsx and .csv files are supported"}, status=status.HTTP_400_BAD_REQUEST)
+
+    payor = request_profile(request)
+    if payor is None:
+        return Response({'error': 'User profile not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    category = None
+    category_id = request.data.get("category")
+    if category_id:
+        category = Category.objects.filter(id=category_id).first() if str(category_id).isdigit() else None
+        if not category:
+            return Response({'error': 'Category not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    with transaction.atomic():
+        job = PayeeImportJob.objects.create(payor=payor, category=category, file=file)
+        start_payee_import(job, user=request.user)
+
+    data = PayeeImportJobSerializer(job).data
+    data["status_url"] = request.build_absolute_uri(reverse("payee_import_status", args=[job.id]))
+    return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def payee_import_status(request, job_id):
+    job = get_object_or_404(PayeeImportJob, id=job_id, payor__user=request.user)
+    return Response(PayeeImportJobSerializer(job).data)
+
+
 #edit payee
 @api_view(["PATCH"])
 @permission_classes([IsAuthenticated])
@@ -233,9 +280,8 @@ def edit_payee(request, pk):
         return Response({'error': 'Payee not found.'}, status=404)
 
     # --- Validate Requesting User ---
-    try:
-        user_profile = UserProfile.objects.get(user=request.user)
-    except UserProfile.DoesNotExist:
+    user_profile = request_profile(request)
+    if user_profile is None:
         return Response({'error': 'User profile not found.'}, status=400)
 
     serializer = UpdatePayeeSerializer(instance=payee, data=request.data, partial=True)
@@ -294,15 +340,9 @@ def edit_payee(request, pk):
         else:
             category, _ = Category.objects.get_or_create(category=category_data)
 
-        # Update category relationships safely
-        for old_cat in payee.categories.all():
-            old_cat.count = max((old_cat.count or 1) - 1, 0)
-            old_cat.save()
-
+        # Replace the category; counts are adjusted by the m2m_changed handler
         payee.categories.clear()
         payee.categories.add(category)
-        category.count = Payee.objects.filter(categories=category, is_active=True).count()
-        category.save()
 
     # --- Apply Field Updates ---
     for attr, value in validated_data.items():
@@ -326,18 +366,11 @@ def delete_payee(request, pk):
     except Payee.DoesNotExist:
         return Response({'error': 'Payee not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-    try:
-        payor = UserProfile.objects.get(user=request.user)
-    except UserProfile.DoesNotExist:
+    payor = request_profile(request)
+    if payor is None:
         return Response({'error': 'Payor profile not found.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Decrement category counts for categories assigned to this payee
-    categories = payee.categories.all()
-    for category in categories:
-        category.count = max((category.count or 1) - 1, 0)  # prevent negative count
-        category.save()
-
-    # Optional: clear category assignments from payee
+    # Clear category assignments; the m2m_changed handler decrements their counts
     payee.categories.clear()
 
     # Soft delete
@@ -352,15 +385,13 @@ def delete_payee(request, pk):
 @permission_classes([IsAuthenticated])
 def payee_list(request):
     queryset = Payee.objects.filter(is_active=True).order_by('-id')
-    total_count = queryset.count()  # total active payees
 
-    paginator = PageNumberPagination()
-    paginator.page_size = 15
+    paginator = get_paginator(request)
     result_page = paginator.paginate_queryset(queryset, request)
     serializer = PayeeSerializer(result_page, many=True)
 
     response = paginator.get_paginated_response(serializer.data)
-    response.data["total_count"] = total_count  #  add to paginated response
+    response.data["total_count"] = get_total_count(paginator)  #  add to paginated response
     return response
 
 
@@ -414,148 +445,70 @@ def delete_categ(request, pk):
 #payee list export to excel based on template
 @api_view(["GET", "POST"])
 @permission_classes([IsAuthenticated])
+@replica_view
 def export_payees_excel(request, template_id):   
     # Handle GET vs POST inputs
     if request.method == "GET":
         query = request.GET.get("q", "")
         download = request.GET.get("download", "false").lower() == "true"
+        background = request.GET.get("background", "false").lower() == "true"
     else:  # POST
         query = request.data.get("q", "")
         download = str(request.data.get("download", "false")).lower() == "true"
+        background = str(request.data.get("background", "false")).lower() == "true"
 
     # Get template (needed only for Excel)
     try:
-        template = PaymentTemplate.objects.get(id=template_id)
+        template = get_cached_template(template_id)
     except PaymentTemplate.DoesNotExist:
         return HttpResponse("Template not found.", status=404)
 
-    # Base queryset
-    payees = Payee.objects.filter(is_active=True)
-
-    # Filtering
-    if query:
-        matching_categories = Category.objects.filter(category__icontains=query)
-        payees = payees.filter(
-            Q(ben_code__icontains=query) |
-            Q(ben_name__icontains=query) |
-            Q(contact__icontains=query) |
-            Q(email__icontains=query) |
-            Q(categories__in=matching_categories)
-        ).distinct()
+    payees = export_payee_queryset(query)
 
     if not payees.exists():
         return HttpResponse("No payees found.", status=404)
 
     # 👉 If not downloading, return paginated JSON (view mode)
     if not download:
-        paginator = PageNumberPagination()
-        paginator.page_size = 15
+        paginator = get_paginator(request)
         result_page = paginator.paginate_queryset(payees, request)
         serializer = PayeeSerializer(result_page, many=True)
         return paginator.get_paginated_response(serializer.data)
 
-    # 👉 Otherwise, export as Excel
-    dynamic_fields = template.dynamic_fields or {}
-    static_fields = template.static_fields or {}
-    options_fields = template.options or {}
+    # 👉 background=true: build the file on a worker and poll the returned job
+    if background:
+        job = enqueue("payee_export", {"template_id": template.id, "q": query}, user=request.user)
+        return job_accepted_response(request, job)
 
-    # Use field_order if available, otherwise fallback to default order
-    if template.field_order:
-        headers = template.field_order
-    else:
-        # Fallback to default order: dynamic -> static -> options
-        dynamic_headers = list(dynamic_fields.keys())
-        static_headers = list(static_fields.keys())
-        options_headers = list(options_fields.keys())
-        headers = dynamic_headers + static_headers + options_headers
-
-    wb = Workbook()
-    ws = wb.active
-    # Remove the worksheet title
-    # ws.title = template.name or "Payee Export"
-
-    # Headers
-    for col_num, header in enumerate(headers, start=1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        cell.font = Font(bold=True)
-
-    # Data
-    for row_num, payee in enumerate(payees, start=2):
-        for col_num, header in enumerate(headers, start=1):
-            value = ""
-            
-            # Check dynamic fields
-            if header in dynamic_fields:
-                model_field = dynamic_fields[header]
-                value = getattr(payee, model_field, "")
-            
-            # Check static fields
-            elif header in static_fields:
-                value = static_fields.get(header, "")
-            
-            # Check options fields
-            elif header in options_fields:
-                value = options_fields.get(header, "")
-            
-            # Convert lists or dicts to string for Excel
-            if isinstance(value, (list, dict)):
-                value = json.dumps(value)
-            
-            ws.cell(row=row_num, column=col_num, value=value)
-
-    # Auto column width
-    for col_num, _ in enumerate(headers, start=1):
-        col_letter = get_column_letter(col_num)
-        max_length = max(
-            len(str(ws.cell(row=row, column=col_num).value or "")) 
-            for row in range(1, ws.max_row + 1)
-        )
-        ws.column_dimensions[col_letter].width = min(max_length + 2, 50)  # Cap at 50 for readability
-
-    file_stream = BytesIO()
-    wb.save(file_stream)
-    file_stream.seek(0)
+    # 👉 Otherwise, export as Excel
+    file_obj = write_payee_export(template, payees)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     # Remove template name from filename
     filename = f"payees_export_{timestamp}.xlsx"
 
-    response = HttpResponse(
-        file_stream.getvalue(),
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    response = StreamingHttpResponse(iter_file(file_obj), content_type=XLSX_CONTENT_TYPE)
     response["Content-Disposition"] = f'attachment; filename="{filename}"'
     return response
 
 
 
-def generate_unique_ben_code():
-    """Generate a unique 8-character beneficiary code."""
-    while True:
-        ben_code = "BEN" + ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
-        if not Payee.objects.filter(ben_code=ben_code).exists():
-            return ben_code
-
-
-
-
 #view payees corresponding to list
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def payees_in_list(request, category):
     payees = Payee.objects.filter(categories__id=category, is_active=True)
-    total_count = payees.count()  # 👈 total number of payees in this category
 
-    if total_count == 0:
+    paginator = get_paginator(request)
+    result_page = paginator.paginate_queryset(payees, request)
+
+    if not result_page:
         return Response({'error': 'No payees found for this category.'}, status=status.HTTP_404_NOT_FOUND)
 
-    paginator = PageNumberPagination()
-    paginator.page_size = 15
-    result_page = paginator.paginate_queryset(payees, request)
     serializer = PayeeSerializer(result_page, many=True)
 
     response = paginator.get_paginated_response(serializer.data)
-    response.data["total_count"] = total_count  # 👈 add total count to response
+    response.data["total_count"] = get_total_count(paginator)  # 👈 add total count to response
 
     return response
 
@@ -565,25 +518,9 @@ def payees_in_list(request, category):
 #dashboard -payee
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@replica_view
 def list_counts(request):
-    # Total categories
-    total_categories = Category.objects.count()
-
-    # Active categories: categories with at least one active payee
-    active_categories = Category.objects.annotate(
-        active_payees_count=Count('payees', filter=Q(payees__is_active=True))
-    ).filter(active_payees_count__gt=0).count()
-
-    # Total payees
-    total_payees = Payee.objects.filter(is_active=True).count()
-
-    data = {
-        "total_lists": total_categories,
-        "active_lists": active_categories,
-        "total_payees": total_payees
-    }
-
-    return Response(data, status=200)
+    return Response(get_list_counts(), status=200)
 
 
 #------------------------delete file
@@ -593,7 +530,7 @@ def delete_files(request, batch_name):
     if not batch_name:
         return Response({"error": "Batch name is required."}, status=400)
 
-    deleted_count, _ = TemplatePayee.objects.filter(batch_name=batch_name).delete()
+    deleted_count, _ = Batch.objects.filter(name=batch_name).delete()
 
     if deleted_count == 0:
         return Response({"message": f"No TemplatePayees found for batch '{batch_name}'."}, status=404)
@@ -607,7 +544,7 @@ def delete_files(request, batch_name):
 @permission_classes([IsAuthenticated])
 def payment_template_options(request, template_id):
     try:
-        template = PaymentTemplate.objects.get(id=template_id, template_type="payment")
+        template = get_cached_template(template_id, template_type="payment")
     except PaymentTemplate.DoesNotExist:
         return Response({"error": "Payee template not found."}, status=404)
 
@@ -648,10 +585,8 @@ def remove_payee_from_category(request):
     if payee.categories.filter(id=category.id).exists():
         payee.categories.remove(category)
 
-        # Decrease count safely
-        if category.count > 0:
-            category.count -= 1
-            category.save()
+        # The m2m_changed handler already decremented the count
+        category.refresh_from_db(fields=["count"])
 
         message = f"Category '{category.category}' removed from payee '{payee.ben_name}'."
     else:
@@ -730,8 +665,7 @@ def send_invite_email(request):
             return Response({'error': 'Category not found.'}, status=404)
 
         # ✅ Build referral link
-        frontend_base_url = "https://paymagics-frontend.vercel.app/invite"
-        referral_link = f"{frontend_base_url}?referral_code={referral_code}"
+        referral_link = invite_link(referral_code)
 
         # ✅ Render HTML email
         message = render_to_string('referral_email.html', {
@@ -756,13 +690,95 @@ def send_invite_email(request):
 
 
 
-def generate_unique_ben_code(length=8):
-    """Generate a unique ben_code."""
-    while True:
-        ben_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
-        if not Payee.objects.filter(ben_code=ben_code).exists():
-            return ben_code
+# bulk referral invites
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def create_invite_campaign(request):
+    """
+    Queue referral invites for many addresses: an `emails` list, or an
+    XLSX/CSV `file` with an `email` column. Each valid address gets its own
+    one-time code for `category`; invalid and repeated addresses are kept
+    on the campaign and skipped. Progress is read from invite_campaign_status.
+    """
+    category_id = request.data.get("category")
+    if not category_id:
+        return Response({"error": "Category not provided"}, status=status.HTTP_400_BAD_REQUEST)
+
+    payor = request_profile(request)
+    if payor is None:
+        return Response({'error': 'User profile not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    category = Category.objects.filter(id=category_id).first() if str(category_id).isdigit() else None
+    if not category:
+        return Response({'error': 'Category not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    file = request.FILES.get("file")
+    if file:
+        if not file.name.lower().endswith(IMPORT_EXTENSIONS):
+            return Response({"error": "Only .xlsx and .csv files are supported"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            emails = read_invite_emails(file, file.name)
+        except Exception as e:
+            return Response({"error": f"Could not read file: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        emails = request.data.get("emails")
+        if hasattr(request.data, "getlist"):
+            emails = request.data.getlist("emails")
+        if isinstance(emails, str):
+            emails = emails.replace(";", ",").replace("\n", ",").split(",")
+
+    emails = [e for e in (emails or []) if str(e).strip()]
+    if not emails:
+        return Response({"error": "No email addresses provided"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(emails) > INVITE_MAX_RECIPIENTS:
+        return Response(
+            {"error": f"A campaign can have at most {INVITE_MAX_RECIPIENTS} recipients"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
+    recipients = prepare_recipients(emails)
+    pending = sum(1 for _, invite_status in recipients if invite_status == "pending")
+    if not pending:
+        return Response({"error": "No valid email addresses provided"}, status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        campaign = InviteCampaign.objects.create(
+            payor=payor,
+            category=category,
+            custom_msg=request.data.get("message") or "You are invited!",
+            total=len(recipients),
+            invalid_count=len(recipients) - pending,
+        )
+        CampaignInvite.objects.bulk_create(
+            [CampaignInvite(campaign=campaign, email=email, status=invite_status) for email, invite_status in recipients],
+            batch_size=1000,
+        )
+        enqueue("invite_campaign", {"campaign_id": campaign.pk}, user=request.user)
+
+    data = InviteCampaignSerializer(campaign).data
+    data["status_url"] = request.build_absolute_uri(reverse("invite_campaign_status", args=[campaign.id]))
+    return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def invite_campaign_status(request, campaign_id):
+    """Campaign counters plus its invites, paginated and optionally filtered by ?status="""
+    campaign = get_object_or_404(InviteCampaign, id=campaign_id, payor__user=request.user)
+
+    invites = campaign.invites.order_by("id")
+    invite_status = request.GET.get("status")
+    if invite_status:
+        invites = invites.filter(status=invite_status)
+
+    paginator = get_paginator(request)
+    result_page = paginator.paginate_queryset(invites, request)
+    serializer = CampaignInviteSerializer(result_page, many=True)
+
+    response = paginator.get_paginated_response(serializer.data)
+    response.data["total_count"] = get_total_count(paginator)
+    response.data["campaign"] = InviteCampaignSerializer(campaign).data
+    return response
 
 
 
@@ -795,9 +811,8 @@ def create_payee_via_referral(request, referral_code):
     validated_data = serializer.validated_data
     payee_type = validated_data.get("payee_type", "DOMESTIC").upper()
 
-    # 3️⃣ Generate codes
-    ben_code = generate_unique_ben_code()
-    new_referral_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+    # 3️⃣ Generate codes (the ben_code is drawn at insert time, see step 6)
+    new_referral_code = next_code("referral")
 
     # 4️⃣ Validate banking fields
     acc_no, ifsc, iban, swift = (
@@ -822,9 +837,8 @@ def create_payee_via_referral(request, referral_code):
     if Payee.objects.filter(email=validated_data["email"], is_active=True).exists():
         return Response({"error": "A Payee with this email already exists."}, status=400)
 
-    # 6️⃣ Create Payee
-    payee = Payee.objects.create(
-        ben_code=ben_code,
+    # 6️⃣ Create Payee, retrying with a new ben_code if one is already taken
+    payee = create_payee_with_generated_code(
         ben_name=validated_data["ben_name"],
         add1=validated_data.get("add1"),
         add2=validated_data.get("add2"),
@@ -848,14 +862,10 @@ def create_payee_via_referral(request, referral_code):
 
     payee.categories.add(category)
 
-    # 7️⃣ Mark referral as used
+    # 7️⃣ Mark referral as used (category count is updated by the m2m_changed handler)
     cat_ref.mark_used(payee)
 
-    # 8️⃣ Update category count
-    category.count = Payee.objects.filter(categories=category, is_active=True).count()
-    category.save()
-
-    # 9️⃣ Return created Payee
+    # 8️⃣ Return created Payee
     return Response(PayeeSerializer(payee).data, status=status.HTTP_201_CREATED)
 
 
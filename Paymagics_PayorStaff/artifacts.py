@@ -0,0 +1,117 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import InvalidStorageError, storages
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .excel import get_template_headers, write_batch_workbook
+from .models import ExportArtifact
+
+
+# Hits refresh last_accessed at most this often, so repeat downloads rarely write
+TOUCH_INTERVAL = timedelta(minutes=1)
+
+
+def export_storage():
+    """STORAGES["exports"] when configured, otherwise the default storage"""
+    try:
+        return storages["exports"]
+    except InvalidStorageError:
+        return storages["default"]
+
+
+def _max_bytes():
+    return getattr(settings, "EXPORT_CACHE_MAX_BYTES", 1024 ** 3)
+
+
+def batch_export_key(batch):
+    """
+    Content key for a batch export. It changes whenever the rows (batch.version)
+    or the template layout (template.updated_at) change, and doubles as the ETag.
+    """
+    template = batch.template
+    parts = [
+        "batch", batch.id, batch.version,
+        template.id, template.updated_at.isoformat(), "|".join(get_template_headers(template)),
+    ]
+    return hashlib.sha256(":".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def get_batch_export(batch, key=None):
+    """
+    Return the cached ExportArtifact for `batch`, building and storing the
+    workbook first on a miss. A hit costs one indexed lookup and a stat.
+    """
+    key = key or batch_export_key(batch)
+    storage = export_storage()
+    now = timezone.now()
+
+    artifact = ExportArtifact.objects.filter(key=key).first()
+    if artifact is not None:
+        if storage.exists(artifact.file_name):
+            if now - artifact.last_accessed > TOUCH_INTERVAL:
+                ExportArtifact.objects.filter(pk=artifact.pk).update(last_accessed=now)
+            return artifact
+        # The file went missing underneath us: rebuild it
+        artifact.delete()
+
+    with write_batch_workbook(batch) as file_obj:
+        file_name = storage.save(f"batch_exports/{batch.id}/{key}.xlsx", File(file_obj))
+
+    try:
+        with transaction.atomic():
+            artifact = ExportArtifact.objects.create(
+                key=key,
+                batch=batch,
+                file_name=file_name,
+                size=storage.size(file_name),
+                last_accessed=now,
+            )
+    except IntegrityError:
+        # A concurrent request stored the same content first; keep theirs
+        storage.delete(file_name)
+        return ExportArtifact.objects.get(key=key)
+
+    # Older versions of this batch can never be requested again
+    ExportArtifact.objects.filter(batch=batch).exclude(pk=artifact.pk).delete()
+
+    evict_export_artifacts(keep=artifact.pk)
+    return artifact
+
+
+def open_batch_export(batch, key=None):
+    """
+    Open the cached export file for `batch`, building it if needed. Another
+    request can evict the artifact between the lookup and the open; that is
+    a miss like any other, so the export is built again.
+    """
+    key = key or batch_export_key(batch)
+    artifact = get_batch_export(batch, key)
+    try:
+        return export_storage().open(artifact.file_name, "rb")
+    except FileNotFoundError:
+        ExportArtifact.objects.filter(pk=artifact.pk).delete()
+    artifact = get_batch_export(batch, key)
+    return export_storage().open(artifact.file_name, "rb")
+
+
+def evict_export_artifacts(max_bytes=None, keep=None):
+    """
+    Delete least recently used artifacts until the cache fits in `max_bytes`.
+    `keep` is never evicted, so a file that is about to be served survives.
+    """
+    max_bytes = _max_bytes() if max_bytes is None else max_bytes
+    total = ExportArtifact.objects.aggregate(total=Sum("size"))["total"] or 0
+
+    evicted = 0
+    for artifact in ExportArtifact.objects.exclude(pk=keep).order_by("last_accessed", "id").iterator():
+        if total <= max_bytes:
+            break
+        total -= artifact.size
+        artifact.delete()
+        evicted += 1
+    return evicted
@@ -0,0 +1,246 @@
+import pickle
+import tempfile
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+from .plans import get_row_plan
+
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Rows fetched from the DB per round trip while streaming a batch
+EXPORT_CHUNK_SIZE = 2000
+
+# Bytes handed to the WSGI server per chunk of the finished file
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+def get_template_headers(template):
+    """Column headers for a template: field_order, or dynamic -> static -> options"""
+    return list(get_row_plan(template).headers)
+
+
+def build_streaming_workbook(rows, headers, title=None, width_padding=5, max_width=None):
+    """
+    Write `rows` (an iterable of value lists) into a write-only workbook.
+
+    Column widths have to be known before the first row is written, so rows
+    are spooled to a temporary file while widths are measured, then replayed
+    into the worksheet. Memory stays flat regardless of the row count. The
+    spool is pickled, so numbers, dates and Decimals come back as themselves
+    and keep their cell types.
+
+    Returns an open binary file positioned at the start of the .xlsx data.
+    """
+    widths = [len(str(header)) for header in headers]
+
+    with tempfile.TemporaryFile() as spool:
+        for values in rows:
+            for index, value in enumerate(values):
+                length = len(str(value if value is not None else ""))
+                if length > widths[index]:
+                    widths[index] = length
+            pickle.dump(values, spool, pickle.HIGHEST_PROTOCOL)
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title=title)
+
+        for col_num, width in enumerate(widths, start=1):
+            width += width_padding
+            if max_width:
+                width = min(width, max_width)
+            ws.column_dimensions[get_column_letter(col_num)].width = width
+
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = Font(bold=True)
+            header_cells.append(cell)
+        ws.append(header_cells)
+
+        spool.seek(0)
+        while True:
+            try:
+                values = pickle.load(spool)
+            except EOFError:
+                break
+            ws.append(values)
+
+        output = tempfile.TemporaryFile()
+        wb.save(output)
+
+    output.seek(0)
+    return output
+
+
+def write_batch_workbook(batch):
+    """Build the .xlsx for a Batch, streaming its rows from the DB in chunks"""
+    plan = get_row_plan(batch.template)
+    rows = (
+        plan.batch_row_values(tp)
+        for tp in batch.template_payees.select_related("payee").order_by("id").iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return build_streaming_workbook(rows, plan.headers, title=batch.name)
+
+
+def iter_file(file_obj, block_size=STREAM_BLOCK_SIZE):
+    """Yield a file in fixed-size blocks and close it once exhausted"""
+    try:
+        while True:
+            block = file_obj.read(block_size)
+            if not block:
+                break
+            yield block
+    finally:
+        file_obj.close()
+
+
+# ----------------------------- template upload
+
+# A payment column with up to this many distinct values becomes an options field
+OPTIONS_MAX_VALUES = 4
+
+# Data rows read from an uploaded sheet before classification stops
+UPLOAD_MAX_ROWS = 200000
+
+
+class ColumnSketch:
+    """
+    Bounded summary of one uploaded column: its first value and up to
+    OPTIONS_MAX_VALUES + 1 distinct non-empty values. Once a column has more
+    distinct values than an options field may hold it stops tracking them.
+    """
+    __slots__ = ("first_value", "distinct", "overflowed")
+
+    def __init__(self, first_value):
+        self.first_value = first_value
+        self.distinct = {}
+        self.overflowed = False
+
+    def add(self, value):
+        if value is None or self.overflowed or value in self.distinct:
+            return
+        self.distinct[value] = None
+        if len(self.distinct) > OPTIONS_MAX_VALUES:
+            self.overflowed = True
+            self.distinct = {}
+
+    @property
+    def settled(self):
+        """True once more rows can't change how this column is classified"""
+        return self.overflowed
+
+
+class TemplateUploadError(Exception):
+    pass
+
+
+def parse_template_upload(file_obj, template_type):
+    """
+    Read an uploaded sheet and work out the template it describes.
+
+    Returns (dynamic_fields, static_fields, option_fields, field_order);
+    raises TemplateUploadError with a user-facing message otherwise.
+    """
+    from Paymagics_Payor.models import Payee
+
+    try:
+        wb = load_workbook(file_obj, read_only=True, data_only=True)
+        sheet = wb.active
+    except Exception as e:
+        raise TemplateUploadError(f"Invalid Excel file: {str(e)}")
+
+    try:
+        headers = read_template_headers(sheet)
+        if not headers:
+            raise TemplateUploadError("Excel has no headers")
+
+        payee_fields = set([f.name for f in Payee._meta.fields])
+        classified = classify_template_columns(sheet, headers, payee_fields, template_type)
+    finally:
+        wb.close()
+
+    if classified is None:
+        raise TemplateUploadError("Excel has no data rows")
+
+    dynamic_fields, static_fields, option_fields = classified
+    return dynamic_fields, static_fields, option_fields, [col for _, col in headers]
+
+
+def read_template_headers(sheet):
+    """(column index, normalized header) for every non-empty header cell"""
+    first_row = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+    return [
+        (index, str(value).strip().replace(" ", "_").lower())
+        for index, value in enumerate(first_row)
+        if value
+    ]
+
+
+def classify_template_columns(sheet, headers, payee_fields, template_type, max_rows=UPLOAD_MAX_ROWS):
+    """
+    Classify uploaded columns into dynamic, static and option fields in one
+    streaming pass over `sheet`, using constant memory per column.
+
+    Returns (dynamic_fields, static_fields, option_fields), or None when the
+    sheet has no data rows.
+    """
+    dynamic_fields = {col: col for _, col in headers if col in payee_fields}
+    tracked = [(index, col) for index, col in headers if col not in payee_fields]
+
+    sketches = None
+    rows_read = 0
+
+    for row in sheet.iter_rows(min_row=2, values_only=True):
+        if all(v is None for v in row):
+            continue
+
+        values = [row[index] if index < len(row) else None for index, _ in tracked]
+
+        if sketches is None:
+            sketches = [ColumnSketch(value) for value in values]
+
+        for sketch, value in zip(sketches, values):
+            sketch.add(value)
+
+        rows_read += 1
+        if rows_read >= max_rows:
+            break
+
+        if template_type == "payment":
+            if all(sketch.settled for sketch in sketches):
+                break
+        elif all(sketch.distinct or sketch.overflowed for sketch in sketches):
+            # Non-payment templates only need the first row and whether a value exists
+            break
+
+    if sketches is None:
+        return None
+
+    static_fields = {}
+    option_fields = {}
+
+    for (_, col), sketch in zip(tracked, sketches):
+        has_values = bool(sketch.distinct) or sketch.overflowed
+
+        if template_type == "payment":
+            # Static field (only one value)
+            if not sketch.overflowed and len(sketch.distinct) == 1:
+                static_fields[col] = str(next(iter(sketch.distinct)))
+
+            # Options field (2–4 values)
+            elif not sketch.overflowed and len(sketch.distinct) >= 2:
+                option_fields[col] = [str(v) for v in sketch.distinct]
+
+            # More values than that → treat as static
+            else:
+                static_fields[col] = str(sketch.first_value)
+
+        else:
+            # For non-payment templates → ALL fields treated as static
+            static_fields[col] = str(sketch.first_value) if has_values else None
+
+    return dynamic_fields, static_fields, option_fields
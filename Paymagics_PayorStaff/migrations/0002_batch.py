@@ -0,0 +1,82 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def populate_batches(apps, schema_editor):
+    """Create one Batch per distinct TemplatePayee.batch_name and link its rows"""
+    Batch = apps.get_model("Paymagics_PayorStaff", "Batch")
+    TemplatePayee = apps.get_model("Paymagics_PayorStaff", "TemplatePayee")
+    db_alias = schema_editor.connection.alias
+
+    groups = (
+        TemplatePayee.objects.using(db_alias)
+        .values("batch_name")
+        .annotate(first_id=Min("id"), created_at=Min("added_at"), row_count=Count("id"))
+        .order_by("first_id")
+    )
+
+    for group in groups:
+        batch_name = group["batch_name"]
+        template_id = TemplatePayee.objects.using(db_alias).values_list("template_id", flat=True).get(id=group["first_id"])
+
+        batch = Batch.objects.using(db_alias).create(
+            name=batch_name or f"Batch_{group['first_id']}",
+            template_id=template_id,
+            row_count=group["row_count"],
+        )
+        # auto_now_add ignores the value passed to create()
+        Batch.objects.using(db_alias).filter(id=batch.id).update(created_at=group["created_at"])
+
+        if batch_name is None:
+            rows = TemplatePayee.objects.using(db_alias).filter(batch_name__isnull=True)
+        else:
+            rows = TemplatePayee.objects.using(db_alias).filter(batch_name=batch_name)
+        rows.update(batch=batch)
+
+
+def restore_batch_names(apps, schema_editor):
+    Batch = apps.get_model("Paymagics_PayorStaff", "Batch")
+    TemplatePayee = apps.get_model("Paymagics_PayorStaff", "TemplatePayee")
+    db_alias = schema_editor.connection.alias
+
+    for batch in Batch.objects.using(db_alias).all():
+        TemplatePayee.objects.using(db_alias).filter(batch=batch).update(batch_name=batch.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Paymagics_PayorStaff', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Batch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=150, unique=True)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('exported', 'Exported')], default='draft', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batches', to='Paymagics_PayorStaff.paymenttemplate')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='templatepayee',
+            name='batch',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='template_payees', to='Paymagics_PayorStaff.batch'),
+        ),
+        migrations.RunPython(populate_batches, restore_batch_names),
+        migrations.AlterField(
+            model_name='templatepayee',
+            name='batch',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='template_payees', to='Paymagics_PayorStaff.batch'),
+        ),
+        migrations.RemoveField(
+            model_name='templatepayee',
+            name='batch_name',
+        ),
+    ]
@@ -1,6 +1,11 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from Paymagics_Admin.models import UserProfile
+from .plans import forget_row_plans, get_row_plan
+from .template_cache import invalidate_template
 
 
 class PaymentTemplate(models.Model):
@@ -19,104 +24,85 @@ class PaymentTemplate(models.Model):
     field_order = models.JSONField(blank=True, null=True, default=list)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="templates")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} ({self.get_template_type_display()})"
     
     def get_ordered_fields(self):
         """Get all fields in user-defined order across categories"""
-        if not self.field_order:
-            return self._get_default_ordered_fields()
-        
-        ordered_result = {}
-        
-        # Add fields in the specified order
-        for field_name in self.field_order:
-            # Check dynamic fields
-            if self.dynamic_fields and field_name in self.dynamic_fields:
-                ordered_result[field_name] = {
-                    'value': self.dynamic_fields[field_name],
-                    'type': 'dynamic',
-                    'key': field_name
-                }
-            # Check static fields
-            elif self.static_fields and field_name in self.static_fields:
-                ordered_result[field_name] = {
-                    'value': self.static_fields[field_name],
-                    'type': 'static', 
-                    'key': field_name
-                }
-            # Check options
-            elif self.options and field_name in self.options:
-                ordered_result[field_name] = {
-                    'value': self.options[field_name],
-                    'type': 'option',
-                    'key': field_name
-                }
-        
-        # Add any remaining fields that weren't in the order list
-        ordered_result.update(self._get_remaining_fields(ordered_result))
-        
-        return ordered_result
-
-    def _get_default_ordered_fields(self):
-        """Get fields in default order when no custom order is defined"""
-        result = {}
-        
-        # Dynamic fields first
-        if self.dynamic_fields:
-            for key, value in self.dynamic_fields.items():
-                result[key] = {'value': value, 'type': 'dynamic', 'key': key}
-        
-        # Static fields next
-        if self.static_fields:
-            for key, value in self.static_fields.items():
-                result[key] = {'value': value, 'type': 'static', 'key': key}
-        
-        # Options last
-        if self.options:
-            for key, value in self.options.items():
-                result[key] = {'value': value, 'type': 'option', 'key': key}
-        
-        return result
-
-    def _get_remaining_fields(self, existing_ordered):
-        """Get fields that weren't included in the custom order"""
-        existing_keys = set(existing_ordered.keys())
-        remaining = {}
-        
-        # Check dynamic fields
-        if self.dynamic_fields:
-            for key, value in self.dynamic_fields.items():
-                if key not in existing_keys:
-                    remaining[key] = {'value': value, 'type': 'dynamic', 'key': key}
-        
-        # Check static fields
-        if self.static_fields:
-            for key, value in self.static_fields.items():
-                if key not in existing_keys:
-                    remaining[key] = {'value': value, 'type': 'static', 'key': key}
-        
-        # Check options
-        if self.options:
-            for key, value in self.options.items():
-                if key not in existing_keys:
-                    remaining[key] = {'value': value, 'type': 'option', 'key': key}
-        
-        return remaining
+        return get_row_plan(self).ordered_fields()
 
 
 
+class Batch(models.Model):
+    STATUS_CHOICES = (
+        ("draft", "Draft"),
+        ("exported", "Exported"),
+    )
+
+    name = models.CharField(max_length=150, unique=True)
+    template = models.ForeignKey(PaymentTemplate, on_delete=models.CASCADE, related_name="batches")
+    row_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="draft")
+    # Bumped whenever the batch's rows change; part of the export cache key
+    version = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.row_count} rows) in {self.template.name}"
+
+
+class ExportArtifact(models.Model):
+    """A generated export kept in export storage, looked up by its content key"""
+    key = models.CharField(max_length=64, unique=True)
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name="export_artifacts")
+    file_name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.size} bytes)"
+
+
 class TemplatePayee(models.Model):
     template = models.ForeignKey(PaymentTemplate, on_delete=models.CASCADE, related_name="payees")
     payee = models.ForeignKey('Paymagics_Payor.Payee', on_delete=models.CASCADE)
 
-    batch_name = models.CharField(max_length=150, blank=True, null=True)
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name="template_payees")
 
     dynamic_data = models.JSONField(blank=True, null=True)
     static_data = models.JSONField(blank=True, null=True)
     options_data = models.JSONField(blank=True, null=True)
     added_at = models.DateTimeField(auto_now_add=True)
 
+    @property
+    def batch_name(self):
+        return self.batch.name
+
     def __str__(self):
-        return f"{self.payee.ben_name} ({self.batch_name or 'default'}) in {self.template.name}"
+        return f"{self.payee.ben_name} ({self.batch.name}) in {self.template.name}"
+
+
+@receiver(post_save, sender=PaymentTemplate)
+@receiver(post_delete, sender=PaymentTemplate)
+def invalidate_template_caches(sender, instance, **kwargs):
+    forget_row_plans(instance.pk)
+    invalidate_template(sender, instance, **kwargs)
+
+
+@receiver(post_delete, sender=ExportArtifact)
+def delete_export_file(sender, instance, **kwargs):
+    # Also runs for artifacts removed by a Batch cascade
+    from .artifacts import export_storage
+
+    export_storage().delete(instance.file_name)
+
+
+@receiver(pre_delete, sender="Paymagics_Payor.Payee")
+def bump_batch_versions(sender, instance, **kwargs):
+    # Deleting a payee cascades to its TemplatePayees without going through
+    # update_batch_excel, so the batches' cached exports must be keyed anew.
+    # Done before the delete, while the rows still show which batches they were in.
+    Batch.objects.filter(template_payees__payee=instance).update(version=F("version") + 1)
@@ -0,0 +1,193 @@
+import json
+import threading
+from collections import OrderedDict
+
+from django.apps import apps
+
+
+# Compiled plans kept per process; a saved template gets a new updated_at and so a new key
+ROW_PLAN_CACHE_SIZE = 256
+
+_MISSING = object()
+
+_row_plans = OrderedDict()
+_row_plans_lock = threading.Lock()
+
+
+class RowPlan:
+    """
+    A template's field layout resolved once: which header comes from where and
+    in what order. Row renderers loop over these tuples instead of re-reading
+    dynamic_fields/static_fields/options and field_order for every row.
+
+    `fields` is an ordered tuple of (header, kind, source) where kind is
+    "dynamic" (source is the Payee attribute), "static" or "option" (source
+    is the template value). Headers in field_order come first, then the rest
+    in dynamic -> static -> option order. A header defined in more than one
+    section resolves to the first of dynamic, static, option.
+    """
+    __slots__ = ("fields", "headers", "field_order", "dynamic_columns", "export_fields", "export_columns", "order_columns")
+
+    def __init__(self, template):
+        dynamic_fields = template.dynamic_fields or {}
+        static_fields = template.static_fields or {}
+        options = template.options or {}
+        field_order = list(template.field_order or [])
+
+        sections = (("dynamic", dynamic_fields), ("static", static_fields), ("option", options))
+
+        def resolve(header):
+            for kind, values in sections:
+                if header in values:
+                    return (header, kind, values[header])
+            return None
+
+        fields = []
+        seen = set()
+        for header in field_order + [key for _, values in sections for key in values]:
+            if header in seen:
+                continue
+            spec = resolve(header)
+            if spec is not None:
+                seen.add(header)
+                fields.append(spec)
+        self.fields = tuple(fields)
+
+        # Export column order: field_order when set, otherwise every key by section
+        self.headers = tuple(field_order) if field_order else tuple(key for _, values in sections for key in values)
+        self.field_order = tuple(field_order)
+
+        payee_fields = {field.name: field for field in apps.get_model("Paymagics_Payor", "Payee")._meta.concrete_fields}
+
+        # (header, Payee field or None) for snapshotting a payee into TemplatePayee.dynamic_data
+        self.dynamic_columns = tuple((header, payee_fields.get(attr)) for header, attr in dynamic_fields.items())
+        # (header, kind, source) per export column; kind is None for headers no section defines
+        by_header = {spec[0]: spec for spec in self.fields}
+        self.export_fields = tuple(by_header.get(header, (header, None, None)) for header in self.headers)
+
+        # (header, Payee attribute or None) per export column / per field_order entry
+        self.export_columns = tuple((header, dynamic_fields.get(header)) for header in self.headers)
+        self.order_columns = tuple((header, dynamic_fields.get(header)) for header in self.field_order)
+
+    # ----------------------------- renderers
+
+    def ordered_fields(self):
+        """PaymentTemplate.get_ordered_fields() payload"""
+        return {
+            header: {"value": source, "type": kind, "key": header}
+            for header, kind, source in self.fields
+        }
+
+    def payee_dynamic_data(self, payee, missing=_MISSING):
+        """
+        Payee fields keyed by template header (FKs resolve to their id, like
+        model_to_dict). Headers mapped to no Payee field get `missing`, or are
+        left out when it isn't given.
+        """
+        data = {}
+        for header, field in self.dynamic_columns:
+            if field is not None:
+                data[header] = field.value_from_object(payee)
+            elif missing is not _MISSING:
+                data[header] = missing
+        return data
+
+    def payee_preview(self, payee):
+        """One payee rendered with the template's defaults (fetch_payees_for_template)"""
+        return {
+            header: getattr(payee, source, None) if kind == "dynamic" else source
+            for header, kind, source in self.fields
+        }
+
+    def payee_export_values(self, payee):
+        """Export cells for a payee: payee attribute, else the template's static/option value"""
+        values = []
+        for header, kind, source in self.export_fields:
+            if kind == "dynamic":
+                value = getattr(payee, source, "")
+            elif kind is None:
+                value = ""
+            else:
+                value = source
+            values.append(json.dumps(value) if isinstance(value, (list, dict)) else value)
+        return values
+
+    def batch_row_values(self, template_payee):
+        """Export cells for a TemplatePayee: its stored data first, then the live payee"""
+        dynamic_data = template_payee.dynamic_data or {}
+        static_data = template_payee.static_data or {}
+        options_data = template_payee.options_data or {}
+        payee = template_payee.payee
+
+        values = []
+        for header, attr in self.export_columns:
+            value = dynamic_data.get(header, _MISSING)
+            if value is _MISSING:
+                value = static_data.get(header, _MISSING)
+            if value is _MISSING:
+                value = options_data.get(header, _MISSING)
+            if value is _MISSING:
+                value = getattr(payee, attr, "") if attr is not None and payee is not None else ""
+
+            values.append(json.dumps(value) if isinstance(value, (list, dict)) else value)
+        return values
+
+    def batch_row_details(self, template_payee):
+        """
+        A TemplatePayee as {header: value} for the field_order headers only
+        (get_batch_payees). Options and static data win over the payee's own
+        non-empty values.
+        """
+        static_data = template_payee.static_data or {}
+        options_data = template_payee.options_data or {}
+        payee = template_payee.payee
+
+        details = {}
+        for header, attr in self.order_columns:
+            value = options_data.get(header, _MISSING)
+            if value is _MISSING:
+                value = static_data.get(header, _MISSING)
+            if value is _MISSING and attr is not None:
+                value = getattr(payee, attr, None)
+                if value is None:
+                    continue
+            if value is not _MISSING:
+                details[header] = value
+        return details
+
+    def order_row(self, data):
+        """`data` with field_order keys first, then the rest in their own order"""
+        if not self.field_order:
+            return data
+        ordered = {header: data[header] for header in self.field_order if header in data}
+        for header, value in data.items():
+            if header not in ordered:
+                ordered[header] = value
+        return ordered
+
+
+def get_row_plan(template):
+    """The compiled RowPlan for `template`, built at most once per saved version"""
+    if template.pk is None:
+        return RowPlan(template)
+
+    key = (template.pk, template.updated_at)
+    with _row_plans_lock:
+        plan = _row_plans.get(key)
+        if plan is not None:
+            _row_plans.move_to_end(key)
+            return plan
+
+    plan = RowPlan(template)
+    with _row_plans_lock:
+        _row_plans[key] = plan
+        if len(_row_plans) > ROW_PLAN_CACHE_SIZE:
+            _row_plans.popitem(last=False)
+    return plan
+
+
+def forget_row_plans(template_id):
+    """Drop every cached plan for a template; called when it is saved or deleted"""
+    with _row_plans_lock:
+        for key in [key for key in _row_plans if key[0] == template_id]:
+            del _row_plans[key]
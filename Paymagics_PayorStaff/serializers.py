@@ -1,9 +1,12 @@
 # Paymagics_PayorStaff/serializers.py
 from rest_framework import serializers
-from .models import PaymentTemplate, TemplatePayee  
+from .models import PaymentTemplate, TemplatePayee
+from Paymagics_API.serializers import EagerLoadingMixin
 
-class TemplatePayeeSerializer(serializers.ModelSerializer):
+class TemplatePayeeSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     payee_details = serializers.SerializerMethodField()
+    batch_name = serializers.CharField(source="batch.name", read_only=True)
+    select_related_fields = ("payee", "batch")
 
     class Meta:
         model = TemplatePayee
@@ -0,0 +1,61 @@
+from django.db import IntegrityError, transaction
+
+from Jobs.queue import JobError, job_handler
+from Paymagics_API.db_router import replica_reads
+
+from .excel import TemplateUploadError, parse_template_upload, write_batch_workbook
+from .models import Batch, PaymentTemplate
+
+
+@job_handler("batch_export")
+def export_batch(job):
+    batch = Batch.objects.select_related("template").filter(id=job.payload["batch_id"]).first()
+    if batch is None or not batch.row_count:
+        raise JobError("No payees found for this batch")
+
+    job.set_progress(0, batch.row_count)
+    with replica_reads(job.created_by):
+        workbook = write_batch_workbook(batch)
+    with workbook as file_obj:
+        job.save_artifact(f"{batch.name}.xlsx", file_obj)
+
+    if batch.status != "exported":
+        Batch.objects.filter(id=batch.id).update(status="exported")
+
+    return {"batch_name": batch.name, "row_count": batch.row_count}
+
+
+@job_handler("template_upload")
+def upload_template(job):
+    template_name = job.payload["template_name"]
+    template_type = job.payload["template_type"]
+
+    try:
+        with job.source.open("rb") as file_obj:
+            dynamic_fields, static_fields, option_fields, field_order = parse_template_upload(file_obj, template_type)
+    except TemplateUploadError as e:
+        raise JobError(str(e))
+
+    try:
+        with transaction.atomic():
+            template = PaymentTemplate.objects.create(
+                name=template_name,
+                template_type=template_type,
+                dynamic_fields=dynamic_fields or None,
+                static_fields=static_fields or None,
+                options=option_fields or None,
+                field_order=field_order,
+                created_by=job.created_by,
+            )
+    except IntegrityError as e:
+        raise JobError(str(e))
+
+    return {
+        "message": "Template created successfully",
+        "template_id": template.id,
+        "template_name": template.name,
+        "dynamic_fields": dynamic_fields,
+        "static_fields": static_fields,
+        "option_fields": option_fields,
+        "field_order": field_order,
+    }
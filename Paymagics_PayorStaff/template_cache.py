@@ -0,0 +1,121 @@
+import copy
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from Paymagics_API.cache_versions import bump_version, cache_is_shared, get_version
+
+
+# Templates held per process; each entry is keyed by id and version, so a bump orphans it.
+# Only used with a shared cache, where every worker sees the bump.
+LOCAL_CACHE_SIZE = 256
+
+_local = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _timeout():
+    return getattr(settings, "TEMPLATE_CACHE_TIMEOUT", 60 * 60)
+
+
+def _version_key(template_id):
+    return f"payment_template:{template_id}:version"
+
+
+def _entry_key(template_id, version, part):
+    return f"payment_template:{template_id}:{version}:{part}"
+
+
+def get_template_version(template_id):
+    return get_version(_version_key(template_id))
+
+
+def bump_template_version(template_id):
+    bump_version(_version_key(template_id))
+
+
+def _local_get(key):
+    with _local_lock:
+        value = _local.get(key)
+        if value is not None:
+            _local.move_to_end(key)
+        return value
+
+
+def _local_set(key, value):
+    with _local_lock:
+        _local[key] = value
+        if len(_local) > LOCAL_CACHE_SIZE:
+            _local.popitem(last=False)
+
+
+def _cached(template_id, part, build):
+    """Process LRU -> Django cache -> build(); whatever is found is written back up"""
+    key = _entry_key(template_id, get_template_version(template_id), part)
+
+    # Without a shared cache this process never sees other workers' bumps, and the
+    # LRU has no expiry; the cache timeout is then the only bound on staleness
+    use_local = cache_is_shared()
+
+    value = _local_get(key) if use_local else None
+    if value is None:
+        value = cache.get(key)
+        if value is None:
+            value = build()
+            cache.set(key, value, _timeout())
+        if use_local:
+            _local_set(key, value)
+    return value
+
+
+def _load_template(template_id):
+    from .models import PaymentTemplate
+
+    # Always from the primary, even in replica_reads(): a lagging replica could
+    # otherwise put the old row in the cache under the new version
+    return PaymentTemplate.objects.using(DEFAULT_DB_ALIAS).get(id=template_id)
+
+
+def get_cached_template(template_id, template_type=None):
+    """
+    PaymentTemplate by id without a query in steady state. Raises
+    PaymentTemplate.DoesNotExist like objects.get(); missing ids are not cached.
+
+    The instance is a copy: callers may set attributes on it, but must not
+    save it (load a fresh row for writes).
+    """
+    from .models import PaymentTemplate
+
+    try:
+        template_id = int(template_id)
+    except (TypeError, ValueError):
+        raise PaymentTemplate.DoesNotExist
+
+    template = _cached(template_id, "instance", lambda: _load_template(template_id))
+    if template_type is not None and template.template_type != template_type:
+        raise PaymentTemplate.DoesNotExist
+    return copy.copy(template)
+
+
+def get_cached_template_data(template):
+    """
+    PaymentTemplateSerializer(template).data, serialized once per version.
+    A `template` read from the replica is swapped for the primary row first.
+    """
+    from .serializers import PaymentTemplateSerializer
+
+    def build():
+        source = template if template._state.db == DEFAULT_DB_ALIAS else get_cached_template(template.pk)
+        return dict(PaymentTemplateSerializer(source).data)
+
+    data = _cached(template.pk, "data", build)
+    return copy.deepcopy(data)
+
+
+def invalidate_template(sender, instance, **kwargs):
+    # After commit, so a concurrent reader can't cache the old row under the new version
+    template_id = instance.pk
+    transaction.on_commit(lambda: bump_template_version(template_id))
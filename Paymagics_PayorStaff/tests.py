@@ -0,0 +1,156 @@
+import datetime
+import io
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from openpyxl import load_workbook
+from rest_framework.test import APIClient
+
+from Paymagics_Payor.models import Category, Payee
+from testutils.query_budget import QueryBudgetMixin
+
+from . import artifacts
+from .excel import build_streaming_workbook
+from .models import Batch, ExportArtifact, PaymentTemplate, TemplatePayee
+from .template_cache import _entry_key, get_cached_template, get_template_version
+
+
+class PayorStaffQueryBudgetTests(QueryBudgetMixin, TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        cls.category = Category.objects.create(category="Vendors")
+        cls.template = PaymentTemplate.objects.create(
+            name="Payments",
+            dynamic_fields={"Name": "ben_name", "Code": "ben_code"},
+            static_fields={"Currency": "INR"},
+            field_order=["Code", "Name", "Currency"],
+            created_by=cls.admin,
+        )
+        cls.payees = []
+        for index in range(3):
+            payee = Payee.objects.create(ben_code=f"B{index}", ben_name=f"Vendor {index}")
+            payee.categories.add(cls.category)
+            cls.payees.append(payee)
+
+        for index in range(3):
+            batch = Batch.objects.create(name=f"Batch {index}", template=cls.template, row_count=len(cls.payees))
+            TemplatePayee.objects.bulk_create(
+                TemplatePayee(template=cls.template, payee=payee, batch=batch, dynamic_data={"Name": payee.ben_name})
+                for payee in cls.payees
+            )
+        cls.batch = batch
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.admin)
+
+    def selection(self, **data):
+        return {"payees": [self.payees[0].id], "lists": [self.category.id], **data}
+
+    def test_selected_payees(self):
+        self.assertWithinQueryBudget("selected_payees", method="post", data=self.selection())
+
+    def test_template_payees_data(self):
+        self.assertWithinQueryBudget(
+            "template-payees-data", method="post", data=self.selection(template_id=self.template.id)
+        )
+
+    def test_list_batches(self):
+        self.assertWithinQueryBudget("list_batches")
+
+    def test_view_batch_excel(self):
+        self.assertWithinQueryBudget("view_batch_excel", args=[self.batch.name])
+
+
+class TemplateCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        cls.template = PaymentTemplate.objects.create(name="Payments", created_by=admin)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_after_first_load(self):
+        get_cached_template(self.template.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cached_template(self.template.id).name, "Payments")
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_process_local_cache_skips_the_lru(self):
+        # With locmem an entry must expire with the cache, not live on in the process LRU
+        get_cached_template(self.template.id)
+        PaymentTemplate.objects.filter(id=self.template.id).update(name="Renamed")
+        cache.delete(_entry_key(self.template.id, get_template_version(self.template.id), "instance"))
+        self.assertEqual(get_cached_template(self.template.id).name, "Renamed")
+
+
+class ExportArtifactTests(TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        template = PaymentTemplate.objects.create(
+            name="Payments", dynamic_fields={"Name": "ben_name"}, field_order=["Name"], created_by=cls.admin
+        )
+        cls.payees = [Payee.objects.create(ben_code=f"B{index}", ben_name=f"Vendor {index}") for index in range(2)]
+        cls.batch = Batch.objects.create(name="Batch", template=template, row_count=len(cls.payees))
+        TemplatePayee.objects.bulk_create(
+            TemplatePayee(template=template, payee=payee, batch=cls.batch) for payee in cls.payees
+        )
+
+    def setUp(self):
+        exports = tempfile.TemporaryDirectory()
+        self.addCleanup(exports.cleanup)
+        export_storage = {**settings.STORAGES["exports"], "OPTIONS": {"location": exports.name}}
+        self.enterContext(override_settings(STORAGES={**settings.STORAGES, "exports": export_storage}))
+        self.client.force_authenticate(self.admin)
+
+    def download(self):
+        response = self.client.get(reverse("download_batch_excel", args=[self.batch.name]))
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(io.BytesIO(b"".join(response.streaming_content))).active
+        return [row[0] for row in sheet.iter_rows(min_row=2, values_only=True)]
+
+    def test_payee_delete_invalidates_export(self):
+        self.assertEqual(self.download(), ["Vendor 0", "Vendor 1"])
+        self.payees[1].delete()
+        self.assertEqual(self.download(), ["Vendor 0"])
+
+    def test_artifact_evicted_before_open_is_rebuilt(self):
+        self.download()
+        storage = artifacts.export_storage()
+        storage.delete(ExportArtifact.objects.get().file_name)
+
+        # The first lookup still sees the file; it is gone by the time it is opened
+        exists = storage.exists
+        lookups = iter([True])
+        with mock.patch.object(storage, "exists", lambda name: next(lookups, None) or exists(name)):
+            self.assertEqual(self.download(), ["Vendor 0", "Vendor 1"])
+        self.assertEqual(ExportArtifact.objects.count(), 1)
+
+
+class StreamingWorkbookTests(SimpleTestCase):
+    def test_cells_keep_their_types(self):
+        rows = [["B1", 3, Decimal("12.50"), datetime.date(2026, 3, 1), datetime.datetime(2026, 3, 1, 9, 30), None]]
+        with build_streaming_workbook(iter(rows), ["Code", "Count", "Amount", "Due", "Sent", "Note"]) as output:
+            sheet = load_workbook(output).active
+            cells = next(sheet.iter_rows(min_row=2))
+
+        self.assertEqual([cell.value for cell in cells[:3]], ["B1", 3, 12.5])
+        self.assertEqual([cell.data_type for cell in cells[:3]], ["s", "n", "n"])
+        self.assertTrue(cells[3].is_date)
+        self.assertEqual(cells[3].value, datetime.datetime(2026, 3, 1))
+        self.assertEqual(cells[4].value, datetime.datetime(2026, 3, 1, 9, 30))
+        self.assertIsNone(cells[5].value)
@@ -2,11 +2,16 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
 from openpyxl import Workbook
-from .models import PaymentTemplate, TemplatePayee
+from .models import Batch, PaymentTemplate, TemplatePayee
 from Paymagics_Payor.models import Payee
 from .serializers import PaymentTemplateSerializer, TemplatePayeeSerializer
+from .excel import XLSX_CONTENT_TYPE, TemplateUploadError, parse_template_upload
+from .artifacts import batch_export_key, open_batch_export
+from .plans import get_row_plan
+from .template_cache import get_cached_template, get_cached_template_data
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.forms.models import model_to_dict
 from openpyxl import Workbook
@@ -14,11 +19,16 @@ from openpyxl.styles import Font
 from openpyxl.utils import get_column_letter
 from django.http import HttpResponse
 from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
 from django.urls import reverse
-from rest_framework.pagination import PageNumberPagination
+from Paymagics_API.pagination import get_paginator, get_total_count
+from Paymagics_API.db_router import replica_view
+from Jobs.queue import enqueue
+from Jobs.views import job_accepted_response
 import json
 from openpyxl import load_workbook
 from django.db import transaction
+from django.db.models import F, Q
 from datetime import datetime
 
 
@@ -105,13 +115,16 @@ def templates(request):
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def payment_template_detail(request, pk):
-    template = get_object_or_404(PaymentTemplate, pk=pk)
-
     if request.method == 'GET':
-        serializer = PaymentTemplateSerializer(template)
-        return Response(serializer.data)
+        try:
+            template = get_cached_template(pk)
+        except PaymentTemplate.DoesNotExist:
+            raise Http404
+        return Response(get_cached_template_data(template))
 
-    elif request.method == 'PUT':
+    template = get_object_or_404(PaymentTemplate, pk=pk)
+
+    if request.method == 'PUT':
         serializer = PaymentTemplateSerializer(template, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -124,11 +137,16 @@ def payment_template_detail(request, pk):
 
 
 # ----------------------------- Add payee to template
+
+# TemplatePayee rows written per INSERT statement
+BULK_CREATE_BATCH_SIZE = 1000
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def add_payees_to_template(request, template_id):
     try:
-        template = PaymentTemplate.objects.get(id=template_id)
+        template = get_cached_template(template_id)
     except PaymentTemplate.DoesNotExist:
         return Response({"error": "Template not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -144,55 +162,79 @@ def add_payees_to_template(request, template_id):
     if not batch_name:
         batch_name = f"Batch_{timezone.now().strftime('%Y%m%d%H%M')}"
 
-    if TemplatePayee.objects.filter(batch_name=batch_name).exists():
+    if Batch.objects.filter(name=batch_name).exists():
         return Response(
             {"error": f"Batch name '{batch_name}' already exists"},
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    if not isinstance(payees_data, list):
+        return Response({"error": "payees must be a list."}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Fetch every referenced payee in a single query
+    requested_ids = []
+    for data in payees_data:
+        try:
+            requested_ids.append(int(data.get("payee_id")))
+        except (TypeError, ValueError):
+            continue
+    payees_by_id = Payee.objects.in_bulk(set(requested_ids))
+
+    plan = get_row_plan(template)
     created_payees = []
+    errors = []
 
     for data in payees_data:
         payee_id = data.get("payee_id")
         if not payee_id:
+            errors.append({"error": "Missing payee_id in record."})
             continue
 
         try:
-            payee = Payee.objects.get(id=payee_id)
-        except Payee.DoesNotExist:
+            payee = payees_by_id.get(int(payee_id))
+        except (TypeError, ValueError):
+            payee = None
+        if payee is None:
+            errors.append({"payee_id": payee_id, "error": "Invalid payee_id"})
             continue
 
-        payee_dict = model_to_dict(payee)
-
-        # Map dynamic fields from Payee model → template
-        dynamic_fields_map = template.dynamic_fields or {}
-        dynamic_data = {
-            header: payee_dict.get(model_field)
-            for header, model_field in dynamic_fields_map.items()
-            if model_field in payee_dict
-        }
-
         # ✅ Use provided static_fields, fallback to template defaults
         static_data = data.get("static_fields", template.static_fields or {})
 
         # ✅ Use provided options_data, fallback to template defaults
         options_data = data.get("options_data", template.options or {})
 
-        template_payee = TemplatePayee.objects.create(
+        created_payees.append(TemplatePayee(
             template=template,
             payee=payee,
-            dynamic_data=dynamic_data,
+            dynamic_data=plan.payee_dynamic_data(payee),
             static_data=static_data,
-            options_data=options_data,
-            batch_name=batch_name
-        )
-        created_payees.append(template_payee)
-
+            options_data=options_data
+        ))
 
+    if not created_payees:
+        return Response(
+            {"error": "No valid payees to add", "errors": errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
+    with transaction.atomic():
+        batch = Batch.objects.create(name=batch_name, template=template, row_count=len(created_payees))
+        for template_payee in created_payees:
+            template_payee.batch = batch
+        TemplatePayee.objects.bulk_create(created_payees, batch_size=BULK_CREATE_BATCH_SIZE)
+
+        # MySQL can't return primary keys from a bulk insert; read them back in insertion order
+        if created_payees and created_payees[0].pk is None:
+            created_ids = (
+                TemplatePayee.objects.filter(batch=batch)
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
+            for template_payee, pk in zip(created_payees, created_ids):
+                template_payee.pk = pk
 
-    template_serializer = PaymentTemplateSerializer(template)
-    template_data = template_serializer.data
+    template_data = get_cached_template_data(template)
 
     # Remove ordered_fields from template response if it exists
     if 'ordered_fields' in template_data:
@@ -200,65 +242,31 @@ def add_payees_to_template(request, template_id):
 
     response_payees = []
     for template_payee in created_payees:
-        # Combine all data sources
+        # Combine all data sources, all already held in memory
         combined_data = {}
-        
-        # Add payee basic details
-        if hasattr(template_payee, 'payee') and template_payee.payee:
-            payee = template_payee.payee
-            # Get the actual field names from template's dynamic_fields values
-            dynamic_fields_map = template.dynamic_fields or {}
-            
-            # Map payee fields to template field names dynamically
-            for template_field, payee_field in dynamic_fields_map.items():
-                if hasattr(payee, payee_field):
-                    combined_data[template_field] = getattr(payee, payee_field)
-        
-        # Add dynamic data (this contains the mapped values from above)
-        if template_payee.dynamic_data:
-            combined_data.update(template_payee.dynamic_data)
-        
-        # Add static data
-        if template_payee.static_data:
-            combined_data.update(template_payee.static_data)
-        
-        # Add options data
-        if template_payee.options_data:
-            combined_data.update(template_payee.options_data)
-        
+        combined_data.update(template_payee.dynamic_data or {})
+        combined_data.update(template_payee.static_data or {})
+        combined_data.update(template_payee.options_data or {})
+
         # Apply field ordering - include ALL fields but order specified ones first
-        field_order = template.field_order or []
-        ordered_payee_details = {}
-        
-        if field_order:
-            # First, add fields that are in field_order (in the specified order)
-            for field_name in field_order:
-                if field_name in combined_data:
-                    ordered_payee_details[field_name] = combined_data[field_name]
-            
-            # Then, add any remaining fields that weren't in field_order
-            for field_name, value in combined_data.items():
-                if field_name not in ordered_payee_details:
-                    ordered_payee_details[field_name] = value
-        else:
-            # If no field_order, use the original order
-            ordered_payee_details = combined_data
-        
+        ordered_payee_details = plan.order_row(combined_data)
+
         # Build the payee response object
         payee_response = {
             "id": template_payee.id,
             "payee_details": ordered_payee_details,
             "added_at": template_payee.added_at,
-            "template": template_payee.template.id,
-            "payee": template_payee.payee.id
+            "template": template.id,
+            "payee": template_payee.payee_id
         }
-        
+
         response_payees.append(payee_response)
 
     return Response({
         "template": template_data,
         "batch_name": batch_name,
-        "payees": response_payees
+        "payees": response_payees,
+        "errors": errors
     }, status=status.HTTP_201_CREATED)
 
 
@@ -268,123 +276,84 @@ def add_payees_to_template(request, template_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def download_batch_excel(request, batch_name):
-    payees = TemplatePayee.objects.filter(batch_name=batch_name)
-
-    if not payees.exists():
+    batch = Batch.objects.select_related("template").filter(name=batch_name).first()
+    if batch is None or not batch.row_count:
         return Response({"error": "No payees found for this batch"}, status=404)
 
-    template = payees.first().template
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = batch_name
-
-    # Use field_order if available, otherwise fallback to default order
-    if template.field_order:
-        headers = template.field_order
-    else:
-        # Fallback to default order: dynamic -> static -> options
-        dynamic_headers = list(template.dynamic_fields.keys()) if template.dynamic_fields else []
-        static_headers = list(template.static_fields.keys()) if template.static_fields else []
-        options_headers = list(template.options.keys()) if template.options else []
-        headers = dynamic_headers + static_headers + options_headers
-
-    # Write headers
-    for col_num, header in enumerate(headers, start=1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        cell.font = Font(bold=True)
-
-    # Write data rows
-    for row_num, tp in enumerate(payees, start=2):
-        for col_num, header in enumerate(headers, start=1):
-            value = ""
-            
-            # Check dynamic data
-            if tp.dynamic_data and header in tp.dynamic_data:
-                value = tp.dynamic_data[header]
-            # Check static data
-            elif tp.static_data and header in tp.static_data:
-                value = tp.static_data[header]
-            # Check options data
-            elif tp.options_data and header in tp.options_data:
-                value = tp.options_data[header]
-            # Check payee model fields (for fields like ben_name, ben_code that are mapped via dynamic_fields)
-            elif hasattr(tp, 'payee') and tp.payee:
-                # Get the actual field name from template's dynamic_fields mapping
-                dynamic_fields_map = template.dynamic_fields or {}
-                for template_field, model_field in dynamic_fields_map.items():
-                    if template_field == header and hasattr(tp.payee, model_field):
-                        value = getattr(tp.payee, model_field)
-                        break
-
-            # Convert lists or dicts to a string before writing
-            if isinstance(value, (list, dict)):
-                value = json.dumps(value)
-
-            ws.cell(row=row_num, column=col_num, value=value)
-
-    # Auto-adjust column widths
-    for col_num, header in enumerate(headers, start=1):
-        col_letter = get_column_letter(col_num)
-        max_length = max(
-            len(str(ws.cell(row=row, column=col_num).value or "")) for row in range(1, ws.max_row + 1)
-        )
-        ws.column_dimensions[col_letter].width = max_length + 5
-
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    # ?background=true: build the file on a worker and poll the returned job
+    if request.query_params.get("background", "false").lower() == "true":
+        job = enqueue("batch_export", {"batch_id": batch.id}, user=request.user)
+        return job_accepted_response(request, job)
+
+    # The cache key is also the ETag, so an unchanged batch costs one query and a 304
+    key = batch_export_key(batch)
+    etag = quote_etag(key)
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    file_obj = open_batch_export(batch, key)
+
+    if batch.status != "exported":
+        Batch.objects.filter(id=batch.id).update(status="exported")
+
+    response = FileResponse(
+        file_obj,
+        as_attachment=True,
+        filename=f"{batch_name}.xlsx",
+        content_type=XLSX_CONTENT_TYPE,
     )
-    response['Content-Disposition'] = f'attachment; filename="{batch_name}.xlsx"'
-    wb.save(response)
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
     return response
 
 
 # ----------------------------- excel files
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_view
 def list_batches(request):
-    batches = (
-        TemplatePayee.objects
-        .values("batch_name", "template__id", "template__name")
-        .distinct()
-    )
+    batches = Batch.objects.select_related("template").order_by("-id")
 
-    total_count = batches.count()  # Total number of unique batches
+    paginator = get_paginator(request)
+    paginated_batches = paginator.paginate_queryset(batches, request)
 
     data = []
-    for batch in batches:
+    for batch in paginated_batches:
         data.append({
-            "batch_name": batch["batch_name"],
-            "template_id": batch["template__id"],
-            "template_name": batch["template__name"],
+            "batch_id": batch.id,
+            "batch_name": batch.name,
+            "template_id": batch.template_id,
+            "template_name": batch.template.name,
+            "row_count": batch.row_count,
+            "status": batch.status,
+            "created_at": batch.created_at,
             "download_url": request.build_absolute_uri(
-                reverse("download_batch_excel", args=[batch["batch_name"]])
+                reverse("download_batch_excel", args=[batch.name])
             )
         })
-    data.reverse()
 
-    paginator = PageNumberPagination()
-    paginator.page_size = 15
-    paginated_data = paginator.paginate_queryset(data, request)
-
-    response = paginator.get_paginated_response(paginated_data)
-    response.data["total_count"] = total_count  # 👈 Added total count
+    response = paginator.get_paginated_response(data)
+    response.data["total_count"] = get_total_count(paginator)  # 👈 Added total count
     return response
 
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_view
 def view_batch_excel(request, batch_name):
-    payees = TemplatePayee.objects.filter(batch_name=batch_name)
-    if not payees.exists():
+    batch = Batch.objects.select_related("template").filter(name=batch_name).first()
+    if batch is None or not batch.row_count:
         return Response({"error": "Batch not found."}, status=status.HTTP_404_NOT_FOUND)
 
     # All payees in the same batch share one template
-    template = payees.first().template  
+    template = batch.template
+    payees = batch.template_payees.select_related("payee").order_by("id")
 
     payees_data = TemplatePayeeSerializer(payees, many=True).data
-    template_data = PaymentTemplateSerializer(template).data
+    template_data = get_cached_template_data(template)
 
     response_data = {
         "batch_name": batch_name,
@@ -410,94 +379,127 @@ def update_batch_excel(request, batch_name):
         return Response({"error": "records must be a non-empty list."}, status=400)
 
     try:
-        template = PaymentTemplate.objects.get(id=template_id)
+        template = get_cached_template(template_id)
     except PaymentTemplate.DoesNotExist:
         return Response({"error": "Template not found."}, status=404)
 
-    payees_qs = TemplatePayee.objects.filter(batch_name=batch_name)
-    existing_payee_ids = list(payees_qs.values_list("payee_id", flat=True))
-
-    updated_records = []
-    created_records = []
+    # Normalise the incoming records, keyed by payee id (last record wins)
     errors = []
-
-    incoming_payee_ids = []
-
+    incoming = {}
     for rec in records:
         payee_id = rec.get("payee_id")
-        static_fields = rec.get("static_fields", {})
-        options_selection = rec.get("options_selection", {})
-
         if not payee_id:
             errors.append({"error": "Missing payee_id in record."})
             continue
-
-        incoming_payee_ids.append(payee_id)
-
         try:
-            payee = Payee.objects.get(id=payee_id)
-        except Payee.DoesNotExist:
+            incoming[int(payee_id)] = rec
+        except (TypeError, ValueError):
             errors.append({"payee_id": payee_id, "error": "Invalid payee_id"})
-            continue
 
-        if payee_id in existing_payee_ids:
-            # Update existing TemplatePayee
-            tp = payees_qs.get(payee_id=payee_id)
+    plan = get_row_plan(template)
+    template_options = template.options or {}
 
-            # Update dynamic data from template fields
-            dynamic_fields_map = template.dynamic_fields or {}
-            for header, model_field in dynamic_fields_map.items():
-                tp.dynamic_data[header] = getattr(payee, model_field, "")
+    if new_batch_name != batch_name and Batch.objects.filter(name=new_batch_name).exists():
+        return Response({"error": f"Batch name '{new_batch_name}' already exists"}, status=400)
 
-            # Update static data
-            tp.static_data.update(static_fields or template.static_fields or {})
+    with transaction.atomic():
+        batch, _ = Batch.objects.get_or_create(name=batch_name, defaults={"template": template})
+        payees_qs = batch.template_payees.all()
 
-            # Update options data
-            if options_selection:
-                for key, value in options_selection.items():
-                    if key in (template.options or {}):
-                        tp.options_data[key] = value
+        # Two queries: the whole batch, and every payee it references
+        existing_by_payee = {}
+        duplicate_ids = []
+        for tp in payees_qs.order_by("id"):
+            if tp.payee_id in existing_by_payee:
+                duplicate_ids.append(tp.id)
             else:
-                tp.options_data.update(template.options or {})
-
-            # Update template reference
-            tp.template = template
-            tp.save()
-
-            updated_records.append(TemplatePayeeSerializer(tp).data)
-
-        else:
-            # Create new TemplatePayee
-            payee_dict = model_to_dict(payee)
-            dynamic_fields_map = template.dynamic_fields or {}
-            dynamic_data = {
-                header: payee_dict.get(model_field)
-                for header, model_field in dynamic_fields_map.items()
-                if model_field in payee_dict
-            }
+                existing_by_payee[tp.payee_id] = tp
 
-            static_data = static_fields or template.static_fields or {}
-            options_data = options_selection or template.options or {}
+        payees_by_id = Payee.objects.in_bulk(list(incoming))
 
-            new_tp = TemplatePayee.objects.create(
-                template=template,
-                payee=payee,
-                dynamic_data=dynamic_data,
-                static_data=static_data,
-                options_data=options_data,
-                batch_name=batch_name
-            )
+        to_update = []
+        to_create = []
 
-            created_records.append(TemplatePayeeSerializer(new_tp).data)
+        for payee_id, rec in incoming.items():
+            payee = payees_by_id.get(payee_id)
+            if payee is None:
+                errors.append({"payee_id": rec.get("payee_id"), "error": "Invalid payee_id"})
+                continue
+
+            static_fields = rec.get("static_fields", {})
+            options_selection = rec.get("options_selection", {})
+            tp = existing_by_payee.get(payee_id)
+
+            if tp is not None:
+                # Update existing TemplatePayee
+                tp.payee = payee
+
+                # Update dynamic data from template fields
+                tp.dynamic_data = {**(tp.dynamic_data or {}), **plan.payee_dynamic_data(payee, missing="")}
 
-    # Delete payees not present in the new records
-    payees_to_delete = payees_qs.exclude(payee_id__in=incoming_payee_ids)
-    deleted_count = payees_to_delete.count()
-    payees_to_delete.delete()
+                # Update static data
+                tp.static_data = {**(tp.static_data or {}), **(static_fields or template.static_fields or {})}
 
-    # Optional batch rename
-    if new_batch_name != batch_name:
-        TemplatePayee.objects.filter(batch_name=batch_name).update(batch_name=new_batch_name)
+                # Update options data
+                options_data = dict(tp.options_data or {})
+                if options_selection:
+                    for key, value in options_selection.items():
+                        if key in template_options:
+                            options_data[key] = value
+                else:
+                    options_data.update(template_options)
+                tp.options_data = options_data
+
+                # Update template reference
+                tp.template = template
+                to_update.append(tp)
+
+            else:
+                # Create new TemplatePayee
+                to_create.append(TemplatePayee(
+                    template=template,
+                    payee=payee,
+                    dynamic_data=plan.payee_dynamic_data(payee),
+                    static_data=static_fields or template.static_fields or {},
+                    options_data=options_selection or template_options,
+                    batch=batch
+                ))
+
+        TemplatePayee.objects.bulk_update(
+            to_update,
+            ["template", "dynamic_data", "static_data", "options_data"],
+            batch_size=BULK_CREATE_BATCH_SIZE
+        )
+        TemplatePayee.objects.bulk_create(to_create, batch_size=BULK_CREATE_BATCH_SIZE)
+
+        # Delete payees not present in the new records
+        stale_ids = duplicate_ids + [
+            tp.id for payee_id, tp in existing_by_payee.items() if payee_id not in incoming
+        ]
+        deleted_count = len(stale_ids)
+        if stale_ids:
+            TemplatePayee.objects.filter(id__in=stale_ids).delete()
+
+        # MySQL can't return primary keys from a bulk insert; read them back by payee
+        if to_create and to_create[0].pk is None:
+            existing_ids = {tp.id for tp in existing_by_payee.values()}
+            created_ids = {
+                payee_id: pk
+                for pk, payee_id in payees_qs.values_list("id", "payee_id")
+                if pk not in existing_ids
+            }
+            for tp in to_create:
+                tp.pk = created_ids.get(tp.payee_id)
+
+        # Keep the batch row in step; a rename is a single-row update
+        batch.name = new_batch_name
+        batch.template = template
+        batch.row_count = len(to_update) + len(to_create)
+        batch.version = F("version") + 1
+        batch.save(update_fields=["name", "template", "row_count", "version"])
+
+    updated_records = TemplatePayeeSerializer(to_update, many=True).data
+    created_records = TemplatePayeeSerializer(to_create, many=True).data
 
     return Response({
         "message": f"Batch '{batch_name}' updated successfully.",
@@ -642,7 +644,7 @@ def delete_files(request, batch_name):
     if not batch_name:
         return Response({"error": "Batch name is required."}, status=400)
 
-    deleted_count, _ = TemplatePayee.objects.filter(batch_name=batch_name).delete()
+    deleted_count, _ = Batch.objects.filter(name=batch_name).delete()
 
     if deleted_count == 0:
         return Response({"message": f"No TemplatePayees found for batch '{batch_name}'."}, status=404)
@@ -656,7 +658,7 @@ def delete_files(request, batch_name):
 @permission_classes([IsAuthenticated])
 def payment_template_options(request, template_id):
     try:
-        template = PaymentTemplate.objects.get(id=template_id, template_type="payment")
+        template = get_cached_template(template_id, template_type="payment")
     except PaymentTemplate.DoesNotExist:
         return Response({"error": "Payee template not found."}, status=404)
 
@@ -669,6 +671,14 @@ def payment_template_options(request, template_id):
 
 from Paymagics_Payor.serializers import PayeeSerializer
  
+def selected_payee_filter(payee_ids, list_ids):
+    """Payees picked by id or through any of the lists, matched in a single query"""
+    selected = Q(id__in=payee_ids)
+    if list_ids:
+        selected |= Q(id__in=Payee.objects.filter(categories__id__in=list_ids).values("id"))
+    return selected
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def selected_payees(request):
@@ -676,27 +686,15 @@ def selected_payees(request):
     payee_ids = request.data.get("payees", [])   # list of payee IDs
     list_ids = request.data.get("lists", [])     # list of category IDs
  
-    # Start with manually selected payees
-    all_payee_ids = set(payee_ids)
- 
-    # Fetch payees linked to any of the categories in lists
-    if list_ids:
-        category_payees = Payee.objects.filter(
-            categories__id__in=list_ids,
-            is_active=True
-        ).values_list("id", flat=True)
-        all_payee_ids.update(category_payees)
- 
-    # If no payees found, return empty list
-    if not all_payee_ids:
+    # If nothing was selected, return empty list
+    if not payee_ids and not list_ids:
         return Response({"count": 0, "results": []})
  
-    # Final queryset
-    queryset = Payee.objects.filter(id__in=all_payee_ids, is_active=True).distinct()
+    # Final queryset: manually selected payees plus those in any of the lists
+    queryset = Payee.objects.filter(selected_payee_filter(payee_ids, list_ids), is_active=True)
  
     # Pagination
-    paginator = PageNumberPagination()
-    paginator.page_size = 15
+    paginator = get_paginator(request)
     paginated_payees = paginator.paginate_queryset(queryset, request)
  
     serializer = PayeeSerializer(paginated_payees, many=True)
@@ -715,67 +713,26 @@ def fetch_payees_for_template(request):
         return Response({"error": "template_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        template = PaymentTemplate.objects.get(id=template_id)
+        template = get_cached_template(template_id)
     except PaymentTemplate.DoesNotExist:
         return Response({"error": "Template not found"}, status=status.HTTP_404_NOT_FOUND)
 
     payee_ids = request.data.get("payees", [])
     list_ids = request.data.get("lists", [])
 
-    # Combine manually selected payees and payees from lists
-    all_payee_ids = set(payee_ids)
-
-    if list_ids:
-        category_payees = Payee.objects.filter(
-            categories__id__in=list_ids,
-            is_active=True
-        ).values_list("id", flat=True)
-        all_payee_ids.update(category_payees)
-
-    if not all_payee_ids:
+    if not payee_ids and not list_ids:
         return Response({"count": 0, "results": []})
 
-    queryset = Payee.objects.filter(id__in=all_payee_ids, is_active=True).distinct()
+    # Combine manually selected payees and payees from lists
+    queryset = Payee.objects.filter(selected_payee_filter(payee_ids, list_ids), is_active=True)
 
     # Pagination
-    paginator = PageNumberPagination()
-    paginator.page_size = 15
+    paginator = get_paginator(request)
     paginated_payees = paginator.paginate_queryset(queryset, request)
 
-    results = []
-    for payee in paginated_payees:
-        # First collect all data without ordering
-        all_data = {}
-
-        # Dynamic fields from template
-        for field_name, model_field in (template.dynamic_fields or {}).items():
-            all_data[field_name] = getattr(payee, model_field, None)
-
-        # Static fields from template
-        for field_name, value in (template.static_fields or {}).items():
-            all_data[field_name] = value
-
-        # Options fields from template
-        for field_name, options in (template.options or {}).items():
-            all_data[field_name] = options
-
-        # Apply field ordering if available
-        payee_data = {}
-        if template.field_order:
-            # Add fields in the specified order first
-            for field_name in template.field_order:
-                if field_name in all_data:
-                    payee_data[field_name] = all_data[field_name]
-            
-            # Then add any remaining fields that weren't in field_order
-            for field_name, value in all_data.items():
-                if field_name not in payee_data:
-                    payee_data[field_name] = value
-        else:
-            # If no field_order, use the original order
-            payee_data = all_data
-
-        results.append(payee_data)
+    # Template fields in field_order, resolved once for every row
+    plan = get_row_plan(template)
+    results = [plan.payee_preview(payee) for payee in paginated_payees]
 
     # Build response
     response_data = {
@@ -788,9 +745,11 @@ def fetch_payees_for_template(request):
             "options": template.options or {},
             "field_order": template.field_order or [],  # Include field_order in response
             "created_at": template.created_at,
-            "created_by": template.created_by.id if template.created_by else None,
+            "created_by": template.created_by_id,
         },
-        "count": queryset.count(),
+        "count": get_total_count(paginator),
+        "next": paginator.get_next_link(),
+        "previous": paginator.get_previous_link(),
         "results": results
     }
 
@@ -806,50 +765,22 @@ def get_batch_payees(request, batch_name):
     """Get batch payees in exact format with template field ordering"""
     try:
         # Get all template payees for this batch
-        template_payees = TemplatePayee.objects.filter(
-            batch_name=batch_name
-        ).select_related('template', 'payee')
-        
-        if not template_payees.exists():
+        batch = Batch.objects.select_related('template').filter(name=batch_name).first()
+
+        if batch is None or not batch.row_count:
             return Response({
                 "error": f"No payees found for batch: {batch_name}"
             }, status=404)
-        
+
+        template_payees = batch.template_payees.select_related('payee').order_by('id')
+
         # Get the template
-        template = template_payees.first().template
+        template = batch.template
         field_order = template.field_order or []
-        
-        results = []
-        for template_payee in template_payees:
-            payee = template_payee.payee
-            
-            # Build combined data from all sources
-            combined_data = {}
-            
-            # 1. Map payee fields through template's dynamic_fields
-            if template.dynamic_fields:
-                for template_field, model_field in template.dynamic_fields.items():
-                    if hasattr(payee, model_field):
-                        value = getattr(payee, model_field)
-                        if value is not None:
-                            combined_data[template_field] = value
-            
-            # 2. Add static data (overwrites mapped values if same field name)
-            if template_payee.static_data:
-                combined_data.update(template_payee.static_data)
-            
-            # 3. Add options data (overwrites if same field name)
-            if template_payee.options_data:
-                combined_data.update(template_payee.options_data)
-            
-            # Apply STRICT template field ordering
-            ordered_payee_details = {}
-            for field_name in field_order:
-                if field_name in combined_data:
-                    ordered_payee_details[field_name] = combined_data[field_name]
-            
-            # Add the ordered payee details directly (no nested "payee_details")
-            results.append(ordered_payee_details)
+
+        # STRICT template field ordering: options data, then static data, then the payee's own fields
+        plan = get_row_plan(template)
+        results = [plan.batch_row_details(template_payee) for template_payee in template_payees]
         
         # Build template data
         template_data = {
@@ -897,83 +828,20 @@ def upload_template(request):
     if not template_name:
         return Response({"error": "template_name is required"}, status=400)
 
-    try:
-        wb = load_workbook(file)
-        sheet = wb.active
-    except Exception as e:
-        return Response({"error": f"Invalid Excel file: {str(e)}"}, status=400)
-
-    # ------------------------------------
-    # READ HEADER ROW
-    # ------------------------------------
-    headers = []
-    for cell in sheet[1]:
-        if cell.value:
-            headers.append(str(cell.value).strip().replace(" ", "_").lower())
-
-    if not headers:
-        return Response({"error": "Excel has no headers"}, status=400)
-
-    # ------------------------------------
-    # READ ALL DATA ROWS INTO A LIST
-    # ------------------------------------
-    rows = []
-    for row in sheet.iter_rows(min_row=2, values_only=True):
-        if all(v is None for v in row):
-            continue
-        row_dict = {}
-        for i, col in enumerate(headers):
-            row_dict[col] = row[i]
-        rows.append(row_dict)
-
-    if not rows:
-        return Response({"error": "Excel has no data rows"}, status=400)
-
-    payee_fields = set([f.name for f in Payee._meta.fields])
-
-    dynamic_fields = {}
-    static_fields = {}
-    option_fields = {}
-    field_order = headers.copy()
-
-    # ------------------------------------
-    # CLASSIFY EACH COLUMN
-    # ------------------------------------
-   
-
-    for col in headers:
-        values = [row[col] for row in rows if row[col] is not None]
-        unique_values = list(set(values))
-        unique_count = len(unique_values)
-
-        # CASE 1
-        if col in payee_fields:
-            dynamic_fields[col] = col
-            continue
-
-        # CASE 2 
-        if template_type == "payment":
-
-            # Static field (only one value)
-            if unique_count == 1:
-                static_fields[col] = str(unique_values[0])
-                continue
-
-            # Options field (2–5 values)
-            if 2 <= unique_count <= 4:
-                option_fields[col] = [str(v) for v in unique_values]
-                continue
-
-            # More than 5 values → treat as static 
-            static_fields[col] = str(rows[0].get(col))
-            continue
-
-        # CASE 3 
-        else:
-            # For non-payment templates → ALL fields treated as static
-            static_fields[col] = str(rows[0].get(col)) if unique_values else None
-            continue
+    # ?background=true: parse the sheet on a worker; the job result is this view's response body
+    if str(request.data.get("background", request.query_params.get("background", "false"))).lower() == "true":
+        job = enqueue(
+            "template_upload",
+            {"template_name": template_name, "template_type": template_type},
+            user=request.user,
+            source=file,
+        )
+        return job_accepted_response(request, job)
 
+    try:
+        dynamic_fields, static_fields, option_fields, field_order = parse_template_upload(file, template_type)
+    except TemplateUploadError as e:
+        return Response({"error": str(e)}, status=400)
 
     # ------------------------------------
     # CREATE TEMPLATE 
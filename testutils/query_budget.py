@@ -0,0 +1,67 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+# Maximum queries a list endpoint may issue for one page, whatever the page
+# size or the number of related rows. Measured with force_authenticate(), so
+# token authentication is not included.
+LIST_ENDPOINT_QUERY_BUDGETS = {
+    "payee_list": 3,
+    "payees_in_list": 3,
+    "search_payees": 3,
+    "selected_payees": 3,
+    "export_payees": 5,
+    "list_payors": 2,
+    "list-payor-staff": 2,
+    "view_banks": 2,
+    "template-payees-data": 3,
+    "list_batches": 2,
+    "view_batch_excel": 2,
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class assert_max_queries(CaptureQueriesContext):
+    """
+    Context manager that fails if the wrapped block runs more than `limit`
+    queries, listing the captured SQL in the failure message.
+    """
+
+    def __init__(self, limit, using=DEFAULT_DB_ALIAS):
+        self.limit = limit
+        super().__init__(connections[using])
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None or len(self) <= self.limit:
+            return
+
+        queries = "\n".join(
+            f"{index}. {query['sql']}" for index, query in enumerate(self.captured_queries, start=1)
+        )
+        raise QueryBudgetExceeded(
+            f"{len(self)} queries executed, budget is {self.limit}:\n{queries}"
+        )
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin for checking list endpoints against LIST_ENDPOINT_QUERY_BUDGETS.
+
+        class PayeeListTests(QueryBudgetMixin, APITestCase):
+            def test_payee_list(self):
+                self.client.force_authenticate(self.user)
+                self.assertWithinQueryBudget("payee_list")
+    """
+    query_budgets = LIST_ENDPOINT_QUERY_BUDGETS
+
+    def assertWithinQueryBudget(self, url_name, method="get", args=None, data=None, **extra):
+        url = reverse(url_name, args=args)
+        with assert_max_queries(self.query_budgets[url_name]):
+            response = getattr(self.client, method)(url, data=data, format="json", **extra)
+        self.assertLess(response.status_code, 400, getattr(response, "data", response))
+        return response